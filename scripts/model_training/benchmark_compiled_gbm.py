@@ -0,0 +1,124 @@
+"""
+Бенчмарк компилированного GradientBoosting против sklearn на батчах 1 и 10 000.
+sklearn — predict_proba пайплайна на DataFrame (как при обучении);
+sklearn_numpy — SklearnNumpyBackend: numpy-препроцессинг + деревья sklearn;
+compiled — CompiledBackend: float32-препроцессинг + плоские массивы узлов.
+Проверяет совпадение вероятностей и пишет models/compiled_benchmark.json.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.models.backends import CompiledBackend, SklearnNumpyBackend
+from src.models.benchmark import latency_stats, time_calls
+from src.models.train import load_data
+
+
+def time_per_call(fn, n_runs, n_warmup=3):
+    """Прогрев и замер времени одного вызова, мс (p50, p99, mean, min)"""
+    timings = time_calls(fn, n_runs, n_warmup)
+    stats = latency_stats(timings)
+    return {
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+        "mean_ms": stats["mean_ms"],
+        "min_ms": round(float(timings.min()), 4),
+    }
+
+
+def make_batch(X: pd.DataFrame, size: int, seed: int = 42) -> pd.DataFrame:
+    """Метод набирает батч нужного размера из тестовой выборки.
+
+    Строки выбираются случайно с возвращением: при повторении выборки подряд
+    предсказатель переходов запоминает период и занижает время sklearn.
+    """
+    rows = np.random.default_rng(seed).integers(0, len(X), size=size)
+    return X.iloc[rows].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Компилированный GBM vs sklearn")
+    parser.add_argument(
+        "--model-path",
+        type=str,
+        default=str(project_root / "models" / "credit_default_model.pkl"),
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10000])
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Модель не найдена: {model_path}. Запустите: python -m src.models.train"
+        )
+
+    model = joblib.load(model_path)
+    feature_names = list(model.feature_names_in_)
+    sklearn_numpy = SklearnNumpyBackend(model, feature_names)
+    compiled = CompiledBackend(model, feature_names)
+
+    _, X_test, _, _ = load_data()
+    X_test = X_test[feature_names]
+
+    # Совпадение на всей тестовой выборке
+    expected = model.predict_proba(X_test)[:, 1]
+    actual = compiled.predict_proba(X_test.values.astype(np.float32))
+    max_abs_diff = float(np.abs(actual - expected).max())
+
+    classifier = model[-1]
+    results = {
+        "model_path": str(model_path),
+        "n_estimators": int(classifier.n_estimators_),
+        "max_depth": int(compiled.ensemble.depth),
+        "max_abs_diff": max_abs_diff,
+        "batches": {},
+    }
+    for size in args.batch_sizes:
+        frame = make_batch(X_test, size)
+        X = frame.values.astype(np.float32)
+        n_runs = 500 if size <= 100 else 30
+        timings = {
+            "sklearn": time_per_call(lambda: model.predict_proba(frame), n_runs),
+            "sklearn_numpy": time_per_call(
+                lambda: sklearn_numpy.predict_proba(X), n_runs
+            ),
+            "compiled": time_per_call(lambda: compiled.predict_proba(X), n_runs),
+        }
+        timings["speedup_vs_sklearn"] = round(
+            timings["sklearn"]["p50_ms"] / timings["compiled"]["p50_ms"], 2
+        )
+        timings["speedup_vs_sklearn_numpy"] = round(
+            timings["sklearn_numpy"]["p50_ms"] / timings["compiled"]["p50_ms"], 2
+        )
+        results["batches"][str(size)] = timings
+
+    output_path = project_root / "models" / "compiled_benchmark.json"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(
+        f"=== Компилированный GBM: {results['n_estimators']} деревьев, "
+        f"глубина {results['max_depth']}, max |Δp| = {max_abs_diff:.2e} ==="
+    )
+    for size, t in results["batches"].items():
+        print(
+            f"batch={size}: sklearn={t['sklearn']['p50_ms']} мс, "
+            f"sklearn_numpy={t['sklearn_numpy']['p50_ms']} мс, "
+            f"compiled={t['compiled']['p50_ms']} мс "
+            f"(x{t['speedup_vs_sklearn']} / x{t['speedup_vs_sklearn_numpy']})"
+        )
+    print(f"Результаты сохранены: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 """
 Сравнение производительности инференса: исходная модель (sklearn) vs ONNX на CPU.
 Замер времени и throughput, запись результатов в models/benchmark_results.json.
+Отдельно — выход вероятностей ZipMap (список словарей) vs тензор [N, 2] на больших батчах.
 """
 
 import json
 import sys
-import time
 from pathlib import Path
 
 import numpy as np
@@ -17,32 +17,52 @@ if str(project_root) not in sys.path:
 import joblib
 import onnxruntime as ort
 
+from src.models.backends import session_options
+from src.models.benchmark import latency_stats, time_calls
+from src.models.onnx_export import (
+    build_input_feed,
+    convert_pipeline,
+    probability_column,
+    probability_output,
+)
 from src.models.train import load_data
 
 
-def benchmark_sklearn(model, X, n_warmup=10, n_runs=100):
-    """Прогрев и замер времени sklearn predict_proba."""
-    _ = model.predict_proba(X[:n_warmup])
-    start = time.perf_counter()
-    for _ in range(n_runs):
-        _ = model.predict_proba(X)
-    elapsed = time.perf_counter() - start
-    return elapsed / n_runs, n_runs / elapsed * len(X)
+def benchmark_output_format(model, feature_names, X_ordered, batch_sizes, n_runs=20):
+    """Замер run + извлечения вероятности класса 1: ZipMap vs тензор [N, 2]"""
+    sessions = {
+        fmt: ort.InferenceSession(
+            convert_pipeline(
+                model, feature_names, zipmap=fmt == "zipmap"
+            ).SerializeToString(),
+            providers=["CPUExecutionProvider"],
+        )
+        for fmt in ("zipmap", "tensor")
+    }
+    results = []
+    for batch_size in batch_sizes:
+        # Строки тестовой выборки повторяются до нужного размера батча
+        X = np.resize(X_ordered, (batch_size, X_ordered.shape[1]))
+        row = {"batch_size": batch_size}
+        for fmt, sess in sessions.items():
+            input_feed = build_input_feed([i.name for i in sess.get_inputs()], X)
+            output = [probability_output(sess)]
 
+            def call():
+                (proba,) = sess.run(output, input_feed)
+                probability_column(proba)
 
-def benchmark_onnx(sess, input_feed, n_samples, n_warmup=10, n_runs=100):
-    """Прогрев и замер времени ONNX inference."""
-    _ = sess.run(None, {k: v[:n_warmup] for k, v in input_feed.items()})
-    start = time.perf_counter()
-    for _ in range(n_runs):
-        _ = sess.run(None, input_feed)
-    elapsed = time.perf_counter() - start
-    return elapsed / n_runs, n_runs / elapsed * n_samples
+            row[f"{fmt}_ms"] = latency_stats(time_calls(call, n_runs, 1))["mean_ms"]
+        row["speedup"] = round(row["zipmap_ms"] / row["tensor_ms"], 2)
+        results.append(row)
+    return results
 
 
 def main():
     model_path = project_root / "models" / "credit_nn.pkl"
     onnx_path = project_root / "models" / "model.onnx"
+    # Предоптимизированный граф (optimize_graph.py), если он есть
+    optimized_path = project_root / "models" / "model_optimized.onnx"
 
     if not model_path.exists():
         raise FileNotFoundError(
@@ -62,39 +82,47 @@ def main():
     X_ordered = X_test[feature_names].values
 
     # ONNX session
-    sess = ort.InferenceSession(str(onnx_path))
+    if optimized_path.exists():
+        onnx_path = optimized_path
+    sess = ort.InferenceSession(
+        str(onnx_path),
+        sess_options=session_options(onnx_path, 0, 0),
+        providers=["CPUExecutionProvider"],
+    )
     input_names = [inp.name for inp in sess.get_inputs()]
-    input_feed = {
-        name: X_ordered[:, i : i + 1].astype(np.float32)
-        for i, name in enumerate(input_names)
-    }
+    input_feed = build_input_feed(input_names, X_ordered)
 
     n_warmup = 10
     n_runs = 100
 
     # Бенчмарк sklearn
-    latency_sklearn, throughput_sklearn = benchmark_sklearn(
-        model, X_test, n_warmup=n_warmup, n_runs=n_runs
+    stats_sklearn = latency_stats(
+        time_calls(lambda: model.predict_proba(X_test), n_runs, n_warmup), n_samples
     )
 
     # Бенчмарк ONNX
-    latency_onnx, throughput_onnx = benchmark_onnx(
-        sess, input_feed, n_samples, n_warmup=n_warmup, n_runs=n_runs
+    stats_onnx = latency_stats(
+        time_calls(lambda: sess.run(None, input_feed), n_runs, n_warmup), n_samples
     )
 
     results = {
         "n_samples": n_samples,
         "n_warmup": n_warmup,
         "n_runs": n_runs,
-        "sklearn": {
-            "latency_ms": round(latency_sklearn * 1000, 4),
-            "throughput_samples_per_sec": round(throughput_sklearn, 2),
-        },
+        "sklearn": {"latency_ms": stats_sklearn["mean_ms"], **stats_sklearn},
         "onnx": {
-            "latency_ms": round(latency_onnx * 1000, 4),
-            "throughput_samples_per_sec": round(throughput_onnx, 2),
+            "latency_ms": stats_onnx["mean_ms"],
+            **stats_onnx,
+            "model_path": str(onnx_path),
         },
-        "speedup": round(throughput_onnx / throughput_sklearn, 2),
+        "speedup": round(
+            stats_onnx["throughput_samples_per_sec"]
+            / stats_sklearn["throughput_samples_per_sec"],
+            2,
+        ),
+        "output_format": benchmark_output_format(
+            model, feature_names, X_ordered, [1000, 10000, 50000]
+        ),
     }
 
     output_path = project_root / "models" / "benchmark_results.json"
@@ -106,14 +134,21 @@ def main():
     print(f"Примеров: {n_samples}, прогонов: {n_runs}")
     print()
     print("Sklearn:")
-    print(f"  Latency: {results['sklearn']['latency_ms']} ms")
+    print(f"  Latency: {results['sklearn']['latency_ms']} ms (p50 {results['sklearn']['p50_ms']}, p99 {results['sklearn']['p99_ms']})")
     print(f"  Throughput: {results['sklearn']['throughput_samples_per_sec']} samples/sec")
     print()
     print("ONNX:")
-    print(f"  Latency: {results['onnx']['latency_ms']} ms")
+    print(f"  Latency: {results['onnx']['latency_ms']} ms (p50 {results['onnx']['p50_ms']}, p99 {results['onnx']['p99_ms']})")
     print(f"  Throughput: {results['onnx']['throughput_samples_per_sec']} samples/sec")
     print()
     print(f"Ускорение ONNX vs sklearn: {results['speedup']}x")
+    print()
+    print("Выход вероятностей: ZipMap vs тензор [N, 2] (run + извлечение p1):")
+    for row in results["output_format"]:
+        print(
+            f"  batch={row['batch_size']:6d}: {row['zipmap_ms']} ms vs "
+            f"{row['tensor_ms']} ms (x{row['speedup']})"
+        )
     print(f"Результаты сохранены: {output_path}")
 
 
@@ -0,0 +1,99 @@
+"""
+Микробенчмарк накладных расходов одного запроса /predict.
+До: pd.DataFrame([data.model_dump()]) + predict + predict_proba (два прохода пайплайна).
+После: float32-вектор в порядке feature_names_in_ + один вызов модели выбранным
+бэкендом (--backend: sklearn — пайплайн, sklearn_numpy — numpy-препроцессинг).
+Результаты записываются в models/request_path_benchmark.json.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.api import app as app_module
+from src.models.backends import load_backend
+from src.models.benchmark import latency_stats, time_calls
+from src.models.train import load_data
+
+
+def time_per_call(fn, n_warmup=20, n_runs=500):
+    """Прогрев и замер времени одного вызова, мкс (mean, p50, p99)"""
+    stats = latency_stats(time_calls(fn, n_runs, n_warmup))
+    return {
+        f"{key}_us": round(stats[f"{key}_ms"] * 1000, 1)
+        for key in ("mean", "p50", "p99")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк пути /predict")
+    parser.add_argument(
+        "--model-path",
+        type=str,
+        default=str(project_root / "models" / "credit_default_model.pkl"),
+    )
+    parser.add_argument(
+        "--backend", type=str, default="sklearn", help="sklearn, sklearn_numpy, ..."
+    )
+    parser.add_argument("--n-runs", type=int, default=500)
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Модель не найдена: {model_path}. Запустите: python -m src.models.train"
+        )
+
+    _, X_test, _, _ = load_data()
+    data = app_module.ClientData(**X_test[app_module.FEATURE_NAMES].iloc[0].to_dict())
+
+    backend = load_backend(model_path, app_module.FEATURE_NAMES, args.backend)
+    app_module.model = backend
+    pipeline = joblib.load(model_path)
+
+    def before():
+        input_data = pd.DataFrame([data.model_dump()])
+        pipeline.predict(input_data)
+        pipeline.predict_proba(input_data)[0][1]
+
+    def after():
+        app_module.predict_matrix(app_module.client_to_row(data, backend), backend)
+
+    results = {
+        "model_path": str(model_path),
+        "backend": backend.name,
+        "n_runs": args.n_runs,
+        "before_dataframe_two_passes": time_per_call(before, n_runs=args.n_runs),
+        "after_float32_vector_one_pass": time_per_call(after, n_runs=args.n_runs),
+    }
+    results["speedup_p50"] = round(
+        results["before_dataframe_two_passes"]["p50_us"]
+        / results["after_float32_vector_one_pass"]["p50_us"],
+        2,
+    )
+
+    output_path = project_root / "models" / "request_path_benchmark.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print("=== Накладные расходы одного запроса /predict ===")
+    for key in ("before_dataframe_two_passes", "after_float32_vector_one_pass"):
+        r = results[key]
+        print(
+            f"{key}: mean={r['mean_us']} мкс, p50={r['p50_us']} мкс, p99={r['p99_us']} мкс"
+        )
+    print(f"Ускорение (p50): {results['speedup_p50']}x")
+    print(f"Результаты сохранены: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Единый бенчмарк инференса по бэкендам src.models.backends.load_backend.
+run — матрица цель x потоки x размер батча: p50/p95/p99/max, среднее, std и
+throughput; прогон дописывается строкой в models/benchmark_history.jsonl.
+compare — сравнение прогона с базовым: регрессии больше --threshold выводятся,
+код возврата 1, если они есть.
+memory — кривая памяти от размера батча: для каждой цели и батча в отдельном
+процессе замеряются пик RSS и аллокации tracemalloc на этапах построения
+признаков (features), препроцессинга sklearn-пайплайна с плотным выходом
+OneHotEncoder (preprocess) и вызова модели (predict). По кривой считается
+наибольший батч в пределах лимита памяти пода; отчёт — models/memory_profile.json.
+
+Цели по умолчанию: sklearn, sklearn_numpy, onnx, compiled — одна модель
+credit_default_model (DEFAULT_TARGETS); NN — nn_sklearn, nn_onnx, nn_quantized
+(см. BENCHMARK_TARGETS) или произвольная модель: --targets my=onnx:models/other.onnx.
+compare отказывается сравнивать прогоны с разных машин без --allow-other-host.
+Потоки: intra_op_threads сессии ORT, для sklearn/compiled — лимит потоков BLAS.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from threadpoolctl import threadpool_limits
+
+from sklearn.pipeline import Pipeline
+
+from src.features.build_features import AGGREGATE_COLS, add_aggregate_features
+from src.models.backends import load_backend
+from src.models.benchmark import (
+    DEFAULT_TARGETS,
+    append_history,
+    compare_runs,
+    find_run,
+    fit_memory_curve,
+    host_mismatch,
+    latency_stats,
+    load_history,
+    max_batch_within,
+    measure_memory,
+    parse_target,
+    time_calls,
+)
+from src.models.train import load_data
+
+DEFAULT_HISTORY = project_root / "models" / "benchmark_history.jsonl"
+DEFAULT_MEMORY_PROFILE = project_root / "models" / "memory_profile.json"
+
+
+def run(args):
+    """Прогон матрицы и запись в историю"""
+    _, X_test, _, _ = load_data()
+    X_test = X_test.astype(np.float32)
+
+    results, skipped = [], []
+    for spec in args.targets:
+        name, backend_name, path = parse_target(spec)
+        model_path = project_root / path
+        if not model_path.exists():
+            skipped.append({"target": name, "model_path": str(model_path)})
+            continue
+        for threads in args.threads:
+            backend = load_backend(
+                model_path, list(X_test.columns), backend_name, threads, 1
+            )
+            X_ordered = X_test[backend.feature_names].values
+            for size in args.batch_sizes:
+                X = np.resize(X_ordered, (size, X_ordered.shape[1]))
+                with threadpool_limits(limits=threads):
+                    timings = time_calls(
+                        lambda: backend.predict_proba(X), args.n_runs, args.n_warmup
+                    )
+                row = {
+                    "target": name,
+                    "backend": backend.name,
+                    "model_path": path,
+                    "model_version": backend.version,
+                    "threads": threads,
+                    "batch_size": size,
+                }
+                row.update(latency_stats(timings, size))
+                results.append(row)
+
+    run_record = {
+        "run_id": uuid.uuid4().hex[:12],
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "n_runs": args.n_runs,
+        "results": results,
+        "skipped": skipped,
+    }
+    append_history(args.history, run_record)
+
+    print(f"=== Бенчмарк инференса: прогон {run_record['run_id']} ===")
+    print(
+        f"{'цель':12s} {'потоки':>6s} {'батч':>6s} {'p50':>9s} {'p95':>9s} "
+        f"{'p99':>9s} {'max':>9s} {'cv':>6s} {'samples/sec':>14s}"
+    )
+    for r in results:
+        print(
+            f"{r['target']:12s} {r['threads']:6d} {r['batch_size']:6d} "
+            f"{r['p50_ms']:9.4f} {r['p95_ms']:9.4f} {r['p99_ms']:9.4f} "
+            f"{r['max_ms']:9.4f} {r['cv']:6.2f} {r['throughput_samples_per_sec']:14,.0f}"
+        )
+    for s in skipped:
+        print(f"{s['target']}: пропущено, нет модели {s['model_path']}")
+    print(f"История: {args.history}")
+    return 0
+
+
+def memory_point(spec, stage, X_test, size):
+    """Замер памяти одной точки кривой (выполняется в отдельном процессе)"""
+    rows_idx = np.arange(size) % len(X_test)
+    if stage == "features":
+        # Агрегаты по истории платежей, как при обучении и батч-скоринге
+        raw = X_test.drop(columns=AGGREGATE_COLS, errors="ignore").iloc[rows_idx]
+        return {
+            "target": "features",
+            "stage": stage,
+            **measure_memory(lambda: add_aggregate_features(raw)),
+        }
+
+    name, backend_name, path = parse_target(spec)
+    backend = load_backend(project_root / path, list(X_test.columns), backend_name)
+    X = X_test[backend.feature_names].values[rows_idx]
+    if stage == "predict":
+        memory = measure_memory(lambda: backend.predict_proba(X))
+    elif isinstance(getattr(backend, "model", None), Pipeline):
+        # Исходный препроцессор sklearn: плотная матрица после OneHotEncoder
+        frame = pd.DataFrame(X, columns=backend.feature_names)
+        memory = measure_memory(lambda: backend.model[:-1].transform(frame))
+    else:
+        return None
+    return {
+        "target": name,
+        "backend": backend.name,
+        "model_path": path,
+        "stage": stage,
+        **memory,
+    }
+
+
+def memory(args):
+    """Кривая памяти от размера батча и допустимый батч под лимит пода"""
+    _, X_test, _, _ = load_data()
+    X_test = X_test.astype(np.float32)
+
+    stages, skipped = [("features", "features")], []
+    for spec in args.targets:
+        name, backend_name, path = parse_target(spec)
+        if not (project_root / path).exists():
+            skipped.append({"target": name, "model_path": str(project_root / path)})
+            continue
+        stages.append((spec, "predict"))
+        if backend_name == "sklearn":
+            stages.append((spec, "preprocess"))
+
+    # Свежий процесс на точку: пик RSS и арены аллокаторов не наследуются
+    ctx = mp.get_context("spawn")
+    points = []
+    for spec, stage in stages:
+        for size in sorted(set(args.batch_sizes)):
+            with ctx.Pool(1) as pool:
+                row = pool.apply(memory_point, (spec, stage, X_test, size))
+            if row is None:
+                break
+            points.append({**row, "batch_size": size})
+            print(
+                f"{row['target']:12s} {stage:10s} batch={size:7d}: "
+                f"пик RSS {row['rss_peak_mb']:8.1f} МБ (+{row['rss_call_mb']:.1f}), "
+                f"tracemalloc пик {row['alloc_peak_mb']:8.2f} МБ"
+            )
+
+    budget_mb = args.memory_limit_mb * args.headroom / args.workers
+    curves = []
+    for key in dict.fromkeys((p["target"], p["stage"]) for p in points):
+        curve_points = [p for p in points if (p["target"], p["stage"]) == key]
+        if len(curve_points) < 2:
+            continue
+        sizes = [p["batch_size"] for p in curve_points]
+        curve = fit_memory_curve(sizes, [p["rss_peak_mb"] for p in curve_points])
+        alloc = fit_memory_curve(sizes, [p["alloc_peak_mb"] for p in curve_points])
+        curves.append(
+            {
+                "target": key[0],
+                "stage": key[1],
+                **curve,
+                "alloc_per_row_kb": alloc["per_row_kb"],
+                "max_batch_size": max_batch_within(curve, budget_mb),
+            }
+        )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "memory_limit_mb": args.memory_limit_mb,
+        "workers": args.workers,
+        "headroom": args.headroom,
+        "budget_per_worker_mb": round(budget_mb, 1),
+        "batch_sizes": sorted(set(args.batch_sizes)),
+        "curves": curves,
+        "points": points,
+        "skipped": skipped,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print(
+        f"=== Память: лимит {args.memory_limit_mb} МБ x {args.headroom:.0%} "
+        f"на {args.workers} воркер(а) = {budget_mb:.0f} МБ на воркер ==="
+    )
+    print(
+        f"{'цель':12s} {'этап':10s} {'база, МБ':>10s} {'КБ/строку':>10s} "
+        f"{'макс. батч':>12s}"
+    )
+    for c in curves:
+        limit = "без предела" if c["max_batch_size"] is None else c["max_batch_size"]
+        print(
+            f"{c['target']:12s} {c['stage']:10s} {c['fixed_mb']:10.1f} "
+            f"{c['per_row_kb']:10.3f} {limit:>12}"
+        )
+    for s in skipped:
+        print(f"{s['target']}: пропущено, нет модели {s['model_path']}")
+    print(f"Отчёт сохранён: {args.output}")
+    return 0
+
+
+def compare(args):
+    """Сравнение прогона с базовым, код возврата 1 при регрессиях"""
+    history = load_history(args.history)
+    baseline = find_run(history, args.baseline)
+    current = find_run(history, args.current)
+    mismatch = host_mismatch(baseline, current)
+    if mismatch:
+        fields = ", ".join(
+            f"{k}: {old!r} -> {new!r}" for k, (old, new) in mismatch.items()
+        )
+        if not args.allow_other_host:
+            print(
+                f"Прогоны сняты на разных машинах ({fields}), сравнение "
+                "бессмысленно; --allow-other-host — сравнить всё равно"
+            )
+            return 2
+        print(f"ВНИМАНИЕ: прогоны сняты на разных машинах ({fields})")
+    rows = compare_runs(
+        baseline,
+        current,
+        args.metrics,
+        args.threshold,
+        allow_other_host=args.allow_other_host,
+    )
+
+    print(
+        f"=== {current['run_id']} ({current.get('label')}) vs база "
+        f"{baseline['run_id']} ({baseline.get('label')}), порог {args.threshold:.0%} ==="
+    )
+    for r in rows:
+        flag = "РЕГРЕССИЯ" if r["regression"] else ""
+        print(
+            f"{r['target']:12s} threads={r['threads']} batch={r['batch_size']:6d} "
+            f"{r['metric']:26s} {r['baseline']:>12} -> {r['current']:>12} "
+            f"({r['change']:+.1%}) {flag}"
+        )
+    regressions = [r for r in rows if r["regression"]]
+    print(f"Сравнено: {len(rows)}, регрессий: {len(regressions)}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Единый бенчмарк инференса")
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="прогон и запись в историю")
+    run_parser.add_argument("--targets", nargs="+", default=list(DEFAULT_TARGETS))
+    run_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    run_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    run_parser.add_argument("--n-runs", type=int, default=100)
+    run_parser.add_argument("--n-warmup", type=int, default=5)
+    run_parser.add_argument("--label", type=str, default=None, help="например, коммит")
+    run_parser.set_defaults(func=run)
+
+    memory_parser = commands.add_parser("memory", help="память от размера батча")
+    memory_parser.add_argument("--targets", nargs="+", default=list(DEFAULT_TARGETS))
+    memory_parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 100, 1000, 10000, 50000]
+    )
+    memory_parser.add_argument(
+        "--memory-limit-mb", type=float, default=512, help="limits.memory пода"
+    )
+    memory_parser.add_argument(
+        "--workers", type=int, default=1, help="воркеров uvicorn в поде"
+    )
+    memory_parser.add_argument(
+        "--headroom", type=float, default=0.8, help="доля лимита, доступная воркерам"
+    )
+    memory_parser.add_argument("--output", type=Path, default=DEFAULT_MEMORY_PROFILE)
+    memory_parser.set_defaults(func=memory)
+
+    compare_parser = commands.add_parser("compare", help="поиск регрессий")
+    compare_parser.add_argument(
+        "--baseline", default="previous", help="run_id, метка или previous"
+    )
+    compare_parser.add_argument("--current", default="latest")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument("--metrics", nargs="+", default=["p50_ms", "p99_ms"])
+    compare_parser.add_argument(
+        "--allow-other-host",
+        action="store_true",
+        help="сравнивать прогоны с разными machine/processor (с предупреждением)",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
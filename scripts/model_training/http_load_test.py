@@ -0,0 +1,239 @@
+"""
+Нагрузочный тест HTTP API: открытая модель нагрузки с постоянной частотой запросов.
+Запросы отправляются по расписанию (i / rate) независимо от ответов, задержка
+считается от запланированного момента отправки — так очередь на стороне клиента
+и сервера не скрывается (коррекция coordinated omission); время обслуживания от
+фактической отправки пишется отдельно. Перебираются уровни частоты (--rates) и
+число одновременных соединений (--concurrency); для каждого уровня — перцентили,
+доля ошибок и достигнутая частота, для каждого числа соединений — точка насыщения.
+Уровни выше точки насыщения не прогоняются. Без --url поднимает API
+(python -m src.api.serve, с профилем SERVING_PROFILE, если он задан) на свободном порту.
+Отчёт — models/http_load_test_report.json (рядом с load_test_report.json).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.models.benchmark import find_knee, open_loop_stats
+from src.models.train import load_data
+
+
+def free_port() -> int:
+    """Свободный TCP-порт на localhost"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, ready_timeout: float = 120.0):
+    """Запускает API (python -m src.api.serve) и ждёт /ready; возвращает (процесс, url).
+
+    Как и в контейнере, профиль SERVING_PROFILE, если задан, определяет
+    модель, потоки, микробатчинг и число воркеров.
+    """
+    port = free_port()
+    env = os.environ.copy()
+    env.update(
+        {
+            "HOST": "127.0.0.1",
+            "PORT": str(port),
+            "WEB_CONCURRENCY": str(workers),
+            "LOG_LEVEL": "warning",
+        }
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.api.serve"], cwd=project_root, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn завершился с кодом {process.returncode}")
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError(f"API не стал готов за {ready_timeout} с")
+
+
+def build_payloads(endpoint: str, batch_size: int) -> list[bytes]:
+    """Тела запросов из тестовой выборки: клиент или батч клиентов"""
+    _, X_test, _, _ = load_data()
+    records = json.loads(X_test.to_json(orient="records"))
+    if not endpoint.endswith("/batch"):
+        return [json.dumps(r).encode() for r in records]
+    return [
+        json.dumps({"clients": records[i : i + batch_size]}).encode()
+        for i in range(0, len(records) - batch_size + 1, batch_size)
+    ] or [json.dumps({"clients": records[:batch_size]}).encode()]
+
+
+async def run_level(url, payloads, rate, concurrency, duration, timeout):
+    """Открытая нагрузка: rate запросов/с в течение duration секунд"""
+    n_requests = max(1, int(rate * duration))
+    samples = []
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    headers = {"Content-Type": "application/json"}
+    async with httpx.AsyncClient(
+        limits=limits, timeout=timeout, headers=headers
+    ) as client:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def send(intended, body):
+            # Ожидание свободного соединения входит в latency, но не в service_time
+            async with slots:
+                sent = time.perf_counter()
+                try:
+                    response = await client.post(url, content=body)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+            done = time.perf_counter()
+            samples.append((intended, sent, done, status))
+
+        tasks = []
+        start = time.perf_counter() + 0.05
+        for i in range(n_requests):
+            # Момент отправки по расписанию, а не после предыдущего ответа
+            intended = start + i / rate
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = payloads[i % len(payloads)]
+            tasks.append(asyncio.create_task(send(intended, body)))
+        await asyncio.gather(*tasks)
+
+    return open_loop_stats(samples, start, rate, concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-нагрузка на API (open-loop)")
+    parser.add_argument(
+        "--url", type=str, default=None, help="без --url поднимается uvicorn"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="воркеры при запуске (профиль SERVING_PROFILE важнее)",
+    )
+    parser.add_argument(
+        "--endpoint", type=str, default="/predict", help="/predict или /predict/batch"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=32, help="клиентов в запросе к /predict/batch"
+    )
+    parser.add_argument(
+        "--rates", type=float, nargs="+", default=[25, 50, 100, 200, 400]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="секунд на уровень"
+    )
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-achieved-ratio", type=float, default=0.95)
+    parser.add_argument("--p99-factor", type=float, default=3.0)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.endpoint, args.batch_size)
+    rows_per_request = args.batch_size if args.endpoint.endswith("/batch") else 1
+
+    process = None
+    if args.url is None:
+        process, base_url = start_server(args.workers)
+    else:
+        base_url = args.url.rstrip("/")
+    url = base_url + args.endpoint
+
+    report = {
+        "url": url,
+        "server_started": process is not None,
+        "workers": args.workers if process is not None else None,
+        "serving_profile": os.getenv("SERVING_PROFILE") or None,
+        "rows_per_request": rows_per_request,
+        "duration_s": args.duration,
+        "levels": [],
+        "saturation": [],
+    }
+    try:
+        # Прогрев: соединения, JIT-пути, кэши модели
+        asyncio.run(
+            run_level(
+                url, payloads, args.rates[0], args.concurrency[0], 2.0, args.timeout
+            )
+        )
+        for concurrency in args.concurrency:
+            levels = []
+            for rate in sorted(args.rates):
+                level = asyncio.run(
+                    run_level(
+                        url, payloads, rate, concurrency, args.duration, args.timeout
+                    )
+                )
+                level["achieved_rows_per_sec"] = round(
+                    level["achieved_rps"] * rows_per_request, 2
+                )
+                levels.append(level)
+                print(
+                    f"concurrency={concurrency:3d} rate={rate:7.1f}/s: "
+                    f"achieved={level['achieved_rps']:7.1f}/s, "
+                    f"p50={level['latency'].get('p50_ms')} ms, "
+                    f"p99={level['latency'].get('p99_ms')} ms "
+                    f"(обслуживание p99={level['service_time'].get('p99_ms')} ms), "
+                    f"ошибки={level['error_rate']:.2%}"
+                )
+                knee = find_knee(
+                    levels,
+                    args.max_error_rate,
+                    args.min_achieved_ratio,
+                    args.p99_factor,
+                )
+                # Выше точки насыщения очередь только растёт: следующие уровни не нужны
+                if knee["limited_by"] is not None:
+                    break
+            report["levels"].extend(levels)
+            report["saturation"].append({"concurrency": concurrency, **knee})
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    output_path = project_root / "models" / "http_load_test_report.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print(
+        "Точка насыщения (последняя частота без ошибок, просадки частоты и роста p99):"
+    )
+    for s in report["saturation"]:
+        print(
+            f"  concurrency={s['concurrency']}: {s['knee_rps']} запросов/с "
+            f"(p99 {s['knee_p99_ms']} ms), "
+            f"ограничение: {s['limited_by'] or 'не достигнуто'}"
+        )
+    print(f"Отчёт сохранён: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 """
 Нагрузочное тестирование модели: CPU (и GPU при наличии).
 Разные конфигурации (потоки, размер батча), определение рекомендуемой конфигурации.
+Сравниваются две сигнатуры входа ONNX: вход [None, 1] на каждый признак
+(model.onnx) и один тензор [None, n_features] (model_single.onnx); в замер
+входит подготовка input_feed, которую на каждый вызов делает и сервис.
 """
 
 import json
@@ -17,15 +20,16 @@ if str(project_root) not in sys.path:
 import joblib
 import onnxruntime as ort
 
+from src.models.backends import session_options
+from src.models.benchmark import latency_stats, time_calls
+from src.models.onnx_export import build_input_feed as build_feed
+from src.models.onnx_export import convert_pipeline
 from src.models.train import load_data
 
 
 def build_input_feed(X_ordered, input_names, batch_slice):
-    """Создаёт input_feed для batch_slice"""
-    return {
-        name: X_ordered[batch_slice, i : i + 1].astype(np.float32)
-        for i, name in enumerate(input_names)
-    }
+    """Создаёт input_feed для batch_slice (по колонке на вход или одна матрица)"""
+    return build_feed(input_names, X_ordered[batch_slice])
 
 
 def run_load_test(
@@ -38,30 +42,77 @@ def run_load_test(
         batch_slice = slice(0, n)
         input_feed = build_input_feed(X_ordered, input_names, batch_slice)
 
-        _ = sess.run(None, {k: v[: min(5, n)] for k, v in input_feed.items()})
-        start = time.perf_counter()
-        for _ in range(n_runs):
-            _ = sess.run(None, input_feed)
-        elapsed = time.perf_counter() - start
-
-        latency_ms = (elapsed / n_runs) * 1000
-        throughput = (n_runs * n) / elapsed
+        # Подготовка входа, вызов сессии и оба вместе (как на запросе)
+        feed_ms = float(
+            time_calls(
+                lambda: build_input_feed(X_ordered, input_names, batch_slice),
+                n_runs,
+                n_warmup,
+            ).mean()
+        )
+        latency_ms = float(
+            time_calls(lambda: sess.run(None, input_feed), n_runs, n_warmup).mean()
+        )
+        end_to_end = time_calls(
+            lambda: sess.run(
+                None, build_input_feed(X_ordered, input_names, batch_slice)
+            ),
+            n_runs,
+            n_warmup,
+        )
+        stats = latency_stats(end_to_end, n)
         results.append(
             {
                 "batch_size": n,
                 "latency_ms": round(latency_ms, 2),
-                "throughput_samples_per_sec": round(throughput, 2),
+                "feed_ms": round(feed_ms, 3),
+                "end_to_end_latency_ms": round(latency_ms + feed_ms, 2),
+                "p50_ms": stats["p50_ms"],
+                "p95_ms": stats["p95_ms"],
+                "p99_ms": stats["p99_ms"],
+                "max_ms": stats["max_ms"],
+                "std_ms": stats["std_ms"],
+                "throughput_samples_per_sec": stats["throughput_samples_per_sec"],
             }
         )
     return results
 
 
+def compare_signatures(configurations):
+    """Сравнение сигнатур входа при одинаковом числе потоков (с подготовкой входа)"""
+    by_name = {c["name"]: c for c in configurations if "batch_results" in c}
+    comparison = []
+    for name, cfg in by_name.items():
+        if not name.startswith("onnx_single_"):
+            continue
+        per_column = by_name.get(name.replace("onnx_single_", "onnx_", 1))
+        if per_column is None:
+            continue
+        for single, column in zip(cfg["batch_results"], per_column["batch_results"]):
+            comparison.append(
+                {
+                    "threads": cfg["threads"],
+                    "batch_size": single["batch_size"],
+                    "per_column_ms": column["end_to_end_latency_ms"],
+                    "single_tensor_ms": single["end_to_end_latency_ms"],
+                    "per_column_feed_ms": column["feed_ms"],
+                    "single_tensor_feed_ms": single["feed_ms"],
+                    "speedup": round(
+                        column["end_to_end_latency_ms"]
+                        / max(single["end_to_end_latency_ms"], 1e-6),
+                        2,
+                    ),
+                }
+            )
+    return comparison
+
+
 def create_session(model_path, providers=None, threads=0):
-    """Создаёт InferenceSession с указанными провайдерами и потоками"""
-    opts = ort.SessionOptions()
-    if threads > 0:
-        opts.intra_op_num_threads = threads
-        opts.inter_op_num_threads = threads
+    """Создаёт InferenceSession с указанными провайдерами и потоками.
+
+    Предоптимизированный граф (optimize_graph.py) не оптимизируется повторно.
+    """
+    opts = session_options(model_path, threads, threads)
     return ort.InferenceSession(
         str(model_path),
         sess_options=opts,
@@ -71,6 +122,8 @@ def create_session(model_path, providers=None, threads=0):
 
 def main():
     onnx_path = project_root / "models" / "model.onnx"
+    single_path = project_root / "models" / "model_single.onnx"
+    optimized_path = project_root / "models" / "model_optimized.onnx"
     quantized_path = project_root / "models" / "model_quantized.onnx"
 
     if not onnx_path.exists():
@@ -84,6 +137,11 @@ def main():
     feature_names = list(model.feature_names_in_)
     X_ordered = X_test[feature_names].values
 
+    if not single_path.exists():
+        # Граф с одним входом [None, n_features] для сравнения сигнатур
+        onx = convert_pipeline(model, feature_names, single_input=True)
+        single_path.write_bytes(onx.SerializeToString())
+
     # Провайдеры: CPU (и GPU при наличии)
     providers = ort.get_available_providers()
     has_cuda = "CUDAExecutionProvider" in providers
@@ -113,7 +171,18 @@ def main():
         ("onnx_cpu_2threads", onnx_path, cpu_providers, 2),
         ("onnx_cpu_4threads", onnx_path, cpu_providers, 4),
         ("onnx_cpu_8threads", onnx_path, cpu_providers, 8),
+        ("onnx_single_cpu_1thread", single_path, cpu_providers, 1),
+        ("onnx_single_cpu_2threads", single_path, cpu_providers, 2),
+        ("onnx_single_cpu_4threads", single_path, cpu_providers, 4),
+        ("onnx_single_cpu_8threads", single_path, cpu_providers, 8),
     ]
+    if optimized_path.exists():
+        configs.extend(
+            [
+                ("onnx_optimized_cpu_1thread", optimized_path, cpu_providers, 1),
+                ("onnx_optimized_cpu_4threads", optimized_path, cpu_providers, 4),
+            ]
+        )
     if quantized_path.exists():
         configs.extend(
             [
@@ -134,7 +203,9 @@ def main():
         seen.add(key)
 
         try:
+            start = time.perf_counter()
             sess = create_session(model_path, provs, threads)
+            session_init_ms = (time.perf_counter() - start) * 1000
             input_names = [inp.name for inp in sess.get_inputs()]
             results = run_load_test(
                 sess, X_ordered, input_names, batch_sizes, n_runs, n_warmup
@@ -145,6 +216,7 @@ def main():
                     "model": model_path.name,
                     "provider": provs[0],
                     "threads": threads,
+                    "session_init_ms": round(session_init_ms, 2),
                     "batch_results": results,
                 }
             )
@@ -156,6 +228,8 @@ def main():
                 }
             )
 
+    report["signature_comparison"] = compare_signatures(report["configurations"])
+
     # Рекомендации
     valid = [
         c for c in report["configurations"] if "batch_results" in c
@@ -181,11 +255,25 @@ def main():
                             "latency_ms": br["latency_ms"],
                         }
 
-        report["recommendations"]["summary"] = (
-            "Для production: quantized_cpu_4threads при batch 100-500. "
-            "Для real-time (latency < 1ms): quantized, batch 1. "
-            "Для batch: onnx_cpu_4threads или quantized_cpu_4threads."
+        # Сводка — из замеров выше; конфигурацию сервинга (потоки, микробатч,
+        # воркеры под бюджет CPU и SLO) подбирает tune_serving.py
+        recommendations = report["recommendations"]
+        summary = []
+        if "best_latency_single" in recommendations:
+            best = recommendations["best_latency_single"]
+            summary.append(
+                f"Минимальная задержка batch=1: {best['config']} ({best['latency_ms']} ms)."
+            )
+        if "best_throughput" in recommendations:
+            best = recommendations["best_throughput"]
+            summary.append(
+                f"Максимальная пропускная способность: {best['config']} "
+                f"({best['throughput']:,.0f} samples/sec)."
+            )
+        summary.append(
+            "Профиль сервинга: python scripts/model_training/tune_serving.py"
         )
+        recommendations["summary"] = " ".join(summary)
 
     output_path = project_root / "models" / "load_test_report.json"
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -204,10 +292,18 @@ def main():
             for br in cfg["batch_results"][:4]:
                 print(
                     f"  batch={br['batch_size']:5d}: "
-                    f"{br['latency_ms']:7.2f} ms, "
+                    f"{br['latency_ms']:7.2f} ms (p99 {br['p99_ms']:7.2f} ms), "
                     f"{br['throughput_samples_per_sec']:,.0f} samples/sec"
                 )
             print()
+    print("Сигнатура входа: [None, 1] на признак vs [None, n_features] (с подготовкой входа):")
+    for row in report["signature_comparison"]:
+        print(
+            f"  threads={row['threads']} batch={row['batch_size']:5d}: "
+            f"{row['per_column_ms']:7.2f} ms vs {row['single_tensor_ms']:7.2f} ms "
+            f"(x{row['speedup']})"
+        )
+    print()
     print("Рекомендации:")
     for k, v in report["recommendations"].items():
         if k != "summary" and isinstance(v, dict):
@@ -0,0 +1,120 @@
+"""
+Замер памяти воркеров API с отображением модели в память (mmap) и без него.
+Запускает N процессов, как uvicorn --workers N: каждый загружает модель,
+делает одно предсказание и сообщает RSS/PSS/shared до и после загрузки.
+Процессы держат модель, пока не отчитаются все, чтобы разделяемые страницы
+учитывались в PSS одновременно. Результаты — в models/worker_memory_report.json.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import sys
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.models.backends import load_backend
+from src.models.memory import process_memory
+
+
+def worker(model_path, mmap, barrier, results):
+    """Процесс-воркер: загрузка модели, одно предсказание, замер памяти"""
+    before = process_memory()
+    backend = load_backend(model_path, [], mmap=mmap)
+    backend.predict_proba(np.zeros((1, len(backend.feature_names)), dtype=np.float32))
+    after = process_memory()
+    results.put({"before_load": before, "after_load": after})
+    # Не выходим, пока все воркеры не загрузили модель
+    barrier.wait()
+
+
+def run_workers(model_path, n_workers, mmap):
+    """Метод запускает воркеры и возвращает их отчёты о памяти"""
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers + 1)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(str(model_path), mmap, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for p in processes:
+        p.start()
+    reports = [results.get(timeout=300) for _ in processes]
+    barrier.wait()
+    for p in processes:
+        p.join()
+    return reports
+
+
+def summarize(reports):
+    """Метод считает средние по воркерам и суммарный PSS (память пода), МБ"""
+
+    def mean_mb(stage, kind):
+        values = [r[stage].get(kind) for r in reports]
+        if any(v is None for v in values):
+            return None
+        return round(float(np.mean(values)) / 2**20, 2)
+
+    summary = {
+        f"{stage}_{kind}_mb": mean_mb(stage, kind)
+        for stage in ("before_load", "after_load")
+        for kind in ("rss", "pss", "shared")
+    }
+    if summary["after_load_rss_mb"] is not None:
+        summary["rss_delta_mb"] = round(
+            summary["after_load_rss_mb"] - summary["before_load_rss_mb"], 2
+        )
+    pss = [r["after_load"].get("pss") for r in reports]
+    if all(v is not None for v in pss):
+        summary["total_pss_mb"] = round(sum(pss) / 2**20, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память воркеров: mmap vs копия")
+    parser.add_argument(
+        "--model-path",
+        type=str,
+        default=str(project_root / "models" / "credit_default_model.pkl"),
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"Модель не найдена: {model_path}. Запустите: python -m src.models.train"
+        )
+
+    results = {
+        "model_path": str(model_path),
+        "model_size_mb": round(model_path.stat().st_size / 2**20, 2),
+        "workers": args.workers,
+    }
+    for mode, mmap in (("copy", False), ("mmap", True)):
+        reports = run_workers(model_path, args.workers, mmap)
+        results[mode] = {"summary": summarize(reports), "per_worker": reports}
+
+    output_path = project_root / "models" / "worker_memory_report.json"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(
+        f"=== Память {args.workers} воркеров, модель {results['model_size_mb']} МБ ==="
+    )
+    for mode in ("copy", "mmap"):
+        s = results[mode]["summary"]
+        print(
+            f"{mode}: RSS до={s['before_load_rss_mb']} МБ, после={s['after_load_rss_mb']} МБ, "
+            f"shared={s['after_load_shared_mb']} МБ, PSS пода={s.get('total_pss_mb')} МБ"
+        )
+    print(f"Результаты сохранены: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
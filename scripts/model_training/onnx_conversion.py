@@ -1,8 +1,13 @@
 """
-Конвертация обученной NN-модели (sklearn Pipeline с MLPClassifier) в ONNX.
-Загружает models/credit_nn.pkl и сохраняет models/model.onnx.
+Конвертация обученного sklearn-пайплайна в ONNX.
+Поддерживаются NN (MLPClassifier, models/credit_nn.pkl -> models/model.onnx)
+и основная модель GradientBoosting (models/credit_default_model.pkl ->
+models/credit_default_model.onnx, граф на TreeEnsembleClassifier).
+С --single-input граф принимает один тензор [None, n_features] (файл *_single.onnx).
+Вероятности — тензор [N, 2]; --zipmap возвращает старый выход-список словарей.
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -11,35 +16,64 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 import joblib
-from skl2onnx import convert_sklearn
-from skl2onnx.common.data_types import FloatTensorType
+
+from src.models.onnx_export import convert_pipeline, onnx_path_for, operator_types
+
 
 def main():
-    model_path = project_root / "models" / "credit_nn.pkl"
+    parser = argparse.ArgumentParser(description="Конвертация пайплайна в ONNX")
+    parser.add_argument(
+        "--model-path",
+        type=str,
+        default=str(project_root / "models" / "credit_nn.pkl"),
+        help="credit_nn.pkl (MLP) или credit_default_model.pkl (GradientBoosting)",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="по умолчанию — рядом с моделью"
+    )
+    parser.add_argument(
+        "--single-input",
+        action="store_true",
+        help="один вход float32 [None, n_features] вместо входа на каждый признак",
+    )
+    parser.add_argument(
+        "--zipmap",
+        action="store_true",
+        help="output_probability как ZipMap (список словарей) вместо тензора [N, 2]",
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
     if not model_path.exists():
         raise FileNotFoundError(
-            f"Модель не найдена: {model_path}. Сначала запустите: python scripts/model_training/train_nn.py"
+            f"Модель не найдена: {model_path}. Сначала обучите её: "
+            "python scripts/model_training/train_nn.py или python -m src.models.train"
         )
 
     # Загрузка обученной модели
     model = joblib.load(model_path)
-
     feature_names = list(model.feature_names_in_)
-    initial_type = [
-        (name, FloatTensorType([None, 1])) for name in feature_names
-    ]
 
     # Конвертация в ONNX
-    onx = convert_sklearn(model, initial_types=initial_type)
+    onx = convert_pipeline(
+        model, feature_names, single_input=args.single_input, zipmap=args.zipmap
+    )
 
     # Сохранение ONNX модели
-    onnx_path = project_root / "models" / "model.onnx"
+    onnx_path = (
+        Path(args.output)
+        if args.output
+        else onnx_path_for(model_path, single_input=args.single_input)
+    )
     onnx_path.parent.mkdir(parents=True, exist_ok=True)
     with open(onnx_path, "wb") as f:
         f.write(onx.SerializeToString())
 
+    print(f"Модель: {model_path} ({type(model[-1]).__name__})")
     print(f"ONNX модель сохранена: {onnx_path}")
-    print(f"Входных признаков: {len(feature_names)}")
+    signature = "[None, n_features]" if args.single_input else "[None, 1] на признак"
+    print(f"Входных признаков: {len(feature_names)}, вход: {signature}")
+    print(f"Операторы графа: {', '.join(operator_types(onx))}")
 
 
 if __name__ == "__main__":
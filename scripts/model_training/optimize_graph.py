@@ -0,0 +1,161 @@
+"""
+Офлайн-оптимизация графа ONNX Runtime.
+Для каждого уровня (disable, basic, extended, layout — если он есть в
+установленной версии onnxruntime, all) ORT оптимизирует граф
+и сохраняет его; замеряется создание сессии и задержка одного вызова на
+сохранённом графе. Лучший уровень сохраняется как <модель>_optimized.onnx,
+настройки и замеры — в <модель>_optimized.json. API и бенчмарки загружают
+такой граф без повторной оптимизации (см. src.models.backends.session_options).
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import onnxruntime as ort
+
+from src.models.backends import OnnxBackend, model_version
+from src.models.benchmark import latency_stats, time_calls
+from src.models.train import load_data
+
+# ORT_ENABLE_LAYOUT есть не во всех версиях onnxruntime из requirements.txt
+LEVELS = [
+    level
+    for level in (
+        "ORT_DISABLE_ALL",
+        "ORT_ENABLE_BASIC",
+        "ORT_ENABLE_EXTENDED",
+        "ORT_ENABLE_LAYOUT",
+        "ORT_ENABLE_ALL",
+    )
+    if hasattr(ort.GraphOptimizationLevel, level)
+]
+
+
+def create_session(model_path, level, threads=1, optimized_path=None):
+    """Метод создаёт сессию на уровне level и возвращает её и время создания, мс"""
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = threads
+    opts.inter_op_num_threads = 1
+    opts.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level)
+    if optimized_path is not None:
+        opts.optimized_model_filepath = str(optimized_path)
+    start = time.perf_counter()
+    session = ort.InferenceSession(
+        str(model_path), sess_options=opts, providers=["CPUExecutionProvider"]
+    )
+    return session, (time.perf_counter() - start) * 1000
+
+
+def median_init_ms(model_path, level, threads=1, n=3):
+    """Медиана времени создания сессии, мс"""
+    return round(
+        float(
+            np.median([create_session(model_path, level, threads)[1] for _ in range(n)])
+        ),
+        2,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-оптимизация графа ORT")
+    parser.add_argument(
+        "--model-path", type=str, default=str(project_root / "models" / "model.onnx")
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--n-runs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
+    if not model_path.exists():
+        raise FileNotFoundError(
+            f"ONNX модель не найдена: {model_path}. Запустите: "
+            "python scripts/model_training/onnx_conversion.py"
+        )
+    output_path = model_path.with_name(model_path.stem + "_optimized.onnx")
+    meta_path = output_path.with_suffix(".json")
+
+    _, X_test, _, _ = load_data()
+
+    levels, paths = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for level in LEVELS:
+            level_path = paths[level] = Path(tmp) / f"{level.lower()}.onnx"
+            # Оптимизация на уровне level и сохранение результата
+            _, optimize_ms = create_session(
+                model_path, level, args.threads, optimized_path=level_path
+            )
+            # Сохранённый граф грузится без повторной оптимизации
+            session, _ = create_session(level_path, "ORT_DISABLE_ALL", args.threads)
+            backend = OnnxBackend(session, [])
+            X_ordered = X_test[backend.feature_names].values.astype(np.float32)
+            latency = {}
+            for size in args.batch_sizes:
+                X = np.resize(X_ordered, (size, X_ordered.shape[1]))
+                timings = time_calls(
+                    lambda: backend.predict_proba(X), args.n_runs, n_warmup=10
+                )
+                latency[str(size)] = latency_stats(timings, size)
+            levels.append(
+                {
+                    "graph_optimization_level": level,
+                    "session_init_ms": median_init_ms(model_path, level, args.threads),
+                    "first_optimize_and_save_ms": round(optimize_ms, 2),
+                    "preoptimized_init_ms": median_init_ms(
+                        level_path, "ORT_DISABLE_ALL", args.threads
+                    ),
+                    "size_mb": round(level_path.stat().st_size / 2**20, 4),
+                    "latency": latency,
+                }
+            )
+
+        # Лучший уровень — минимальная сумма p50 по размерам батча
+        best = min(
+            levels, key=lambda r: sum(v["p50_ms"] for v in r["latency"].values())
+        )
+        shutil.copyfile(paths[best["graph_optimization_level"]], output_path)
+
+    metadata = {
+        "source_model": str(model_path),
+        "source_version": model_version(model_path),
+        "optimized_model": str(output_path),
+        "graph_optimization_level": best["graph_optimization_level"],
+        "onnxruntime_version": ort.__version__,
+        "intra_op_threads": args.threads,
+        "providers": ["CPUExecutionProvider"],
+        # Уровни layout/all могут вставлять операторы под конкретный CPU
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "levels": levels,
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    print(f"=== Оптимизация графа ORT: {model_path.name} ===")
+    for r in levels:
+        p50 = ", ".join(f"b{size}={v['p50_ms']}" for size, v in r["latency"].items())
+        print(
+            f"{r['graph_optimization_level']:20s} init={r['session_init_ms']} мс, "
+            f"init (готовый граф)={r['preoptimized_init_ms']} мс, p50 мс: {p50}"
+        )
+    print(f"Лучший уровень: {best['graph_optimization_level']}")
+    print(f"Оптимизированная модель: {output_path}")
+    print(f"Метаданные: {meta_path}")
+
+
+if __name__ == "__main__":
+    main()
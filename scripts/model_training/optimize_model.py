@@ -1,11 +1,18 @@
 """
 Оптимизация модели: quantization ONNX.
-Замер размера, скорости и метрик до/после, запись отчёта в models/optimization_report.json.
+Варианты: динамическая int8 и статическая QDQ с калибровкой на выборке train.csv
+(методы калибровки x per-channel x reduce-range). Для каждого — размер, скорость и AUC;
+варианты с падением AUC больше --auc-budget отбрасываются, самый быстрый из
+оставшихся сохраняется в models/model_quantized.onnx.
+Отчёт — models/optimization_report.json.
 """
 
+import argparse
 import json
+import shutil
 import sys
-import time
+import tempfile
+from itertools import product
 from pathlib import Path
 
 import numpy as np
@@ -18,6 +25,18 @@ import joblib
 import onnxruntime as ort
 from onnxruntime.quantization import QuantType, quantize_dynamic
 
+from src.models.backends import session_options
+from src.models.benchmark import latency_stats, time_calls
+from src.models.onnx_export import (
+    build_input_feed,
+    probability_column,
+    probability_output,
+)
+from src.models.quantization import (
+    CALIBRATION_METHODS,
+    calibration_sample,
+    quantize_static_qdq,
+)
 from src.models.train import load_data
 from sklearn.metrics import roc_auc_score
 
@@ -26,21 +45,56 @@ def get_file_size_mb(path: Path) -> float:
     return path.stat().st_size / (1024 * 1024)
 
 
-def benchmark_onnx(sess, input_feed, n_samples, n_warmup=10, n_runs=100):
-    _ = sess.run(None, {k: v[:n_warmup] for k, v in input_feed.items()})
-    start = time.perf_counter()
-    for _ in range(n_runs):
-        _ = sess.run(None, input_feed)
-    elapsed = time.perf_counter() - start
-    return elapsed / n_runs, n_runs / elapsed * n_samples
+def get_proba_from_onnx(sess, input_feed):
+    (proba_output,) = sess.run([probability_output(sess)], input_feed)
+    return probability_column(proba_output)
 
 
-def get_proba_from_onnx(sess, input_feed):
-    _, proba_output = sess.run(["output_label", "output_probability"], input_feed)
-    return np.array([p[1] for p in proba_output], dtype=np.float32)
+def evaluate_variant(path, input_feed, y_test, n_samples):
+    """Размер, latency, throughput и AUC ONNX-модели на тестовой выборке.
+
+    Возвращает метрики для отчёта и неокруглённый AUC для проверки бюджета.
+    """
+    sess = ort.InferenceSession(str(path), session_options(path))
+    proba = get_proba_from_onnx(sess, input_feed)
+    auc = roc_auc_score(y_test, proba)
+    stats = latency_stats(
+        time_calls(lambda: sess.run(None, input_feed), n_runs=100, n_warmup=10),
+        n_samples,
+    )
+    metrics = {
+        "size_mb": round(get_file_size_mb(path), 4),
+        "latency_ms": stats["mean_ms"],
+        "p50_ms": stats["p50_ms"],
+        "p99_ms": stats["p99_ms"],
+        "throughput_samples_per_sec": stats["throughput_samples_per_sec"],
+        "auc": round(auc, 4),
+    }
+    return metrics, auc
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Квантизация ONNX с контролем AUC")
+    parser.add_argument(
+        "--auc-budget",
+        type=float,
+        default=0.005,
+        help="допустимое падение AUC относительно float32",
+    )
+    parser.add_argument(
+        "--calibration-size",
+        type=int,
+        default=1000,
+        help="строк train.csv для калибровки статической квантизации",
+    )
+    parser.add_argument(
+        "--calibration-methods",
+        nargs="+",
+        default=list(CALIBRATION_METHODS),
+        choices=CALIBRATION_METHODS,
+    )
+    args = parser.parse_args()
+
     onnx_path = project_root / "models" / "model.onnx"
     quantized_path = project_root / "models" / "model_quantized.onnx"
     sklearn_path = project_root / "models" / "credit_nn.pkl"
@@ -50,7 +104,7 @@ def main():
             f"ONNX модель не найдена: {onnx_path}. Запустите: python scripts/model_training/onnx_conversion.py"
         )
 
-    _, X_test, _, y_test = load_data()
+    X_train, X_test, _, y_test = load_data()
     X_test = X_test.astype(np.float32)
     n_samples = len(X_test)
 
@@ -58,65 +112,114 @@ def main():
     model_sklearn = joblib.load(sklearn_path)
     feature_names = list(model_sklearn.feature_names_in_)
     X_ordered = X_test[feature_names].values
+    X_calibration = calibration_sample(
+        X_train[feature_names].values.astype(np.float32), args.calibration_size
+    )
 
-    sess_orig = ort.InferenceSession(str(onnx_path))
+    sess_orig = ort.InferenceSession(str(onnx_path), session_options(onnx_path))
     input_names = [inp.name for inp in sess_orig.get_inputs()]
-    input_feed = {
-        name: X_ordered[:, i : i + 1].astype(np.float32)
-        for i, name in enumerate(input_names)
-    }
+    input_feed = build_input_feed(input_names, X_ordered)
 
     # Размер и метрики ДО
-    size_before_mb = get_file_size_mb(onnx_path)
-    proba_before = get_proba_from_onnx(sess_orig, input_feed)
-    auc_before = roc_auc_score(y_test, proba_before)
-    latency_before, throughput_before = benchmark_onnx(
-        sess_orig, input_feed, n_samples
-    )
+    before = {"model_path": str(onnx_path)}
+    metrics, auc_before = evaluate_variant(onnx_path, input_feed, y_test, n_samples)
+    before.update(metrics)
 
-    # Квантизация
-    quantize_dynamic(
-        model_input=str(onnx_path),
-        model_output=str(quantized_path),
-        weight_type=QuantType.QInt8,
-        per_channel=False,
-        reduce_range=False,
-    )
+    variants = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Динамическая квантизация: веса int8, активации квантуются на лету
+        dynamic_path = Path(tmp) / "dynamic_int8.onnx"
+        quantize_dynamic(
+            model_input=str(onnx_path),
+            model_output=str(dynamic_path),
+            weight_type=QuantType.QInt8,
+            per_channel=False,
+            reduce_range=False,
+        )
+        candidates = [({"name": "dynamic_int8", "mode": "dynamic"}, dynamic_path)]
 
-    # Размер и метрики ПОСЛЕ
-    size_after_mb = get_file_size_mb(quantized_path)
-    sess_quant = ort.InferenceSession(str(quantized_path))
-    proba_after = get_proba_from_onnx(sess_quant, input_feed)
-    auc_after = roc_auc_score(y_test, proba_after)
-    latency_after, throughput_after = benchmark_onnx(
-        sess_quant, input_feed, n_samples
-    )
+        # Статическая QDQ: диапазоны активаций по калибровочной выборке
+        for method, per_channel, reduce_range in product(
+            args.calibration_methods, [False, True], [False, True]
+        ):
+            name = f"static_qdq_{method.lower()}"
+            name += "_per_channel" if per_channel else "_per_tensor"
+            name += "_reduce_range" if reduce_range else ""
+            path = quantize_static_qdq(
+                onnx_path,
+                Path(tmp) / f"{name}.onnx",
+                X_calibration,
+                method=method,
+                per_channel=per_channel,
+                reduce_range=reduce_range,
+            )
+            candidates.append(
+                (
+                    {
+                        "name": name,
+                        "mode": "static",
+                        "calibration_method": method,
+                        "per_channel": per_channel,
+                        "reduce_range": reduce_range,
+                    },
+                    path,
+                )
+            )
+
+        for variant, path in candidates:
+            metrics, auc = evaluate_variant(path, input_feed, y_test, n_samples)
+            variant.update(metrics)
+            variant["auc_diff"] = round(auc - auc_before, 4)
+            variant["speedup"] = round(
+                variant["throughput_samples_per_sec"]
+                / before["throughput_samples_per_sec"],
+                2,
+            )
+            # Бюджет сравнивается с неокруглённой разницей AUC
+            variant["within_budget"] = auc - auc_before >= -args.auc_budget
+            variants.append(variant)
+
+        # Самый быстрый вариант в пределах бюджета AUC
+        passed = [(v, p) for v, p in candidates if v["within_budget"]]
+        best = None
+        if passed:
+            best, best_path = max(
+                passed, key=lambda c: c[0]["throughput_samples_per_sec"]
+            )
+            shutil.copyfile(best_path, quantized_path)
+        else:
+            # Иначе сервис и бенчмарки подхватили бы артефакт прошлого запуска
+            quantized_path.unlink(missing_ok=True)
 
     # Отчёт
     report = {
-        "optimization": "dynamic_quantization_int8",
-        "before": {
-            "model_path": str(onnx_path),
-            "size_mb": round(size_before_mb, 4),
-            "latency_ms": round(latency_before * 1000, 4),
-            "throughput_samples_per_sec": round(throughput_before, 2),
-            "auc": round(auc_before, 4),
+        "optimization": best["name"] if best else None,
+        "auc_budget": args.auc_budget,
+        "calibration": {
+            "source": "data/processed/train.csv",
+            "n_samples": len(X_calibration),
+            "methods": args.calibration_methods,
         },
-        "after": {
+        "before": before,
+        "after": None,
+        "delta": None,
+        "variants": variants,
+    }
+    if best:
+        report["after"] = {
             "model_path": str(quantized_path),
-            "size_mb": round(size_after_mb, 4),
-            "latency_ms": round(latency_after * 1000, 4),
-            "throughput_samples_per_sec": round(throughput_after, 2),
-            "auc": round(auc_after, 4),
-        },
-        "delta": {
+            **{
+                k: best[k]
+                for k in ("size_mb", "latency_ms", "throughput_samples_per_sec", "auc")
+            },
+        }
+        report["delta"] = {
             "size_reduction_percent": round(
-                (1 - size_after_mb / size_before_mb) * 100, 2
+                (1 - best["size_mb"] / before["size_mb"]) * 100, 2
             ),
-            "speedup": round(throughput_after / throughput_before, 2),
-            "auc_diff": round(auc_after - auc_before, 4),
-        },
-    }
+            "speedup": best["speedup"],
+            "auc_diff": best["auc_diff"],
+        }
 
     output_path = project_root / "models" / "optimization_report.json"
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -131,18 +234,34 @@ def main():
     print(f"  Throughput: {report['before']['throughput_samples_per_sec']} samples/sec")
     print(f"  AUC: {report['before']['auc']}")
     print()
-    print("ПОСЛЕ оптимизации (int8 dynamic quantization):")
-    print(f"  Размер: {report['after']['size_mb']} MB")
-    print(f"  Latency: {report['after']['latency_ms']} ms")
-    print(f"  Throughput: {report['after']['throughput_samples_per_sec']} samples/sec")
-    print(f"  AUC: {report['after']['auc']}")
-    print()
-    print("Изменения:")
-    print(f"  Сжатие: {report['delta']['size_reduction_percent']}%")
-    print(f"  Ускорение: {report['delta']['speedup']}x")
-    print(f"  Delta AUC: {report['delta']['auc_diff']:+.4f}")
+    print(f"Варианты (бюджет падения AUC: {args.auc_budget}):")
+    for v in variants:
+        status = "OK" if v["within_budget"] else "ОТКЛОНЁН"
+        print(
+            f"  {v['name']:47s} {v['size_mb']:.4f} MB, {v['latency_ms']:.4f} ms, "
+            f"x{v['speedup']}, AUC {v['auc']} ({v['auc_diff']:+.4f}) {status}"
+        )
     print()
-    print(f"Квантизированная модель: {quantized_path}")
+    if best is None:
+        print(
+            "ВНИМАНИЕ: ни один вариант не уложился в бюджет AUC, "
+            f"модель не сохранена, {quantized_path.name} удалён"
+        )
+    else:
+        print(f"ПОСЛЕ оптимизации ({best['name']}):")
+        print(f"  Размер: {report['after']['size_mb']} MB")
+        print(f"  Latency: {report['after']['latency_ms']} ms")
+        print(
+            f"  Throughput: {report['after']['throughput_samples_per_sec']} samples/sec"
+        )
+        print(f"  AUC: {report['after']['auc']}")
+        print()
+        print("Изменения:")
+        print(f"  Сжатие: {report['delta']['size_reduction_percent']}%")
+        print(f"  Ускорение: {report['delta']['speedup']}x")
+        print(f"  Delta AUC: {report['delta']['auc_diff']:+.4f}")
+        print()
+        print(f"Квантизированная модель: {quantized_path}")
     print(f"Отчёт сохранён: {output_path}")
 
 
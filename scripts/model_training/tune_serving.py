@@ -0,0 +1,300 @@
+"""
+Подбор конфигурации сервинга под бюджет CPU и SLO по p99.
+Перебор: вариант модели x intra/inter-op потоки x размер микробатча x воркеры.
+Задержка вызова модели замеряется на каждом (вариант, потоки, батч); воркеры
+и микробатчинг оцениваются по замерам: воркер обрабатывает батч за раз,
+ёмкость = воркеры x батч / (время вызова + накладные расходы запросов),
+p99 запроса = ожидание сборки микробатча + p99 вызова + накладные расходы.
+CPU конфигурации = воркеры x intra x inter потоков, не больше --cpu-budget
+(по умолчанию — квота cgroup контейнера); при бюджете меньше ядра поток
+получает только его долю. Микробатч больше MAX_CONCURRENT_REQUESTS не
+наберётся, такие размеры не перебираются; лимит пишется в профиль.
+Лучшая допустимая конфигурация пишется в models/serving_profile.json: API и
+ConfigMap загружают её через SERVING_PROFILE (src/api/profile.py).
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[2]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from threadpoolctl import threadpool_limits
+
+from src.api.profile import cgroup_cpu_limit
+from src.models.backends import load_backend
+from src.models.benchmark import (
+    latency_stats,
+    parse_target,
+    time_calls,
+)
+from src.models.train import load_data
+
+# Варианты одной и той же модели API (MODEL_PATH по умолчанию): тюнер выбирает
+# способ её исполнения, а не другую модель. Для NN: --variants nn_sklearn nn_onnx
+# nn_quantized
+TUNING_VARIANTS = ["sklearn", "compiled", "onnx"]
+
+
+def blas_threads(backend_name: str, intra: int) -> int:
+    """Метод возвращает лимит потоков BLAS/OpenMP для варианта.
+
+    У ORT свой пул (intra x inter), BLAS ему не нужен; sklearn и compiled
+    считаются в numpy, и их потоки ограничиваются тем же intra.
+    """
+    return 1 if backend_name == "onnx" else intra
+
+
+def measure_calls(args, X_test):
+    """Замер вызова модели для каждого (вариант, intra, inter, батч)"""
+    measurements = []
+    for spec in args.variants:
+        name, backend_name, path = parse_target(spec)
+        model_path = project_root / path
+        if not model_path.exists():
+            print(f"{name}: пропущен, нет модели {model_path}")
+            continue
+        is_onnx = backend_name == "onnx"
+        inter_values = args.inter_threads if is_onnx else [1]
+        for intra, inter in product(args.intra_threads, inter_values):
+            backend = load_backend(
+                model_path, list(X_test.columns), backend_name, intra, inter
+            )
+            X_ordered = X_test[backend.feature_names].values
+            for size in sorted({max(b, 1) for b in args.microbatch_sizes}):
+                X = np.resize(X_ordered, (size, X_ordered.shape[1]))
+                with threadpool_limits(limits=blas_threads(backend_name, intra)):
+                    timings = time_calls(
+                        lambda: backend.predict_proba(X), args.n_runs, n_warmup=10
+                    )
+                stats = latency_stats(timings, size)
+                measurements.append(
+                    {
+                        "variant": name,
+                        "backend": backend.name,
+                        "model_path": path,
+                        "intra_op_threads": intra,
+                        "inter_op_threads": inter,
+                        "batch_size": size,
+                        "call_p50_ms": stats["p50_ms"],
+                        "call_p99_ms": stats["p99_ms"],
+                    }
+                )
+    return measurements
+
+
+def estimate(measurement, microbatch, workers, args):
+    """Оценка ёмкости и p99 конфигурации по замеру вызова модели"""
+    size = max(microbatch, 1)
+    wait_ms = args.microbatch_wait_ms if microbatch else 0.0
+    cpu = workers * measurement["intra_op_threads"] * measurement["inter_op_threads"]
+    # При лимите меньше ядра (500m) квота CFS даёт потоку только долю времени
+    share = min(1.0, args.cpu_budget / cpu)
+    # Запрос: своя доля вызова модели + накладные расходы HTTP/JSON в воркере
+    per_request_ms = (
+        measurement["call_p50_ms"] / size + args.request_overhead_ms
+    ) / share
+    capacity = workers * 1000 / per_request_ms
+    return {
+        "variant": measurement["variant"],
+        "backend": measurement["backend"],
+        "model_path": measurement["model_path"],
+        "intra_op_threads": measurement["intra_op_threads"],
+        "inter_op_threads": measurement["inter_op_threads"],
+        "microbatch_size": microbatch,
+        "workers": workers,
+        "cpu": cpu,
+        "cpu_share": round(share, 3),
+        "call_p50_ms": measurement["call_p50_ms"],
+        "call_p99_ms": measurement["call_p99_ms"],
+        "est_capacity_rps": round(capacity, 1),
+        "est_p99_ms": round(
+            wait_ms + (measurement["call_p99_ms"] + args.request_overhead_ms) / share,
+            3,
+        ),
+    }
+
+
+def serving_env(config, args) -> dict:
+    """Переменные окружения API для конфигурации (раздел env профиля)"""
+    return {
+        "MODEL_PATH": config["model_path"],
+        "MODEL_BACKEND": config["backend"],
+        "ORT_INTRA_OP_THREADS": str(config["intra_op_threads"]),
+        "ORT_INTER_OP_THREADS": str(config["inter_op_threads"]),
+        # API применяет его через threadpoolctl: CPU = воркеры x intra x inter
+        "OMP_NUM_THREADS": str(
+            blas_threads(config["backend"], config["intra_op_threads"])
+        ),
+        "MICROBATCH_ENABLED": "true" if config["microbatch_size"] else "false",
+        "MICROBATCH_MAX_SIZE": str(max(config["microbatch_size"], 1)),
+        "MICROBATCH_MAX_WAIT_MS": str(args.microbatch_wait_ms),
+        "MAX_CONCURRENT_REQUESTS": str(args.max_concurrent_requests),
+        "WEB_CONCURRENCY": str(config["workers"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор конфигурации сервинга")
+    parser.add_argument(
+        "--cpu-budget",
+        type=float,
+        default=cgroup_cpu_limit(),
+        help="ядер на под (resources.limits.cpu); по умолчанию — квота cgroup",
+    )
+    parser.add_argument("--p99-slo-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--target-rps",
+        type=float,
+        default=None,
+        help="требуемая нагрузка на под; без неё — максимум ёмкости",
+    )
+    parser.add_argument(
+        "--max-utilization",
+        type=float,
+        default=0.7,
+        help="доля ёмкости, выше которой очередь начинает расти",
+    )
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        default=TUNING_VARIANTS,
+        help="имя=бэкенд:путь или имя из BENCHMARK_TARGETS",
+    )
+    parser.add_argument("--intra-threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--inter-threads", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--microbatch-sizes",
+        type=int,
+        nargs="+",
+        default=[0, 8, 32, 64],
+        help="0 — без микробатчинга",
+    )
+    parser.add_argument("--microbatch-wait-ms", type=float, default=2.0)
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        default=int(os.getenv("MAX_CONCURRENT_REQUESTS", "32")),
+        help="контроль допуска воркера: больший микробатч не наберётся (0 — выкл.)",
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument(
+        "--request-overhead-ms",
+        type=float,
+        default=0.5,
+        help="CPU на разбор запроса и ответ в воркере (benchmark_request_path.py)",
+    )
+    parser.add_argument("--n-runs", type=int, default=200)
+    parser.add_argument(
+        "--output", type=Path, default=project_root / "models" / "serving_profile.json"
+    )
+    args = parser.parse_args()
+    if args.cpu_budget is None:
+        parser.error(
+            "квоты CPU в cgroup нет: укажите --cpu-budget, равный лимиту CPU пода "
+            "(resources.limits.cpu в deployment.yaml)"
+        )
+    limit = args.max_concurrent_requests
+    if limit > 0:
+        unreachable = [b for b in args.microbatch_sizes if b > limit]
+        if unreachable:
+            print(
+                f"Микробатчи {unreachable} больше MAX_CONCURRENT_REQUESTS={limit} "
+                "и не наберутся: пропущены"
+            )
+        args.microbatch_sizes = [b for b in args.microbatch_sizes if b <= limit]
+
+    _, X_test, _, _ = load_data()
+    X_test = X_test.astype(np.float32)
+    candidates = []
+    for m in measure_calls(args, X_test):
+        for microbatch, workers in product(args.microbatch_sizes, args.workers):
+            # Без микробатчинга (0) модель вызывается на батче из одной строки
+            if max(microbatch, 1) != m["batch_size"]:
+                continue
+            config = estimate(m, microbatch, workers, args)
+            usable = config["est_capacity_rps"] * args.max_utilization
+            # Один поток допустим и при бюджете меньше ядра — с долей CPU
+            config["within_cpu_budget"] = config["cpu"] <= max(args.cpu_budget, 1)
+            config["meets_slo"] = config["est_p99_ms"] <= args.p99_slo_ms
+            config["meets_target"] = (
+                args.target_rps is None or usable >= args.target_rps
+            )
+            candidates.append(config)
+
+    feasible = [
+        c
+        for c in candidates
+        if c["within_cpu_budget"] and c["meets_slo"] and c["meets_target"]
+    ]
+    if not feasible:
+        raise SystemExit(
+            f"Нет конфигурации в пределах {args.cpu_budget} CPU и p99 <= "
+            f"{args.p99_slo_ms} мс"
+            + (f" при {args.target_rps} запросов/с" if args.target_rps else "")
+            + ": увеличьте бюджет или ослабьте SLO"
+        )
+    if args.target_rps is None:
+        # Максимум ёмкости, при равенстве — меньше CPU и ниже p99
+        best = max(
+            feasible,
+            key=lambda c: (c["est_capacity_rps"], -c["cpu"], -c["est_p99_ms"]),
+        )
+    else:
+        # Целевая нагрузка минимальным числом CPU, затем — ниже p99
+        best = min(feasible, key=lambda c: (c["cpu"], c["est_p99_ms"]))
+
+    profile = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_budget": args.cpu_budget,
+        "max_concurrent_requests": args.max_concurrent_requests,
+        "p99_slo_ms": args.p99_slo_ms,
+        "target_rps": args.target_rps,
+        "max_utilization": args.max_utilization,
+        "request_overhead_ms": args.request_overhead_ms,
+        "selected": best,
+        "env": serving_env(best, args),
+        "n_candidates": len(candidates),
+        "n_feasible": len(feasible),
+        "candidates": sorted(candidates, key=lambda c: -c["est_capacity_rps"]),
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+
+    print(
+        f"=== Подбор сервинга: {args.cpu_budget} CPU, p99 <= {args.p99_slo_ms} мс ==="
+    )
+    print(f"Конфигураций: {len(candidates)}, допустимых: {len(feasible)}")
+    print("Лучшие по ёмкости (допустимые):")
+    for c in sorted(feasible, key=lambda c: -c["est_capacity_rps"])[:5]:
+        print(
+            f"  {c['variant']:10s} intra={c['intra_op_threads']} "
+            f"inter={c['inter_op_threads']} microbatch={c['microbatch_size']:3d} "
+            f"workers={c['workers']}: {c['est_capacity_rps']:9.1f} запросов/с, "
+            f"p99 ~{c['est_p99_ms']} мс, CPU {c['cpu']}"
+        )
+    print()
+    print("Выбрано:")
+    for key, value in profile["env"].items():
+        print(f"  {key}={value}")
+    print(f"Профиль сохранён: {args.output}")
+    print(
+        f"Проверка под нагрузкой: SERVING_PROFILE={args.output} "
+        "python scripts/model_training/http_load_test.py"
+    )
+
+
+if __name__ == "__main__":
+    main()
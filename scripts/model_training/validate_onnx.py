@@ -1,13 +1,15 @@
 """
-Валидация конвертации ONNX: сравнение предсказаний исходной модели и ONNX
+Валидация конвертации ONNX: сравнение предсказаний исходной модели и ONNX.
+Работает для любого пайплайна из onnx_conversion.py (MLP или GradientBoosting):
+доля совпавших меток, максимальная и средняя разница вероятностей.
+Отчёт пишется рядом с ONNX-моделью: <имя>_validation.json.
 """
 
+import argparse
+import json
 import sys
 from pathlib import Path
 
-import numpy as np
-import pandas as pd
-
 project_root = Path(__file__).resolve().parents[2]
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
@@ -15,68 +17,78 @@ if str(project_root) not in sys.path:
 import joblib
 import onnxruntime as ort
 
-from src.models.train import TARGET_COL, load_data
+from src.models.onnx_export import compare_with_onnx, onnx_path_for
+from src.models.train import load_data
 
 
 def main():
-    model_path = project_root / "models" / "credit_nn.pkl"
-    onnx_path = project_root / "models" / "model.onnx"
+    parser = argparse.ArgumentParser(description="Сравнение sklearn vs ONNX")
+    parser.add_argument(
+        "--model-path",
+        type=str,
+        default=str(project_root / "models" / "credit_nn.pkl"),
+    )
+    parser.add_argument(
+        "--onnx-path", type=str, default=None, help="по умолчанию — рядом с моделью"
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model_path)
+    onnx_path = Path(args.onnx_path) if args.onnx_path else onnx_path_for(model_path)
 
     if not model_path.exists():
         raise FileNotFoundError(
-            f"Модель не найдена: {model_path}. Запустите python scripts/model_training/train_nn.py"
+            f"Модель не найдена: {model_path}. Сначала обучите её: "
+            "python scripts/model_training/train_nn.py или python -m src.models.train"
         )
     if not onnx_path.exists():
         raise FileNotFoundError(
-            f"ONNX модель не найдена: {onnx_path}. Запустите python scripts/model_training/onnx_conversion.py"
+            f"ONNX модель не найдена: {onnx_path}. Запустите python "
+            f"scripts/model_training/onnx_conversion.py --model-path {model_path}"
         )
 
     # Загрузка данных
     _, X_test, _, _ = load_data()
-    X_test = X_test.astype(np.float32)
 
     model = joblib.load(model_path)
-    feature_names = list(model.feature_names_in_)
-    X_ordered = X_test[feature_names].values
-
-    # Предсказания исходной модели
-    pred_sklearn = model.predict(X_test)
-    proba_sklearn = model.predict_proba(X_test)[:, 1]
-
-    # Предсказания ONNX
-    sess = ort.InferenceSession(str(onnx_path))
-    input_names = [inp.name for inp in sess.get_inputs()]
-
-    input_feed = {
-        name: X_ordered[:, i : i + 1].astype(np.float32)
-        for i, name in enumerate(input_names)
-    }
-    pred_onnx, proba_output = sess.run(
-        ["output_label", "output_probability"], input_feed
-    )
-
-    # output_probability
-    proba_onnx = np.array([p[1] for p in proba_output], dtype=np.float32)
+    sess = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
 
     # Сравнение
-    labels_match = np.allclose(pred_sklearn, pred_onnx)
-    proba_diff = np.abs(proba_sklearn - proba_onnx)
-    max_proba_diff = np.max(proba_diff)
-    mean_proba_diff = np.mean(proba_diff)
+    report = compare_with_onnx(model, sess, X_test)
+    report.update(
+        {
+            "model_path": str(model_path),
+            "onnx_path": str(onnx_path),
+            "estimator": type(model[-1]).__name__,
+        }
+    )
+    report_path = onnx_path.with_name(onnx_path.stem + "_validation.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
 
+    labels_match = report["n_label_mismatch"] == 0
     print("=== Валидация конвертации ONNX ===")
-    print(f"Примеров: {len(X_test)}")
-    print(f"Совпадение меток (0/1): {'OK' if labels_match else 'ОШИБКА'}")
-    print(f"Макс. разница вероятностей: {max_proba_diff:.6f}")
-    print(f"Средняя разница вероятностей: {mean_proba_diff:.6f}")
+    print(f"Модель: {model_path.name} ({report['estimator']}) -> {onnx_path.name}")
+    print(f"Примеров: {report['n_samples']}")
+    print(
+        f"Совпадение меток (0/1): {report['label_agreement']:.4%} "
+        f"({'OK' if labels_match else 'ОШИБКА'})"
+    )
+    print(f"Макс. разница вероятностей: {report['max_proba_diff']:.6f}")
+    print(f"Средняя разница вероятностей: {report['mean_proba_diff']:.6f}")
 
-    if labels_match and max_proba_diff < 1e-4:
+    if labels_match and report["max_proba_diff"] < 1e-4:
         print("\nКонвертация корректна: предсказания совпадают")
     elif labels_match:
-        print("\nКонвертация корректна: метки совпадают, небольшие отличия в вероятностях")
+        print(
+            "\nКонвертация корректна: метки совпадают, небольшие отличия в вероятностях"
+        )
     else:
-        n_mismatch = np.sum(pred_sklearn != pred_onnx)
-        print(f"\nВНИМАНИЕ: расхождение в {n_mismatch} из {len(X_test)} предсказаний")
+        print(
+            f"\nВНИМАНИЕ: расхождение в {report['n_label_mismatch']} "
+            f"из {report['n_samples']} предсказаний"
+        )
+    print(f"Отчёт сохранён: {report_path}")
 
 
 if __name__ == "__main__":
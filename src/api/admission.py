@@ -0,0 +1,133 @@
+"""Контроль допуска: лимит одновременных запросов, очередь и сброс нагрузки"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+IN_FLIGHT = Gauge("credit_scoring_inflight_requests", "Запросы инференса в обработке")
+QUEUED = Gauge(
+    "credit_scoring_queued_requests", "Запросы инференса в очереди на допуск"
+)
+SHED = Counter(
+    "credit_scoring_shed_requests_total",
+    "Запросы, отклонённые с 503 из-за перегрузки",
+    ["reason"],
+)
+ADMISSION_WAIT = Histogram(
+    "credit_scoring_admission_queue_wait_seconds",
+    "Время ожидания допуска в очереди",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class AdmissionController:
+    """Не больше max_concurrency запросов в обработке и max_queue в очереди.
+
+    Освободившийся слот передаётся первому в очереди (FIFO). Если очередь
+    полна или ожидание дольше queue_timeout секунд, запрос отклоняется.
+    Все методы вызываются из одного event loop, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, max_concurrency, max_queue, queue_timeout=1.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+
+    async def acquire(self) -> str | None:
+        """Метод занимает слот; возвращает None или причину отказа"""
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            IN_FLIGHT.set(self.in_flight)
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        QUEUED.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(future)
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            # Клиент ушёл: слот, который уже успели передать, возвращаем
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._discard(future)
+            raise
+        finally:
+            QUEUED.set(len(self._waiters))
+            ADMISSION_WAIT.observe(time.perf_counter() - start)
+        return None
+
+    def _discard(self, future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self):
+        """Метод освобождает слот или передаёт его следующему в очереди"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # in_flight не меняется: слот переходит к ожидающему
+                future.set_result(True)
+                QUEUED.set(len(self._waiters))
+                return
+        self.in_flight -= 1
+        IN_FLIGHT.set(self.in_flight)
+
+
+class AdmissionMiddleware:
+    """ASGI-middleware: пропускает запросы к paths через AdmissionController.
+
+    При отказе сразу отвечает 503 с Retry-After, не трогая модель.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths, retry_after=1):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire()
+        if reason is not None:
+            SHED.labels(reason=reason).inc()
+            await self._reject(send, reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send, reason):
+        body = json.dumps(
+            {"detail": "Сервис перегружен, повторите позже", "reason": reason},
+            ensure_ascii=False,
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
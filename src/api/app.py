@@ -1,33 +1,247 @@
 """FastAPI-приложение для предсказания дефолта"""
 
+import hmac
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
+from typing import ClassVar
 
-import joblib
-import pandas as pd
-from fastapi import FastAPI
-from pydantic import BaseModel
+import numpy as np
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, model_validator
 from prometheus_client import make_asgi_app
 from prometheus_fastapi_instrumentator import Instrumentator
+from starlette.background import BackgroundTask
+from threadpoolctl import threadpool_limits
+
+from src.api.admission import AdmissionController, AdmissionMiddleware
+from src.api.batching import MicroBatcher
+from src.api.binary import (
+    CONTENT_TYPE_FLOAT32,
+    BinaryRoute,
+    accepts_binary,
+    decode_rows,
+    encode_probabilities,
+)
+from src.api.cache import PredictionCache
+from src.api.instrumentation import (
+    StageTimingMiddleware,
+    count_predictions,
+    current_timings,
+    instrumented,
+    observe_stages,
+    profile_section,
+    set_request_model,
+    stage,
+)
+from src.api.profile import apply_serving_profile
+from src.api.profiler import SlowRequestProfiler
+from src.api.registry import (
+    ModelRegistry,
+    ShadowScorer,
+    check_variant_names,
+    choose_variant,
+    parse_mapping,
+    parse_variants,
+    reorder_columns,
+)
+from src.api.reload import (
+    MODEL_RELOADS,
+    ModelFileWatcher,
+    set_active_model,
+    set_worker_memory,
+)
+from src.api.streaming import DuplexStreamingResponse, iter_lines, score_stream
+from src.features.build_features import (
+    AGGREGATE_COLS,
+    BILL_COLS,
+    PAY_AMT_COLS,
+    PAY_COLS,
+    compute_aggregates,
+)
+from src.models.backends import load_backend
+from src.models.memory import process_memory
+
+logger = logging.getLogger(__name__)
 
 # Загрузка модели при старте
 project_root = Path(__file__).resolve().parents[2]
-model_path = project_root / "models" / "credit_default_model.pkl"
 
-app = FastAPI(title="Credit Default Prediction API")
+# Профиль сервинга (scripts/model_training/tune_serving.py): модель, потоки ORT,
+# микробатчинг и воркеры; его значения заменяют переменные окружения ниже
+SERVING_PROFILE = apply_serving_profile(os.getenv("SERVING_PROFILE", ""), project_root)
+
+model_path = project_root / os.getenv("MODEL_PATH", "models/credit_default_model.pkl")
+
+# Бэкенд инференса (BACKEND_NAMES); по умолчанию onnx для .onnx, иначе sklearn_numpy
+MODEL_BACKEND = os.getenv("MODEL_BACKEND") or None
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "1"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+
+# Потоки BLAS/OpenMP (numpy, sklearn, compiled). OMP_NUM_THREADS читается при загрузке
+# библиотек, а профиль применяется уже после импорта numpy, поэтому лимит ставится
+# ещё и через threadpoolctl; пусто — без ограничения
+OMP_NUM_THREADS = os.getenv("OMP_NUM_THREADS", "")
+if OMP_NUM_THREADS:
+    threadpool_limits(limits=int(OMP_NUM_THREADS))
+
+# Отображать массивы sklearn-модели из файла (mmap): страницы общие для воркеров.
+# Файл при этом нельзя перезаписывать на месте (SIGBUS в воркере) — только
+# подменять переименованием (os.replace), поэтому по умолчанию выключено
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() == "true"
+
+# Порог вероятности для метки default_prediction
+DECISION_THRESHOLD = float(os.getenv("DECISION_THRESHOLD", "0.5"))
+
+# Максимальный размер батча для /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# Микробатчинг /predict: одновременные запросы объединяются в один вызов модели
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Контроль допуска: одновременно в обработке не больше MAX_CONCURRENT_REQUESTS
+# запросов инференса, ещё ADMISSION_QUEUE_SIZE ждут; остальным — 503 (0 — выкл.)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "1"))
+
+# Профилировщик медленных запросов (/debug/slow): топ-N за окно и cProfile
+# для каждого PROFILE_SAMPLE_EVERY-го запроса (0 — без cProfile); в PROFILE_DIR
+# хранятся PROFILE_MAX_FILES самых новых .prof-файлов
+SLOW_REQUEST_PROFILER_ENABLED = (
+    os.getenv("SLOW_REQUEST_PROFILER_ENABLED", "false").lower() == "true"
+)
+SLOW_REQUEST_TOP_N = int(os.getenv("SLOW_REQUEST_TOP_N", "20"))
+SLOW_REQUEST_WINDOW_SECONDS = float(os.getenv("SLOW_REQUEST_WINDOW_SECONDS", "300"))
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/credit-scoring-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+
+# Размер чанка потокового скоринга /predict/stream
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+
+# Кэш предсказаний для одиночных запросов (0 — выключен)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300"))
+
+# Прогрев модели: размеры синтетических батчей и число прогонов каждого
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("WARMUP_BATCH_SIZES", "1,8,64,512").split(",")
+]
+WARMUP_ROUNDS = int(os.getenv("WARMUP_ROUNDS", "3"))
+
+# Горячая перезагрузка модели: токен для /admin/* и период проверки файла (0 — выкл.)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "0"))
+
+# Дополнительные версии модели: "имя=путь" или "имя=бэкенд:путь" через запятую,
+# выбор — заголовком X-Model-Variant или долей трафика "имя=процент,...";
+# основная модель — вариант "primary"
+PRIMARY_VARIANT = "primary"
+MODEL_VARIANTS, MODEL_VARIANT_BACKENDS = parse_variants(os.getenv("MODEL_VARIANTS", ""))
+MODEL_TRAFFIC_SPLIT = {
+    name: float(weight)
+    for name, weight in parse_mapping(os.getenv("MODEL_TRAFFIC_SPLIT", "")).items()
+}
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "256"))
+
+# Теневой скоринг: вариант-кандидат скорится после ответа, в метрики — разница
+SHADOW_MODEL = os.getenv("SHADOW_MODEL") or None
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "100"))
+
+# Опечатка в имени варианта иначе отдавала бы 404 на случайную долю запросов
+check_variant_names(MODEL_VARIANTS, MODEL_TRAFFIC_SPLIT, SHADOW_MODEL, PRIMARY_VARIANT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка фоновых задач приложения"""
+    memory = getattr(model, "memory", None)
+    if memory is not None and "rss" in memory["after_load"]:
+        before, after = memory["before_load"], memory["after_load"]
+        logger.info(
+            "[pid %d] RSS до загрузки модели: %.1f МБ, после: %.1f МБ "
+            "(shared %.1f МБ, mmap=%s)",
+            os.getpid(),
+            before["rss"] / 2**20,
+            after["rss"] / 2**20,
+            after.get("shared", 0) / 2**20,
+            MODEL_MMAP,
+        )
+    threading.Thread(target=_initial_warm_up, name="model-warmup", daemon=True).start()
+    watcher = None
+    if MODEL_WATCH_INTERVAL_SECONDS > 0:
+        watcher = ModelFileWatcher(
+            lambda: model_path, _reload_on_change, MODEL_WATCH_INTERVAL_SECONDS
+        )
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if shadow_scorer is not None:
+        shadow_scorer.shutdown()
+
+
+app = FastAPI(title="Credit Default Prediction API", lifespan=lifespan)
+# Эндпоинты /predict* принимают также float32/msgpack (src/api/binary.py)
+app.router.route_class = BinaryRoute
 
 # Prometheus: /metrics — HTTP-метрики (requests, latency) + process metrics
 Instrumentator().instrument(app)
 app.mount("/metrics", make_asgi_app())
+# Поэтапные метрики инференса (credit_scoring_inference_stage_seconds)
+INFERENCE_PATHS = ["/predict", "/predict/batch", "/predict/raw", "/predict/raw/batch"]
+slow_request_profiler = (
+    SlowRequestProfiler(
+        SLOW_REQUEST_TOP_N,
+        SLOW_REQUEST_WINDOW_SECONDS,
+        profile_every=PROFILE_SAMPLE_EVERY,
+        profile_dir=PROFILE_DIR,
+        max_profiles=PROFILE_MAX_FILES,
+    )
+    if SLOW_REQUEST_PROFILER_ENABLED
+    else None
+)
+app.add_middleware(
+    StageTimingMiddleware,
+    get_model=lambda: model,
+    paths=INFERENCE_PATHS,
+    get_profiler=lambda: slow_request_profiler,
+)
 
-if model_path.exists():
-    model = joblib.load(model_path)
-else:
-    model = None
+# Контроль допуска снаружи остальных middleware: ожидание в очереди не входит
+# в этапы инференса, а отклонённые запросы не доходят до обработчиков
+admission = (
+    AdmissionController(
+        MAX_CONCURRENT_REQUESTS,
+        ADMISSION_QUEUE_SIZE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    )
+    if MAX_CONCURRENT_REQUESTS > 0
+    else None
+)
+if admission is not None:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission,
+        paths=INFERENCE_PATHS,
+        retry_after=RETRY_AFTER_SECONDS,
+    )
 
 
 # Схема входных данных
-class ClientData(BaseModel):
-    """Признаки клиента для предсказания"""
+class RawClientData(BaseModel):
+    """Исходные признаки клиента (UCI), агрегаты считаются на сервере"""
 
     LIMIT_BAL: float
     SEX: int
@@ -52,6 +266,11 @@ class ClientData(BaseModel):
     PAY_AMT4: float
     PAY_AMT5: float
     PAY_AMT6: float
+
+
+class ClientData(RawClientData):
+    """Признаки клиента для предсказания"""
+
     PAY_MEAN: float
     PAY_MAX: int
     PAY_MIN: int
@@ -62,19 +281,744 @@ class ClientData(BaseModel):
     PAY_TO_BILL_RATIO: float
 
 
+# Порядок признаков модели совпадает с порядком полей ClientData
+FEATURE_NAMES = list(ClientData.model_fields)
+RAW_FEATURE_NAMES = list(RawClientData.model_fields)
+
+
+def _raw_slice(cols):
+    """Метод возвращает срез группы колонок в порядке RAW_FEATURE_NAMES"""
+    start = RAW_FEATURE_NAMES.index(cols[0])
+    assert RAW_FEATURE_NAMES[start : start + len(cols)] == cols
+    return slice(start, start + len(cols))
+
+
+PAY_SLICE = _raw_slice(PAY_COLS)
+BILL_SLICE = _raw_slice(BILL_COLS)
+PAY_AMT_SLICE = _raw_slice(PAY_AMT_COLS)
+
+
+def load_model(path: Path, warm: bool = True, backend: str = None):
+    """Метод загружает модель бэкендом (по умолчанию MODEL_BACKEND) и прогревает её"""
+    memory_before = process_memory()
+    start = time.perf_counter()
+    backend = load_backend(
+        path,
+        FEATURE_NAMES,
+        backend=backend or MODEL_BACKEND,
+        intra_op_threads=ORT_INTRA_OP_THREADS,
+        inter_op_threads=ORT_INTER_OP_THREADS,
+        mmap=MODEL_MMAP,
+    )
+    backend.loaded_at = time.time()
+    backend.load_seconds = time.perf_counter() - start
+    backend.memory = {"before_load": memory_before, "after_load": process_memory()}
+    backend.warmup_seconds = None
+    if warm:
+        warm_up(backend)
+    return backend
+
+
+def warm_up(backend) -> float:
+    """Метод прогоняет синтетические батчи разных размеров через модель.
+
+    Первые вызовы sklearn/ORT заметно медленнее (аллокации, инициализация
+    потоков), поэтому модель прогревается до того, как на неё пойдёт трафик.
+    """
+    rng = np.random.default_rng(0)
+    n_features = len(backend.feature_names)
+    start = time.perf_counter()
+    for batch_size in WARMUP_BATCH_SIZES:
+        X = rng.integers(-2, 3, size=(batch_size, n_features)).astype(np.float32)
+        for _ in range(WARMUP_ROUNDS):
+            backend.predict_proba(X)
+    backend.warmup_seconds = time.perf_counter() - start
+    return backend.warmup_seconds
+
+
+# Прогрев при старте завершён: до этого /ready отдаёт 503
+warmup_done = threading.Event()
+# Ошибка прогрева при старте: /ready остаётся закрытым, /health её показывает
+warmup_status = {"error": None}
+
+
+def _initial_warm_up():
+    """Метод прогревает модель, загруженную при старте, и открывает /ready"""
+    current = model
+    if current is None:
+        return
+    try:
+        if getattr(current, "warmup_seconds", None) is None:
+            warm_up(current)
+    except Exception as e:
+        # Модель, которая падает на синтетическом батче, не должна получать трафик
+        logger.exception("Прогрев модели при старте не удался")
+        warmup_status["error"] = f"{type(e).__name__}: {e}"
+        return
+    # Варианты загружаются заранее, чтобы первый запрос не ждал загрузки
+    for name in model_registry.paths:
+        try:
+            model_registry.get(name)
+        except Exception:
+            MODEL_RELOADS.labels(result="error").inc()
+    warmup_done.set()
+
+
+_reload_lock = threading.Lock()
+reload_status = {"state": "idle", "error": None, "loaded_at": None, "version": None}
+
+
+def reload_model(path: Path = None, warm: bool = True):
+    """Метод загружает и прогревает новую модель, затем атомарно подменяет ссылку.
+
+    Запросы, начатые на старой модели, дорабатывают на ней: обработчики
+    берут ссылку на модель один раз в начале запроса.
+    """
+    global model, model_path
+    path = Path(path) if path is not None else model_path
+    try:
+        new_model = load_model(path, warm=warm)
+    except Exception:
+        MODEL_RELOADS.labels(result="error").inc()
+        raise
+    previous = model
+    model, model_path = new_model, path
+    set_active_model(new_model, previous)
+    set_worker_memory(new_model.memory["before_load"], new_model.memory["after_load"])
+    if warm:
+        warmup_status["error"] = None
+        warmup_done.set()
+    MODEL_RELOADS.labels(result="success").inc()
+    reload_status.update(
+        state="ready", error=None, loaded_at=time.time(), version=new_model.version
+    )
+    return new_model
+
+
+def _reload_in_background(path: Path):
+    """Метод перезагружает модель и освобождает блокировку"""
+    try:
+        reload_model(path)
+    except Exception as exc:
+        reload_status.update(state="failed", error=str(exc))
+    finally:
+        _reload_lock.release()
+
+
+def _reload_on_change(path: Path):
+    """Метод перезагружает модель при изменении файла (вызывается watcher-ом)"""
+    if _reload_lock.acquire(blocking=False):
+        _reload_in_background(path)
+
+
+# При старте модель только загружается; прогрев — в фоне из lifespan
+model = None
+if model_path.exists():
+    reload_model(model_path, warm=False)
+
+model_registry = ModelRegistry(
+    {name: project_root / path for name, path in MODEL_VARIANTS.items()},
+    load_model,
+    memory_budget=int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024),
+    backends=MODEL_VARIANT_BACKENDS,
+)
+
+
+def _request_variant(variant: str | None) -> str | None:
+    """Метод возвращает имя варианта запроса (None — основная модель)"""
+    if variant is None and MODEL_TRAFFIC_SPLIT:
+        variant = choose_variant(MODEL_TRAFFIC_SPLIT)
+    if variant is None or variant == PRIMARY_VARIANT:
+        return None
+    if variant not in model_registry:
+        raise HTTPException(
+            status_code=404, detail=f"Неизвестный вариант модели: {variant}"
+        )
+    return variant
+
+
+def select_model(variant: str | None):
+    """Метод выбирает модель запроса: заголовок X-Model-Variant или доля трафика.
+
+    Для синхронных обработчиков: они уже выполняются в пуле потоков.
+    """
+    variant = _request_variant(variant)
+    current = model if variant is None else model_registry.get(variant)
+    set_request_model(current)
+    return current
+
+
+async def select_model_async(variant: str | None):
+    """Метод выбирает модель запроса в асинхронном обработчике.
+
+    Незагруженный (или выгруженный) вариант загружается и прогревается в пуле
+    потоков, чтобы не блокировать цикл событий и остальные запросы.
+    """
+    variant = _request_variant(variant)
+    if variant is None:
+        current = model
+    else:
+        current = model_registry.peek(variant)
+        if current is None:
+            current = await run_in_threadpool(model_registry.get, variant)
+    set_request_model(current)
+    return current
+
+
+def _shadow_candidate():
+    return model_registry.get(SHADOW_MODEL)
+
+
+shadow_scorer = (
+    ShadowScorer(
+        SHADOW_MODEL,
+        _shadow_candidate,
+        threshold=DECISION_THRESHOLD,
+        max_pending=SHADOW_MAX_PENDING,
+    )
+    if SHADOW_MODEL is not None
+    else None
+)
+
+
+def schedule_shadow(background: BackgroundTasks, X, probabilities, current):
+    """Метод ставит теневой скоринг после отправки ответа"""
+    if shadow_scorer is not None:
+        background.add_task(
+            shadow_scorer.submit, X, np.asarray(probabilities, dtype=float), current
+        )
+
+
+class BatchClientData(BaseModel):
+    """Батч клиентов: список объектов или колонки признаков"""
+
+    fields: ClassVar[list[str]] = FEATURE_NAMES
+    clients: list[ClientData] | None = None
+    columns: dict[str, list[float]] | None = None
+
+    @model_validator(mode="after")
+    def check_payload(self):
+        """Проверяет, что передан ровно один формат и колонки согласованы"""
+        if (self.clients is None) == (self.columns is None):
+            raise ValueError("Нужно передать либо clients, либо columns")
+        if self.columns is not None:
+            missing = [name for name in self.fields if name not in self.columns]
+            if missing:
+                raise ValueError(f"Не хватает колонок: {missing}")
+            lengths = {len(self.columns[name]) for name in self.fields}
+            if len(lengths) != 1:
+                raise ValueError("Колонки должны быть одной длины")
+        return self
+
+    def __len__(self):
+        if self.clients is not None:
+            return len(self.clients)
+        return len(self.columns[self.fields[0]])
+
+    def to_matrix(self, feature_names, dtype=np.float32) -> np.ndarray:
+        """Метод собирает матрицу признаков в порядке feature_names"""
+        if self.clients is not None:
+            get_row = attrgetter(*feature_names)
+            return np.array([get_row(c) for c in self.clients], dtype=dtype).reshape(
+                -1, len(feature_names)
+            )
+        return np.column_stack(
+            [np.asarray(self.columns[name], dtype=dtype) for name in feature_names]
+        )
+
+
+class RawBatchClientData(BatchClientData):
+    """Батч клиентов только с исходными признаками"""
+
+    fields: ClassVar[list[str]] = RAW_FEATURE_NAMES
+    clients: list[RawClientData] | None = None
+
+
+# Буфер одной строки признаков на поток обработчика
+_row_local = threading.local()
+
+
+def client_to_row(data: ClientData, current) -> np.ndarray:
+    """Метод копирует поля ClientData в переиспользуемый float32-вектор [1, n]"""
+    cache = getattr(_row_local, "cache", None)
+    if cache is None or cache[0] is not current:
+        feature_names = current.feature_names
+        cache = (
+            current,
+            attrgetter(*feature_names),
+            np.empty((1, len(feature_names)), dtype=np.float32),
+        )
+        _row_local.cache = cache
+    _, get_row, row = cache
+    row[0] = get_row(data)
+    return row
+
+
+@lru_cache(maxsize=8)
+def _raw_layout(feature_names: tuple):
+    """Метод возвращает позиции исходных признаков и агрегатов во входе модели"""
+    raw_idx = [feature_names.index(name) for name in RAW_FEATURE_NAMES]
+    agg_idx = [feature_names.index(name) for name in AGGREGATE_COLS]
+    return raw_idx, agg_idx
+
+
+def raw_to_features(raw: np.ndarray, current, out: np.ndarray = None) -> np.ndarray:
+    """Метод дополняет исходные признаки [n, 23] агрегатами на сервере.
+
+    Агрегаты считаются той же функцией, что и при обучении; результат — матрица
+    float32 в порядке current.feature_names.
+    """
+    raw_idx, agg_idx = _raw_layout(tuple(current.feature_names))
+    if out is None:
+        out = np.empty((len(raw), len(current.feature_names)), dtype=np.float32)
+    out[:, raw_idx] = raw
+    out[:, agg_idx] = compute_aggregates(
+        raw[:, PAY_SLICE], raw[:, BILL_SLICE], raw[:, PAY_AMT_SLICE]
+    )
+    return out
+
+
+_get_raw_row = attrgetter(*RAW_FEATURE_NAMES)
+
+
+def raw_client_to_row(data: RawClientData, current) -> np.ndarray:
+    """Метод собирает вектор признаков [1, n] из исходных полей клиента"""
+    cache = getattr(_row_local, "raw_cache", None)
+    if cache is None or cache[0] is not current:
+        cache = (
+            current,
+            np.empty((1, len(RAW_FEATURE_NAMES)), dtype=np.float64),
+            np.empty((1, len(current.feature_names)), dtype=np.float32),
+        )
+        _row_local.raw_cache = cache
+    _, raw, row = cache
+    raw[0] = _get_raw_row(data)
+    return raw_to_features(raw, current, out=row)
+
+
+def predict_matrix(X: np.ndarray, current):
+    """Метод делает один вызов модели и возвращает (классы, вероятности)"""
+    probabilities = current.predict_proba(X, current_timings())
+    labels = (probabilities >= DECISION_THRESHOLD).astype(int)
+    return labels, probabilities
+
+
+def check_batch_size(n: int):
+    """Метод отклоняет батч больше MAX_BATCH_SIZE (413)"""
+    if n > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер батча {n} превышает MAX_BATCH_SIZE={MAX_BATCH_SIZE}",
+        )
+
+
+prediction_cache = (
+    PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS)
+    if PREDICTION_CACHE_SIZE > 0
+    else None
+)
+
+
+def _predict_microbatch(X: np.ndarray, current) -> np.ndarray:
+    """Метод скорит микробатч; этапы модели пишутся в метрики один раз на батч.
+
+    current — модель, с которой запросы были приняты: при подмене модели
+    запросы из очереди дорабатывают на ней и отдают её model_version.
+    """
+    timings = {}
+    probabilities = current.predict_proba(X, timings)
+    observe_stages(timings, current)
+    return probabilities
+
+
+batcher = (
+    MicroBatcher(
+        _predict_microbatch,
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+    )
+    if MICROBATCH_ENABLED
+    else None
+)
+
+
+def _cache_lookup(row: np.ndarray, current):
+    """Метод возвращает (ключ, вероятность из кэша или None).
+
+    Кэшируются только ответы основной модели: кэш сбрасывается при смене версии.
+    """
+    if prediction_cache is None or current is not model:
+        return None, None
+    key = prediction_cache.make_key(row, current.version)
+    return key, prediction_cache.get(key, current.version)
+
+
+def _cache_store(key, probability: float, version: str):
+    # Результат модели, которую уже подменили, в кэш не кладём
+    if key is not None and model is not None and version == model.version:
+        prediction_cache.set(key, probability, version)
+
+
+def predict_row(row: np.ndarray, current) -> float:
+    """Метод возвращает вероятность строки [1, n]; попадание в кэш — без модели"""
+    key, probability = _cache_lookup(row, current)
+    if probability is None:
+        probability = float(current.predict_proba(row, current_timings())[0])
+        _cache_store(key, probability, current.version)
+    return probability
+
+
+async def predict_row_batched(row: np.ndarray, current) -> float:
+    """Метод отправляет строку в микробатч, если её нет в кэше"""
+    key, probability = _cache_lookup(row, current)
+    if probability is None:
+        # Буфер строки переиспользуется, поэтому в очередь кладём копию
+        probability = await batcher.submit(row[0].copy(), current)
+        _cache_store(key, probability, current.version)
+    return probability
+
+
+def single_response(probability: float, current) -> dict:
+    """Метод формирует ответ для одного клиента"""
+    label = int(probability >= DECISION_THRESHOLD)
+    count_predictions(label, 1, current)
+    return {
+        "default_prediction": label,
+        "default_probability": probability,
+        "model_version": current.version,
+    }
+
+
+def batch_response(labels: np.ndarray, probabilities: np.ndarray, current) -> dict:
+    """Метод формирует ответ для батча клиентов"""
+    count_predictions(int(labels.sum()), len(labels), current)
+    return {
+        "default_predictions": labels.astype(int).tolist(),
+        "default_probabilities": probabilities.astype(float).tolist(),
+        "model_version": current.version,
+    }
+
+
+def binary_endpoint(raw: bool, single: bool):
+    """Метод создаёт обработчик бинарного тела (float32/msgpack) для /predict*.
+
+    Строки идут в порядке полей RawClientData (raw) или ClientData, ответ —
+    вероятности в little-endian float32, версия модели — в X-Model-Version.
+    """
+    fields = RAW_FEATURE_NAMES if raw else FEATURE_NAMES
+
+    def to_features(rows: np.ndarray, current) -> np.ndarray:
+        if raw:
+            return raw_to_features(rows.astype(np.float64), current)
+        return reorder_columns(rows, FEATURE_NAMES, current.feature_names)
+
+    @instrumented
+    async def endpoint(request: Request, kind: str):
+        current = await select_model_async(request.headers.get("x-model-variant"))
+        if current is None:
+            return JSONResponse(
+                {"error": "Модель не загружена. Сначала обучите модель"}
+            )
+
+        body = await request.body()
+        with stage("parse"):
+            rows = decode_rows(body, kind, len(fields))
+        if single and len(rows) != 1:
+            raise HTTPException(status_code=400, detail="Ожидалась одна строка")
+        check_batch_size(len(rows))
+
+        def run():
+            with profile_section():
+                with stage("features"):
+                    X = to_features(rows, current)
+                if single:
+                    return X, np.array([predict_row(X, current)])
+                if len(X) == 0:
+                    return X, np.empty(0)
+                return X, predict_matrix(X, current)[1]
+
+        X, probabilities = await run_in_threadpool(run)
+        n_positive = int((probabilities >= DECISION_THRESHOLD).sum())
+        count_predictions(n_positive, len(probabilities), current)
+        background = None
+        if shadow_scorer is not None and len(X):
+            background = BackgroundTask(shadow_scorer.submit, X, probabilities, current)
+        return Response(
+            encode_probabilities(probabilities),
+            media_type=CONTENT_TYPE_FLOAT32,
+            headers={
+                "X-Model-Version": current.version,
+                "X-Decision-Threshold": str(DECISION_THRESHOLD),
+            },
+            background=background,
+        )
+
+    return endpoint
+
+
 @app.post("/predict")
-def predict(data: ClientData):
+@accepts_binary(binary_endpoint(raw=False, single=True))
+@instrumented
+async def predict(
+    data: ClientData,
+    background: BackgroundTasks,
+    x_model_variant: str | None = Header(default=None),
+):
     """Предсказывает вероятность дефолта"""
-    if model is None:
+    current = await select_model_async(x_model_variant)
+    if current is None:
         return {"error": "Модель не загружена. Сначала обучите модель"}
 
-    input_data = pd.DataFrame([data.model_dump()])
-    prediction = model.predict(input_data)
-    probability = model.predict_proba(input_data)[0][1]
+    # Буфер строки общий для потока: пока запрос ждёт микробатч или отдаёт
+    # ответ, его перезаписывают другие запросы, поэтому тени нужна своя копия
+    shadow = shadow_scorer is not None
+    # Микробатч собирается только для основной модели
+    if batcher is not None and current is model:
+        with stage("features"):
+            row = client_to_row(data, current)
+            if shadow:
+                row = row.copy()
+        probability = await predict_row_batched(row, current)
+    else:
+
+        def run():
+            with profile_section():
+                with stage("features"):
+                    row = client_to_row(data, current)
+                    if shadow:
+                        row = row.copy()
+                return row, predict_row(row, current)
+
+        row, probability = await run_in_threadpool(run)
+
+    if shadow:
+        schedule_shadow(background, row, [probability], current)
+    return single_response(probability, current)
+
+
+@app.post("/predict/batch")
+@accepts_binary(binary_endpoint(raw=False, single=False))
+@instrumented
+def predict_batch(
+    data: BatchClientData,
+    background: BackgroundTasks,
+    x_model_variant: str | None = Header(default=None),
+):
+    """Предсказывает вероятность дефолта для батча клиентов одним вызовом модели"""
+    current = select_model(x_model_variant)
+    if current is None:
+        return {"error": "Модель не загружена. Сначала обучите модель"}
+
+    n = len(data)
+    check_batch_size(n)
+    with stage("features"):
+        X = data.to_matrix(current.feature_names)
+    if n == 0:
+        return batch_response(np.empty(0), np.empty(0), current)
+
+    labels, probabilities = predict_matrix(X, current)
+    schedule_shadow(background, X, probabilities, current)
+    return batch_response(labels, probabilities, current)
+
+
+@app.post("/predict/raw")
+@accepts_binary(binary_endpoint(raw=True, single=True))
+@instrumented
+def predict_raw(
+    data: RawClientData,
+    background: BackgroundTasks,
+    x_model_variant: str | None = Header(default=None),
+):
+    """Предсказывает вероятность дефолта по исходным признакам (агрегаты на сервере)"""
+    current = select_model(x_model_variant)
+    if current is None:
+        return {"error": "Модель не загружена. Сначала обучите модель"}
+
+    with stage("features"):
+        row = raw_client_to_row(data, current)
+    probability = predict_row(row, current)
+    if shadow_scorer is not None:
+        schedule_shadow(background, row.copy(), [probability], current)
+    return single_response(probability, current)
+
+
+@app.post("/predict/raw/batch")
+@accepts_binary(binary_endpoint(raw=True, single=False))
+@instrumented
+def predict_raw_batch(
+    data: RawBatchClientData,
+    background: BackgroundTasks,
+    x_model_variant: str | None = Header(default=None),
+):
+    """Батч-предсказание по исходным признакам (агрегаты на сервере)"""
+    current = select_model(x_model_variant)
+    if current is None:
+        return {"error": "Модель не загружена. Сначала обучите модель"}
+
+    n = len(data)
+    check_batch_size(n)
+    if n == 0:
+        return batch_response(np.empty(0), np.empty(0), current)
+
+    with stage("features"):
+        raw = data.to_matrix(RAW_FEATURE_NAMES, dtype=np.float64)
+        X = raw_to_features(raw, current)
+    labels, probabilities = predict_matrix(X, current)
+    schedule_shadow(background, X, probabilities, current)
+    return batch_response(labels, probabilities, current)
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """Потоковый скоринг: NDJSON (или CSV с заголовком) на входе, NDJSON на выходе.
+
+    Тело читается по частям и скорится чанками по STREAM_CHUNK_SIZE строк,
+    результаты отдаются в порядке входа по мере готовности.
+    """
+    current = await select_model_async(request.headers.get("x-model-variant"))
+    if current is None:
+        return {"error": "Модель не загружена. Сначала обучите модель"}
+
+    is_csv = "csv" in request.headers.get("content-type", "")
+    results = score_stream(
+        iter_lines(request.stream()),
+        current,
+        schema=ClientData,
+        is_csv=is_csv,
+        chunk_size=STREAM_CHUNK_SIZE,
+        threshold=DECISION_THRESHOLD,
+    )
+    return DuplexStreamingResponse(results, media_type="application/x-ndjson")
+
+
+class ReloadRequest(BaseModel):
+    """Запрос на перезагрузку модели"""
+
+    model_path: str | None = None
+
+
+def _resolve_model_path(path: str | None) -> Path:
+    """Метод проверяет, что новая модель лежит в каталоге models/"""
+    if path is None:
+        return model_path
+    resolved = (project_root / path).resolve()
+    models_dir = (project_root / "models").resolve()
+    if not resolved.is_relative_to(models_dir):
+        raise HTTPException(status_code=400, detail="Модель должна лежать в models/")
+    if not resolved.exists():
+        raise HTTPException(status_code=404, detail=f"Файл не найден: {path}")
+    return resolved
+
+
+def check_admin_token(x_admin_token: str | None):
+    """Метод проверяет X-Admin-Token служебных эндпоинтов.
+
+    Без ADMIN_TOKEN эндпоинты выключены (404), неверный токен — 403.
+    Сравнение за постоянное время, чтобы токен нельзя было подобрать по задержке.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=404,
+            detail="Служебные эндпоинты выключены: не задан ADMIN_TOKEN",
+        )
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Неверный X-Admin-Token")
+
+
+@app.post("/admin/reload", status_code=202)
+def admin_reload(
+    request: ReloadRequest | None = None,
+    x_admin_token: str | None = Header(default=None),
+):
+    """Запускает фоновую загрузку и прогрев модели с атомарной подменой"""
+    check_admin_token(x_admin_token)
+
+    path = _resolve_model_path(request.model_path if request else None)
+    if not _reload_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Перезагрузка уже выполняется")
+    reload_status.update(state="loading", error=None)
+    threading.Thread(
+        target=_reload_in_background, args=(path,), name="model-reload", daemon=True
+    ).start()
+
+    return {"status": "loading", "model_path": str(path.relative_to(project_root))}
+
+
+@app.get("/admin/model")
+def admin_model(x_admin_token: str | None = Header(default=None)):
+    """Возвращает активную модель и статус последней перезагрузки"""
+    check_admin_token(x_admin_token)
+    current = model
+    return {
+        "model_version": current.version if current is not None else None,
+        "backend": current.name if current is not None else None,
+        "model_path": str(model_path),
+        "reload": dict(reload_status),
+        "variants": model_registry.loaded(),
+        "traffic_split": MODEL_TRAFFIC_SPLIT,
+        "shadow_model": SHADOW_MODEL,
+    }
+
+
+@app.get("/debug/slow")
+def debug_slow(x_admin_token: str | None = Header(default=None)):
+    """Самые медленные запросы инференса за окно: этапы, размеры тела, профиль"""
+    check_admin_token(x_admin_token)
+    if slow_request_profiler is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Профилировщик выключен (SLOW_REQUEST_PROFILER_ENABLED)",
+        )
+    log = slow_request_profiler.log
+    return {
+        "window_seconds": log.window,
+        "top_n": log.top_n,
+        "profile_every": slow_request_profiler.profile_every,
+        "requests": log.slowest(),
+    }
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: модель загружена и прогрета"""
+    current = model
+    if current is None:
+        return JSONResponse(
+            status_code=503, content={"status": "not_ready", "reason": "no_model"}
+        )
+    if not warmup_done.is_set():
+        reason = "warmup_failed" if warmup_status["error"] else "warming_up"
+        return JSONResponse(
+            status_code=503, content={"status": "not_ready", "reason": reason}
+        )
+    return {"status": "ready", "model_version": current.version}
+
 
+@app.get("/health")
+def health():
+    """Liveness и сведения о модели: версия, время загрузки и прогрева"""
+    current = model
+    if current is None:
+        return {"status": "ok", "model_loaded": False, "ready": False}
     return {
-        "default_prediction": int(prediction[0]),
-        "default_probability": float(probability),
+        "status": "ok",
+        "model_loaded": True,
+        "ready": warmup_done.is_set(),
+        "model_version": current.version,
+        "backend": current.name,
+        "model_loaded_at": getattr(current, "loaded_at", None),
+        "model_load_seconds": getattr(current, "load_seconds", None),
+        "warmup_seconds": getattr(current, "warmup_seconds", None),
+        "warmup_error": warmup_status["error"],
+        "worker_pid": os.getpid(),
+        "worker_memory": getattr(current, "memory", None),
+        "serving_profile": (
+            {key: SERVING_PROFILE.get(key) for key in ("path", "created_at")}
+            if SERVING_PROFILE is not None
+            else None
+        ),
     }
 
 
@@ -0,0 +1,104 @@
+"""Микробатчинг: объединение одиночных запросов в один вызов модели"""
+
+import asyncio
+import time
+
+import numpy as np
+from prometheus_client import Histogram
+
+MICROBATCH_SIZE = Histogram(
+    "credit_scoring_microbatch_size",
+    "Размер батча, собранного диспетчером микробатчинга",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+MICROBATCH_QUEUE_WAIT = Histogram(
+    "credit_scoring_microbatch_queue_wait_seconds",
+    "Время ожидания запроса в очереди до вызова модели",
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+class MicroBatcher:
+    """Собирает одновременные запросы в батч и вызывает модель один раз.
+
+    Батч отправляется, когда набрано max_batch_size строк или с момента
+    прихода первой строки прошло max_wait_ms. predict_fn(X, context) вызывается
+    в пуле потоков и должна вернуть вероятности в порядке строк. context —
+    модель, с которой запрос был принят: строки с разным context (например,
+    во время подмены модели) скорятся отдельными вызовами, каждая — своей моделью.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    def _ensure_started(self):
+        """Метод запускает фоновую задачу в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, row: np.ndarray, context=None) -> float:
+        """Метод ставит строку признаков в очередь и ждёт её вероятность"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, context, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """Метод собирает батч: первая строка + всё, что успело прийти"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[2].cancelled()]
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            for *_, enqueued in batch:
+                MICROBATCH_QUEUE_WAIT.observe(now - enqueued)
+            MICROBATCH_SIZE.observe(len(batch))
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+            for group in groups.values():
+                await self._predict_group(group)
+
+    async def _predict_group(self, group):
+        """Метод скорит строки одной модели и раздаёт результаты"""
+        X = np.stack([row for row, *_ in group])
+        try:
+            probabilities = await self._loop.run_in_executor(
+                None, self.predict_fn, X, group[0][1]
+            )
+        except Exception as exc:
+            for _, _, future, _ in group:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, _, future, _), probability in zip(group, probabilities):
+            if not future.done():
+                future.set_result(float(probability))
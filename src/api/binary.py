@@ -0,0 +1,101 @@
+"""Бинарный формат запросов: float32-строки или msgpack вместо JSON"""
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+
+# Строки признаков подряд, little-endian float32, в порядке полей схемы
+CONTENT_TYPE_FLOAT32 = "application/x-float32"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+
+BINARY_CONTENT_TYPES = {
+    CONTENT_TYPE_FLOAT32: "float32",
+    "application/octet-stream": "float32",
+    CONTENT_TYPE_MSGPACK: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+_FLOAT32_LE = np.dtype("<f4")
+
+
+def binary_kind(content_type: str | None) -> str | None:
+    """Метод возвращает float32/msgpack для бинарного content-type, иначе None"""
+    if not content_type:
+        return None
+    return BINARY_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+def decode_rows(body: bytes, kind: str, n_features: int) -> np.ndarray:
+    """Метод декодирует тело в матрицу float32 [n, n_features] без pydantic.
+
+    float32: байты строк подряд. msgpack: список строк, одна строка или bin
+    с теми же float32-байтами. Ошибка формата — HTTPException 400.
+    """
+    if kind == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise HTTPException(status_code=415, detail="msgpack не установлен")
+        try:
+            payload = msgpack.unpackb(body)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Некорректный msgpack: {exc}")
+        if isinstance(payload, bytes):
+            body, kind = payload, "float32"
+        else:
+            try:
+                rows = np.asarray(payload, dtype=np.float32)
+            except (TypeError, ValueError) as exc:
+                raise HTTPException(status_code=400, detail=f"Ожидались числа: {exc}")
+            if rows.ndim == 1:
+                rows = rows.reshape(1, -1)
+            if rows.ndim != 2 or rows.shape[1] != n_features:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Ожидались строки из {n_features} признаков",
+                )
+            return rows
+
+    row_bytes = n_features * _FLOAT32_LE.itemsize
+    if len(body) % row_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Длина тела {len(body)} не кратна размеру строки {row_bytes} байт",
+        )
+    return np.frombuffer(body, dtype=_FLOAT32_LE).reshape(-1, n_features)
+
+
+def encode_probabilities(probabilities) -> bytes:
+    """Метод упаковывает вероятности в little-endian float32"""
+    return np.asarray(probabilities, dtype=_FLOAT32_LE).tobytes()
+
+
+def accepts_binary(binary_endpoint):
+    """Декоратор: запросы с бинарным content-type обслуживает binary_endpoint"""
+
+    def decorator(endpoint):
+        endpoint.binary_endpoint = binary_endpoint
+        return endpoint
+
+    return decorator
+
+
+class BinaryRoute(APIRoute):
+    """Маршрут, который кроме JSON принимает float32/msgpack (см. accepts_binary).
+
+    Бинарное тело не проходит через pydantic: обработчик получает Request.
+    """
+
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
+        binary_endpoint = getattr(self.endpoint, "binary_endpoint", None)
+        if binary_endpoint is None:
+            return json_handler
+
+        async def route_handler(request):
+            kind = binary_kind(request.headers.get("content-type"))
+            if kind is not None:
+                return await binary_endpoint(request, kind)
+            return await json_handler(request)
+
+        return route_handler
@@ -0,0 +1,87 @@
+"""Кэш предсказаний с вытеснением по LRU и TTL"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter
+
+CACHE_HITS = Counter(
+    "credit_scoring_prediction_cache_hits_total", "Попадания в кэш предсказаний"
+)
+CACHE_MISSES = Counter(
+    "credit_scoring_prediction_cache_misses_total", "Промахи кэша предсказаний"
+)
+CACHE_EVICTIONS = Counter(
+    "credit_scoring_prediction_cache_evictions_total",
+    "Вытеснения из кэша предсказаний",
+    ["reason"],
+)
+
+
+class PredictionCache:
+    """Потокобезопасный кэш вероятностей по ключу (вектор признаков, версия модели).
+
+    Размер ограничен max_size (вытесняются давно не использованные записи),
+    записи старше ttl_seconds считаются устаревшими. При смене версии модели
+    кэш очищается целиком.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=300.0):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+    @staticmethod
+    def make_key(row: np.ndarray, model_version: str) -> bytes:
+        """Метод строит стабильный ключ по float32-вектору признаков и версии"""
+        # +0.0 приводит -0.0 к 0.0, чтобы одинаковые значения давали один ключ
+        canonical = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0.0)
+        digest = hashlib.blake2b(canonical.tobytes(), digest_size=16)
+        digest.update(str(model_version).encode())
+        return digest.digest()
+
+    def _check_version(self, model_version):
+        if model_version != self._version:
+            if self._data:
+                CACHE_EVICTIONS.labels(reason="model_change").inc(len(self._data))
+                self._data.clear()
+            self._version = model_version
+
+    def get(self, key: bytes, model_version: str):
+        """Метод возвращает закэшированное значение или None"""
+        with self._lock:
+            self._check_version(model_version)
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    CACHE_HITS.inc()
+                    return value
+                del self._data[key]
+                CACHE_EVICTIONS.labels(reason="ttl").inc()
+        CACHE_MISSES.inc()
+        return None
+
+    def set(self, key: bytes, value, model_version: str):
+        """Метод сохраняет значение и вытесняет лишние записи"""
+        with self._lock:
+            self._check_version(model_version)
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.labels(reason="lru").inc()
+
+    def clear(self):
+        """Метод очищает кэш"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
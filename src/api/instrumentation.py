@@ -0,0 +1,257 @@
+"""Поэтапные метрики инференса: разбор, признаки, препроцессинг, модель, ответ"""
+
+import asyncio
+import cProfile
+import inspect
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from prometheus_client import Counter, Histogram
+from starlette.concurrency import run_in_threadpool
+
+# parse — разбор и валидация тела, queue — ожидание потока пула синхронным
+# обработчиком, features — сборка вектора признаков, preprocessing/model — внутри
+# бэкенда, serialization — сборка JSON-ответа
+STAGES = ("parse", "queue", "features", "preprocessing", "model", "serialization")
+
+STAGE_SECONDS = Histogram(
+    "credit_scoring_inference_stage_seconds",
+    "Время этапа обработки запроса на предсказание",
+    ["stage", "model_version", "backend"],
+    buckets=(
+        0.00005,
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        1.0,
+    ),
+)
+PREDICTIONS = Counter(
+    "credit_scoring_predictions_total",
+    "Выданные предсказания по классам",
+    ["predicted_class", "model_version", "backend"],
+)
+
+# Тайминги текущего запроса; None — запрос не инструментирован
+_timings: ContextVar[dict | None] = ContextVar("stage_timings", default=None)
+
+
+def current_timings() -> dict | None:
+    """Метод возвращает словарь таймингов текущего запроса"""
+    return _timings.get()
+
+
+class stage:
+    """Контекстный менеджер: добавляет длительность блока к этапу запроса"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        timings = _timings.get()
+        if timings is not None:
+            elapsed = time.perf_counter() - self.start
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+class profile_section:
+    """Контекстный менеджер: cProfile блока, если запрос попал в выборку.
+
+    cProfile видит только текущий поток, поэтому на каждый поток, где
+    выполняется запрос, снимается отдельный профиль; они объединяются позже.
+    """
+
+    __slots__ = ("profile",)
+
+    def __enter__(self):
+        timings = _timings.get()
+        self.profile = None
+        if timings is not None and "_profile" in timings:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            _timings.get()["_profile"].append(self.profile)
+        return False
+
+
+def set_request_model(current):
+    """Метод запоминает модель, обслужившую запрос (для меток метрик)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings["_model"] = current
+
+
+def observe_stages(timings: dict, current):
+    """Метод пишет тайминги этапов в гистограмму с версией и бэкендом модели"""
+    for name, seconds in timings.items():
+        if not name.startswith("_"):
+            STAGE_SECONDS.labels(name, current.version, current.name).observe(seconds)
+
+
+def count_predictions(n_positive: int, n_total: int, current):
+    """Метод увеличивает счётчики предсказаний по классам"""
+    if n_positive:
+        PREDICTIONS.labels("1", current.version, current.name).inc(n_positive)
+    if n_total - n_positive:
+        PREDICTIONS.labels("0", current.version, current.name).inc(n_total - n_positive)
+
+
+def instrumented(endpoint):
+    """Декоратор обработчика: отмечает вход и выход для этапов parse/serialization.
+
+    Синхронный обработчик оборачивается в корутину, которая сама отправляет
+    его в пул потоков: момент отправки отделяет parse от ожидания потока (queue).
+    """
+
+    def mark(name):
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            mark("_handler_start")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                mark("_handler_end")
+
+    else:
+
+        def run(*args, **kwargs):
+            mark("_handler_start")
+            try:
+                # Синхронный обработчик целиком выполняется в потоке пула
+                with profile_section():
+                    return endpoint(*args, **kwargs)
+            finally:
+                mark("_handler_end")
+
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            mark("_dispatch")
+            return await run_in_threadpool(run, *args, **kwargs)
+
+    return wrapper
+
+
+class StageTimingMiddleware:
+    """ASGI-middleware: собирает тайминги этапов для запросов к paths.
+
+    parse — от начала запроса до входа в обработчик (чтение тела и валидация
+    pydantic), а у синхронного обработчика — до отправки в пул потоков; queue —
+    от отправки до старта в потоке пула, serialization — от выхода из
+    обработчика до начала ответа.
+    Метрики пишутся только для успешных ответов. Если get_profiler возвращает
+    SlowRequestProfiler, каждый запрос с этапами и размерами тела передаётся
+    в его журнал.
+    """
+
+    def __init__(self, app, get_model, paths, get_profiler=lambda: None):
+        self.app = app
+        self.get_model = get_model
+        self.paths = frozenset(paths)
+        self.get_profiler = get_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        profiler = self.get_profiler()
+        if profiler is not None:
+            await self._call_profiled(profiler, scope, receive, send)
+            return
+
+        timings = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                self._finish(timings, start, message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _timings.reset(token)
+
+    async def _call_profiled(self, profiler, scope, receive, send):
+        timings = {}
+        if profiler.should_profile():
+            timings["_profile"] = []
+        request = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": None,
+            "request_bytes": 0,
+            "response_bytes": 0,
+        }
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def receive_counted():
+            message = await receive()
+            if message["type"] == "http.request":
+                request["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                request["status"] = message["status"]
+                self._finish(timings, start, message["status"])
+            elif message["type"] == "http.response.body":
+                request["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_counted, send_with_timings)
+        finally:
+            _timings.reset(token)
+            duration = time.perf_counter() - start
+            if "_profile" in timings:
+                # Запись .prof — в пуле потоков, не в event loop
+                asyncio.get_running_loop().run_in_executor(
+                    None, profiler.record, request, duration, timings
+                )
+            else:
+                profiler.record(request, duration, timings)
+
+    def _finish(self, timings, start, status):
+        now = time.perf_counter()
+        handler_start = timings.pop("_handler_start", None)
+        handler_end = timings.pop("_handler_end", None)
+        dispatch = timings.pop("_dispatch", None)
+        current = timings.get("_model") or self.get_model()
+        if status >= 400 or handler_start is None or current is None:
+            return
+        # Декодирование бинарного тела обработчик добавляет сам
+        parse_end = handler_start if dispatch is None else dispatch
+        timings["parse"] = timings.get("parse", 0.0) + parse_end - start
+        if dispatch is not None:
+            timings["queue"] = handler_start - dispatch
+        if handler_end is not None:
+            timings["serialization"] = now - handler_end
+        observe_stages(timings, current)
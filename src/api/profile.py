@@ -0,0 +1,78 @@
+"""Профиль сервинга: настройки запуска, подобранные
+scripts/model_training/tune_serving.py"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Переменные окружения, которые задаёт профиль
+PROFILE_KEYS = (
+    "MODEL_PATH",
+    "MODEL_BACKEND",
+    "ORT_INTRA_OP_THREADS",
+    "ORT_INTER_OP_THREADS",
+    "OMP_NUM_THREADS",
+    "MICROBATCH_ENABLED",
+    "MICROBATCH_MAX_SIZE",
+    "MICROBATCH_MAX_WAIT_MS",
+    "MAX_CONCURRENT_REQUESTS",
+    "WEB_CONCURRENCY",
+)
+
+
+def cgroup_cpu_limit(root: Path = Path("/sys/fs/cgroup")) -> float | None:
+    """Метод возвращает лимит CPU контейнера в ядрах по квоте cgroup.
+
+    cgroup v2 — cpu.max ("50000 100000" для лимита 500m), v1 —
+    cpu.cfs_quota_us и cpu.cfs_period_us. None, если квоты нет.
+    """
+    try:
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+
+def load_serving_profile(path: str | Path) -> dict:
+    """Метод читает профиль и проверяет, что он задаёт только PROFILE_KEYS"""
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    env = profile.get("env")
+    if not isinstance(env, dict):
+        raise ValueError(f"В профиле сервинга {path} нет раздела env")
+    unknown = sorted(set(env) - set(PROFILE_KEYS))
+    if unknown:
+        raise ValueError(f"Неизвестные настройки в профиле сервинга {path}: {unknown}")
+    return profile
+
+
+def apply_serving_profile(path: str, project_root: Path, environ=None) -> dict | None:
+    """Метод переносит настройки профиля в окружение процесса.
+
+    Значения профиля заменяют переменные окружения с теми же именами (в том
+    числе из ConfigMap); чтобы задать их вручную, оставьте SERVING_PROFILE
+    пустым. Если файла нет, настройки остаются как есть.
+    """
+    if not path:
+        return None
+    environ = os.environ if environ is None else environ
+    path = project_root / path
+    if not path.exists():
+        logger.warning(
+            "Профиль сервинга не найден: %s, используются переменные окружения", path
+        )
+        return None
+    profile = load_serving_profile(path)
+    for key, value in profile["env"].items():
+        environ[key] = str(value)
+    profile["path"] = str(path)
+    return profile
@@ -0,0 +1,135 @@
+"""Профилировщик медленных запросов: топ-N за окно и выборочный cProfile"""
+
+import heapq
+import itertools
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+
+class SlowRequestLog:
+    """N самых медленных запросов за скользящее окно window_seconds.
+
+    Окно разбито на buckets корзин, в каждой — min-heap не больше top_n
+    записей, так что добавление стоит O(log N), а память ограничена
+    top_n * buckets записями. Устаревшие корзины выбрасываются целиком.
+    """
+
+    def __init__(self, top_n=20, window_seconds=300.0, buckets=6):
+        self.top_n = top_n
+        self.window = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self._buckets = deque()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def add(self, duration: float, record: dict, now: float = None):
+        """Метод учитывает запрос; запись хранится, если он в топе корзины"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if not self._buckets or now - self._buckets[-1][0] >= self.bucket_seconds:
+                self._buckets.append((now, []))
+            heap = self._buckets[-1][1]
+            item = (duration, next(self._seq), record)
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, item)
+            elif duration > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def slowest(self, now: float = None) -> list[dict]:
+        """Метод возвращает записи окна по убыванию длительности"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            items = [item for _, heap in self._buckets for item in heap]
+        return [record for _, _, record in heapq.nlargest(self.top_n, items)]
+
+
+class SlowRequestProfiler:
+    """Журнал медленных запросов и cProfile для каждого profile_every-го запроса.
+
+    Профили всех потоков, где выполнялся запрос, объединяются в один
+    .prof-файл в profile_dir (смотреть: python -m pstats, snakeviz). В
+    каталоге остаются max_profiles самых новых файлов, остальные удаляются.
+    """
+
+    def __init__(
+        self,
+        top_n=20,
+        window_seconds=300.0,
+        profile_every=0,
+        profile_dir="profiles",
+        max_profiles=100,
+    ):
+        self.log = SlowRequestLog(top_n, window_seconds)
+        self.profile_every = profile_every
+        self.profile_dir = Path(profile_dir)
+        self.max_profiles = max_profiles
+        self._counter = itertools.count(1)
+        self._dump_seq = itertools.count(1)
+        self._dump_lock = threading.Lock()
+
+    def should_profile(self) -> bool:
+        """Метод решает, снимать ли cProfile с очередного запроса (1 из K)"""
+        return self.profile_every > 0 and next(self._counter) % self.profile_every == 0
+
+    def dump_profiles(self, profiles, label: str) -> str | None:
+        """Метод объединяет профили запроса и пишет их в profile_dir.
+
+        Имя файла — время в мс, pid воркера и номер дампа в процессе, поэтому
+        профили одновременных запросов и разных воркеров не перезаписываются.
+        """
+        if not profiles:
+            return None
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        name = (
+            f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._dump_seq)}"
+            f"-{label.strip('/').replace('/', '_')}.prof"
+        )
+        path = self.profile_dir / name
+        stats.dump_stats(path)
+        self._prune_profiles()
+        return str(path)
+
+    def _prune_profiles(self):
+        with self._dump_lock:
+            paths = []
+            for path in self.profile_dir.glob("*.prof"):
+                try:
+                    paths.append((path.stat().st_mtime, path.name, path))
+                except FileNotFoundError:
+                    continue  # уже удалён другим воркером
+            paths.sort(reverse=True)
+            for _, _, path in paths[self.max_profiles :]:
+                path.unlink(missing_ok=True)
+
+    def record(self, request: dict, duration: float, timings: dict):
+        """Метод добавляет запрос в журнал и сохраняет его профиль, если снимался"""
+        current = timings.get("_model")
+        record = {
+            **request,
+            "timestamp": time.time(),
+            "total_ms": round(duration * 1000, 3),
+            "stages_ms": {
+                name: round(seconds * 1000, 3)
+                for name, seconds in timings.items()
+                if not name.startswith("_")
+            },
+            "model_version": getattr(current, "version", None),
+            "profile": None,
+        }
+        profiles = timings.get("_profile")
+        if profiles:
+            record["profile"] = self.dump_profiles(profiles, request["path"])
+        self.log.add(duration, record)
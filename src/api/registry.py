@@ -0,0 +1,264 @@
+"""Несколько версий модели в одном процессе: маршрутизация, теневой скоринг"""
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.models.backends import BACKEND_NAMES
+
+VARIANT_EVICTIONS = Counter(
+    "credit_scoring_model_variant_evictions_total",
+    "Варианты модели, выгруженные из памяти по бюджету",
+)
+VARIANT_BYTES = Gauge(
+    "credit_scoring_model_variants_bytes",
+    "Оценка памяти загруженных вариантов модели",
+)
+SHADOW_LATENCY = Histogram(
+    "credit_scoring_shadow_latency_seconds",
+    "Время теневого скоринга кандидата",
+    ["variant"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+SHADOW_SCORE_DELTA = Histogram(
+    "credit_scoring_shadow_score_delta",
+    "Модуль разницы вероятностей кандидата и основной модели",
+    ["variant"],
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+SHADOW_DISAGREEMENTS = Counter(
+    "credit_scoring_shadow_disagreements_total",
+    "Строки, где класс кандидата отличается от основной модели",
+    ["variant"],
+)
+SHADOW_DROPPED = Counter(
+    "credit_scoring_shadow_dropped_total",
+    "Теневые задания, отброшенные из-за переполненной очереди",
+    ["variant"],
+)
+SHADOW_ERRORS = Counter(
+    "credit_scoring_shadow_errors_total",
+    "Ошибки теневого скоринга",
+    ["variant"],
+)
+
+
+def parse_mapping(spec: str) -> dict[str, str]:
+    """Метод разбирает строку вида "nn=models/model.onnx,q=..." в словарь"""
+    mapping = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip() or not value.strip():
+            raise ValueError(f"Ожидалось имя=значение, получено: {item!r}")
+        mapping[name.strip()] = value.strip()
+    return mapping
+
+
+def parse_variants(spec: str) -> tuple[dict[str, str], dict[str, str]]:
+    """Метод разбирает MODEL_VARIANTS: "имя=путь" или "имя=бэкенд:путь".
+
+    Возвращает пути и бэкенды вариантов; вариант без бэкенда загружается
+    бэкендом основной модели (MODEL_BACKEND).
+    """
+    paths, backends = {}, {}
+    for name, value in parse_mapping(spec).items():
+        backend, sep, path = value.partition(":")
+        if sep:
+            if backend not in BACKEND_NAMES or not path:
+                raise ValueError(
+                    f"Ожидалось {name}=бэкенд:путь с бэкендом из {BACKEND_NAMES}, "
+                    f"получено: {value!r}"
+                )
+            backends[name] = backend
+        else:
+            path = value
+        paths[name] = path
+    return paths, backends
+
+
+def check_variant_names(variants, traffic_split, shadow_model, primary):
+    """Метод проверяет, что доли трафика и теневая модель — известные варианты"""
+    if primary in variants:
+        raise ValueError(
+            f"Имя {primary!r} занято основной моделью: вариант с ним не выбрать"
+        )
+    unknown = sorted(set(traffic_split) - set(variants) - {primary})
+    if shadow_model is not None and shadow_model not in variants:
+        unknown.append(shadow_model)
+    if unknown:
+        raise ValueError(
+            f"Варианты {unknown} не заданы в MODEL_VARIANTS "
+            f"(доступны: {sorted(variants)}, основная модель — {primary})"
+        )
+
+
+def choose_variant(weights: dict[str, float], rand=random.random):
+    """Метод выбирает вариант по долям трафика в процентах.
+
+    Остаток до 100% уходит основной модели (возвращается None).
+    """
+    point = rand() * 100
+    for name, weight in weights.items():
+        point -= weight
+        if point < 0:
+            return name
+    return None
+
+
+def reorder_columns(X: np.ndarray, source, target) -> np.ndarray:
+    """Метод переставляет колонки X из порядка source в порядок target"""
+    if list(source) == list(target):
+        return X
+    index = [list(source).index(name) for name in target]
+    return X[:, index]
+
+
+class ModelRegistry:
+    """Именованные варианты модели, загружаемые по требованию.
+
+    Вариант загружается вызовом load(path, backend=...), где backend — из
+    backends или None (бэкенд основной модели). Память варианта — прирост RSS
+    при загрузке (backend.memory), но не меньше размера артефакта; при
+    превышении memory_budget выгружаются давно не использованные варианты.
+    Запросы, уже получившие ссылку на выгруженную модель, дорабатывают на ней.
+    """
+
+    def __init__(self, paths: dict, load, memory_budget: int, backends=None):
+        self.paths = dict(paths)
+        self.backends = dict(backends or {})
+        self.memory_budget = memory_budget
+        self._load = load
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def peek(self, name: str):
+        """Метод возвращает уже загруженный вариант или None (без загрузки)"""
+        return self._touch(name)
+
+    def _touch(self, name):
+        with self._lock:
+            item = self._loaded.get(name)
+            if item is None:
+                return None
+            self._loaded.move_to_end(name)
+            return item[0]
+
+    def get(self, name: str):
+        """Метод возвращает вариант по имени, загружая его при необходимости.
+
+        Загрузка с прогревом занимает секунды: из асинхронного кода метод
+        вызывается в пуле потоков, а не в цикле событий.
+        """
+        if name not in self.paths:
+            raise KeyError(name)
+        backend = self._touch(name)
+        if backend is not None:
+            return backend
+        with self._load_lock:
+            backend = self._touch(name)
+            if backend is None:
+                path = self.paths[name]
+                backend = self._load(path, backend=self.backends.get(name))
+                backend.variant = name
+                self._insert(name, backend, self._footprint(backend, path))
+        return backend
+
+    @staticmethod
+    def _footprint(backend, path) -> int:
+        # Распакованный joblib-ансамбль занимает в памяти в разы больше файла
+        size = os.path.getsize(path)
+        memory = getattr(backend, "memory", None)
+        if memory is None or "rss" not in memory["after_load"]:
+            return size
+        return max(memory["after_load"]["rss"] - memory["before_load"]["rss"], size)
+
+    def _insert(self, name, backend, size):
+        with self._lock:
+            self._loaded[name] = (backend, size)
+            # Только что загруженный вариант не выгружаем, даже если он больше бюджета
+            while len(self._loaded) > 1 and self.loaded_bytes() > self.memory_budget:
+                self._loaded.popitem(last=False)
+                VARIANT_EVICTIONS.inc()
+            VARIANT_BYTES.set(self.loaded_bytes())
+
+    def loaded_bytes(self) -> int:
+        """Метод возвращает оценку памяти загруженных вариантов"""
+        return sum(size for _, size in self._loaded.values())
+
+    def loaded(self) -> dict:
+        """Метод возвращает сведения о загруженных вариантах"""
+        with self._lock:
+            return {
+                name: {
+                    "model_version": backend.version,
+                    "backend": backend.name,
+                    "size_bytes": size,
+                }
+                for name, (backend, size) in self._loaded.items()
+            }
+
+
+class ShadowScorer:
+    """Теневой скоринг кандидата в отдельном потоке вне пути ответа.
+
+    Очередь ограничена max_pending заданиями: при перегрузке задания
+    отбрасываются, а не копятся. Разница с основной моделью пишется в метрики.
+    """
+
+    def __init__(self, variant: str, get_candidate, threshold, max_pending=100):
+        self.variant = variant
+        self.get_candidate = get_candidate
+        self.threshold = threshold
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shadow-scoring"
+        )
+
+    def submit(self, X: np.ndarray, probabilities: np.ndarray, primary):
+        """Метод ставит теневой скоринг в очередь; возвращает Future или None"""
+        if not self._slots.acquire(blocking=False):
+            SHADOW_DROPPED.labels(self.variant).inc()
+            return None
+        future = self._executor.submit(self._score, X, probabilities, primary)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _score(self, X, primary_probabilities, primary):
+        try:
+            candidate = self.get_candidate()
+            if candidate is primary:
+                return
+            X = reorder_columns(X, primary.feature_names, candidate.feature_names)
+            start = time.perf_counter()
+            probabilities = candidate.predict_proba(X)
+            SHADOW_LATENCY.labels(self.variant).observe(time.perf_counter() - start)
+        except Exception:
+            SHADOW_ERRORS.labels(self.variant).inc()
+            return
+        delta = SHADOW_SCORE_DELTA.labels(self.variant)
+        for value in np.abs(probabilities - primary_probabilities):
+            delta.observe(float(value))
+        disagreements = int(
+            (
+                (probabilities >= self.threshold)
+                != (primary_probabilities >= self.threshold)
+            ).sum()
+        )
+        if disagreements:
+            SHADOW_DISAGREEMENTS.labels(self.variant).inc(disagreements)
+
+    def shutdown(self):
+        """Метод дожидается оставшихся заданий и останавливает поток"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,88 @@
+"""Горячая перезагрузка модели: метрики версии и наблюдение за файлом"""
+
+import os
+import threading
+
+from prometheus_client import Counter, Gauge
+
+MODEL_INFO = Gauge(
+    "credit_scoring_model_info",
+    "Активная модель (1 — для текущей версии)",
+    ["version", "backend"],
+)
+MODEL_RELOADS = Counter(
+    "credit_scoring_model_reloads_total",
+    "Перезагрузки модели",
+    ["result"],
+)
+WORKER_MEMORY = Gauge(
+    "credit_scoring_worker_memory_bytes",
+    "Память воркера до и после загрузки модели (rss, pss, shared, private)",
+    ["stage", "kind"],
+)
+
+
+def set_active_model(backend, previous=None):
+    """Метод отмечает в метриках активную версию модели"""
+    if previous is not None:
+        try:
+            MODEL_INFO.remove(previous.version, previous.name)
+        except KeyError:
+            pass
+    MODEL_INFO.labels(version=backend.version, backend=backend.name).set(1)
+
+
+def set_worker_memory(before: dict, after: dict):
+    """Метод отмечает в метриках память воркера до и после загрузки модели"""
+    for stage, memory in (("before_load", before), ("after_load", after)):
+        for kind, value in memory.items():
+            WORKER_MEMORY.labels(stage=stage, kind=kind).set(value)
+
+
+class ModelFileWatcher:
+    """Фоновый поток: при изменении файла модели вызывает on_change.
+
+    Изменение определяется по (mtime, размер) с периодом interval секунд.
+    """
+
+    def __init__(self, get_path, on_change, interval=10.0):
+        self.get_path = get_path
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        """Метод запускает поток наблюдения"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="model-file-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Метод останавливает поток наблюдения"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        path = self.get_path()
+        last = self._signature(path)
+        while not self._stop.wait(self.interval):
+            current_path = self.get_path()
+            signature = self._signature(current_path)
+            if current_path != path:
+                path, last = current_path, signature
+                continue
+            if signature is not None and signature != last:
+                last = signature
+                self.on_change(path)
@@ -0,0 +1,36 @@
+"""Запуск API: uvicorn с числом воркеров и настройками из профиля сервинга.
+
+uvicorn читает WEB_CONCURRENCY до импорта приложения, поэтому профиль
+(SERVING_PROFILE) применяется здесь, до старта воркеров:
+python -m src.api.serve
+"""
+
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+from src.api.profile import apply_serving_profile
+
+
+def main():
+    log_level = os.getenv("LOG_LEVEL", "info")
+    logging.basicConfig(level=log_level.upper(), format="%(levelname)s: %(message)s")
+    project_root = Path(__file__).resolve().parents[2]
+    profile = apply_serving_profile(os.getenv("SERVING_PROFILE", ""), project_root)
+    if profile is not None:
+        logging.getLogger(__name__).info(
+            "Профиль сервинга: %s (%s)", profile["path"], profile.get("created_at")
+        )
+    uvicorn.run(
+        "src.api.app:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        log_level=log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
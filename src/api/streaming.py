@@ -0,0 +1,154 @@
+"""Потоковый скоринг: NDJSON/CSV на входе, NDJSON на выходе"""
+
+import json
+from operator import attrgetter
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from src.api.instrumentation import count_predictions, observe_stages
+
+# Ограничение длины одной строки входа, чтобы память не зависела от входа
+MAX_LINE_BYTES = 64 * 1024
+
+
+class StreamFormatError(ValueError):
+    """Ошибка формата строки во входном потоке"""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse, который читает тело запроса во время ответа.
+
+    Стандартный StreamingResponse (ASGI < 2.4) параллельно ждёт receive()
+    ради отключения клиента и забирает сообщения тела запроса. Здесь тело
+    читает сам генератор, а отключение всплывает из request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(chunks):
+    """Метод разбивает поток байтов на строки, не накапливая вход целиком"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise StreamFormatError(f"Строка длиннее {MAX_LINE_BYTES} байт")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _validation_message(exc: ValidationError) -> str:
+    """Метод сводит ошибки pydantic в одну строку: поле и причина"""
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'запись'}: {e['msg']}" for e in exc.errors()
+    )
+
+
+def ndjson_parser(schema, feature_names):
+    """Метод возвращает парсер строки NDJSON в кортеж признаков.
+
+    Запись проверяется схемой запроса (типы полей ClientData): null и
+    нечисловые значения — ошибка строки, а не NaN, который ушёл бы в импутер.
+    """
+    get_row = attrgetter(*feature_names)
+
+    def parse(line: bytes):
+        try:
+            return get_row(schema.model_validate_json(line))
+        except ValidationError as exc:
+            raise StreamFormatError(_validation_message(exc)) from None
+
+    return parse
+
+
+def csv_parser(header: bytes, schema, feature_names):
+    """Метод возвращает парсер строки CSV по заголовку (проверка — схемой запроса)"""
+    try:
+        columns = [c.strip().strip('"') for c in header.decode().split(",")]
+    except UnicodeDecodeError as exc:
+        raise StreamFormatError(f"Некорректная кодировка: {exc}") from None
+    fields = list(schema.model_fields)
+    missing = [name for name in fields if name not in columns]
+    if missing:
+        raise StreamFormatError(f"Не хватает колонок: {missing}")
+    index = [columns.index(name) for name in fields]
+    get_row = attrgetter(*feature_names)
+
+    def parse(line: bytes):
+        try:
+            parts = line.decode().split(",")
+        except UnicodeDecodeError as exc:
+            raise StreamFormatError(f"Некорректная кодировка: {exc}") from None
+        if len(parts) != len(columns):
+            raise StreamFormatError(f"Ожидалось {len(columns)} колонок")
+        record = {name: parts[i].strip() for name, i in zip(fields, index)}
+        try:
+            return get_row(schema.model_validate(record))
+        except ValidationError as exc:
+            raise StreamFormatError(_validation_message(exc)) from None
+
+    return parse
+
+
+def _format_results(probabilities, threshold: float) -> str:
+    return "".join(
+        f'{{"default_prediction": {int(p >= threshold)}, '
+        f'"default_probability": {float(p)}}}\n'
+        for p in probabilities
+    )
+
+
+async def _score_chunk(X, current, threshold):
+    """Метод скорит чанк в пуле потоков и пишет метрики этапов модели"""
+    timings = {}
+    probabilities = await run_in_threadpool(current.predict_proba, X, timings)
+    observe_stages(timings, current)
+    count_predictions(int((probabilities >= threshold).sum()), len(X), current)
+    return _format_results(probabilities, threshold)
+
+
+async def score_stream(
+    lines, current, schema, is_csv: bool, chunk_size: int, threshold
+):
+    """Метод скорит строки фиксированными чанками и отдаёт NDJSON по мере готовности.
+
+    Новая порция входа читается только после того, как клиент забрал
+    предыдущий результат, поэтому память ограничена одним чанком. На первой
+    ошибке формата поток останавливается: строки до неё скорятся, затем
+    отдаётся запись об ошибке с номером строки.
+    """
+    X = np.empty((chunk_size, len(current.feature_names)), dtype=np.float32)
+    parse = None if is_csv else ndjson_parser(schema, current.feature_names)
+    n, line_number, error = 0, 0, None
+    try:
+        async for line in lines:
+            line_number += 1
+            if parse is None:
+                parse = csv_parser(line, schema, current.feature_names)
+                continue
+            X[n] = parse(line)
+            n += 1
+            if n == chunk_size:
+                yield await _score_chunk(X, current, threshold)
+                n = 0
+    except StreamFormatError as exc:
+        error = exc
+    if n:
+        yield await _score_chunk(X[:n], current, threshold)
+    if error is not None:
+        # Статус ответа уже отправлен, поэтому ошибка — последней строкой
+        yield json.dumps({"error": str(error), "line": line_number}) + "\n"
@@ -1,5 +1,7 @@
 """Создание признаков для предсказания дефолта"""
 
+import warnings
+
 import pandas as pd
 import numpy as np
 
@@ -16,30 +18,84 @@ BILL_COLS = [
 PAY_AMT_COLS = ["PAY_AMT1", "PAY_AMT2", "PAY_AMT3", "PAY_AMT4", "PAY_AMT5", "PAY_AMT6"]
 
 
+# Агрегированные признаки в порядке колонок compute_aggregates
+AGGREGATE_COLS = [
+    "PAY_MEAN",
+    "PAY_MAX",
+    "PAY_MIN",
+    "BILL_AMT_MEAN",
+    "BILL_AMT_MAX",
+    "PAY_AMT_MEAN",
+    "PAY_AMT_SUM",
+    "PAY_TO_BILL_RATIO",
+]
+
+
+def compute_aggregates(pay, bill, pay_amt, out=None) -> np.ndarray:
+    """Метод считает агрегаты по матрицам [n, 6] истории платежей.
+
+    Общая реализация для обучения и API: результат — матрица [n, 8] в порядке
+    AGGREGATE_COLS, записывается в out без промежуточных копий. Если группа
+    колонок не передана (None), её агрегаты остаются NaN. Пропуски внутри
+    группы пропускаются, как в pandas: среднее, максимум и минимум строки
+    без единого значения — NaN, сумма — 0.
+    """
+    blocks = [b for b in (pay, bill, pay_amt) if b is not None]
+    n = blocks[0].shape[0] if blocks else 0
+    if out is None:
+        out = np.full((n, len(AGGREGATE_COLS)), np.nan)
+
+    with warnings.catch_warnings():
+        # Строка из одних NaN даёт NaN без предупреждения, как в pandas
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if pay is not None:
+            np.nanmean(pay, axis=1, out=out[:, 0])
+            np.nanmax(pay, axis=1, out=out[:, 1])
+            np.nanmin(pay, axis=1, out=out[:, 2])
+
+        if bill is not None:
+            np.nanmean(bill, axis=1, out=out[:, 3])
+            np.nanmax(bill, axis=1, out=out[:, 4])
+
+        if pay_amt is not None:
+            np.nanmean(pay_amt, axis=1, out=out[:, 5])
+            np.nansum(pay_amt, axis=1, out=out[:, 6])
+
+    # Отношение платежей к сумме счёта
+    if bill is not None and pay_amt is not None:
+        ratio = out[:, 7]
+        ratio[:] = 0
+        np.divide(out[:, 5], out[:, 3], out=ratio, where=out[:, 3] > 0)
+
+    return out
+
+
 def add_aggregate_features(df: pd.DataFrame) -> pd.DataFrame:
     """Метод добавляет агрегированные признаки из истории платежей"""
     df = df.copy()
 
-    if all(c in df.columns for c in PAY_COLS):
-        df["PAY_MEAN"] = df[PAY_COLS].mean(axis=1)
-        df["PAY_MAX"] = df[PAY_COLS].max(axis=1)
-        df["PAY_MIN"] = df[PAY_COLS].min(axis=1)
+    def block(cols):
+        if all(c in df.columns for c in cols):
+            return df[cols].to_numpy(dtype=np.float64)
+        return None
 
-    if all(c in df.columns for c in BILL_COLS):
-        df["BILL_AMT_MEAN"] = df[BILL_COLS].mean(axis=1)
-        df["BILL_AMT_MAX"] = df[BILL_COLS].max(axis=1)
+    pay, bill, pay_amt = block(PAY_COLS), block(BILL_COLS), block(PAY_AMT_COLS)
+    aggregates = compute_aggregates(pay, bill, pay_amt)
 
-    if all(c in df.columns for c in PAY_AMT_COLS):
-        df["PAY_AMT_MEAN"] = df[PAY_AMT_COLS].mean(axis=1)
-        df["PAY_AMT_SUM"] = df[PAY_AMT_COLS].sum(axis=1)
+    groups = [
+        (pay is not None, AGGREGATE_COLS[0:3]),
+        (bill is not None, AGGREGATE_COLS[3:5]),
+        (pay_amt is not None, AGGREGATE_COLS[5:7]),
+        (bill is not None and pay_amt is not None, AGGREGATE_COLS[7:]),
+    ]
+    for present, names in groups:
+        for name in names if present else []:
+            df[name] = aggregates[:, AGGREGATE_COLS.index(name)]
 
-    # Отношение платежей к сумме счёта
-    if "BILL_AMT_MEAN" in df.columns and "PAY_AMT_MEAN" in df.columns:
-        df["PAY_TO_BILL_RATIO"] = np.where(
-            df["BILL_AMT_MEAN"] > 0,
-            df["PAY_AMT_MEAN"] / df["BILL_AMT_MEAN"],
-            0,
-        )
+    # Максимум и минимум статусов платежей остаются целыми, как в исходных колонках
+    if pay is not None and all(pd.api.types.is_integer_dtype(df[c]) for c in PAY_COLS):
+        df["PAY_MAX"] = df["PAY_MAX"].astype(np.int64)
+        df["PAY_MIN"] = df["PAY_MIN"].astype(np.int64)
 
     return df
 
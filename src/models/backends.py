@@ -0,0 +1,373 @@
+"""Бэкенды инференса для API: sklearn (pickle), numpy-препроцессинг, ONNX Runtime и
+компилированный GBM"""
+
+import hashlib
+import json
+import platform
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.models.compiled import CompiledGradientBoosting
+from src.models.onnx_export import probability_column, probability_output
+
+
+def _compile_preprocessor(preprocessor, feature_names, dtype=np.float64):
+    """Метод собирает numpy-версию обученного ColumnTransformer.
+
+    Поддерживается структура из create_pipeline: SimpleImputer + StandardScaler
+    для числовых и SimpleImputer + OneHotEncoder для категориальных признаков.
+    Вычисления идут в float64, как в sklearn; результат приводится к dtype.
+    Для других пайплайнов возвращает None.
+    """
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+
+    blocks = []
+    for _, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        if not isinstance(transformer, Pipeline):
+            return None
+        idx = np.array([feature_names.index(c) for c in columns], dtype=np.intp)
+        fill, mean, scale, categories = None, None, None, None
+        for _, step in transformer.steps:
+            if isinstance(step, SimpleImputer) and fill is None:
+                if step.add_indicator:
+                    return None
+                try:
+                    fill = step.statistics_.astype(np.float64)
+                except (TypeError, ValueError):
+                    return None
+            elif isinstance(step, StandardScaler) and mean is None:
+                mean = step.mean_ if step.with_mean else 0.0
+                scale = step.scale_ if step.with_std else 1.0
+            elif (
+                isinstance(step, OneHotEncoder)
+                and categories is None
+                and step.handle_unknown == "ignore"
+                and step.drop is None
+                and getattr(step, "_infrequent_enabled", False) is False
+            ):
+                if any(c.dtype.kind not in "fiu" for c in step.categories_):
+                    return None
+                categories = [c.astype(np.float64) for c in step.categories_]
+            else:
+                return None
+        blocks.append((idx, fill, mean, scale, categories))
+
+    width = sum(
+        len(idx) if categories is None else sum(len(c) for c in categories)
+        for idx, _, _, _, categories in blocks
+    )
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        out = np.empty((len(X), width), dtype=dtype)
+        start = 0
+        for idx, fill, mean, scale, categories in blocks:
+            Z = X[:, idx].astype(np.float64)
+            if fill is not None:
+                Z = np.where(np.isnan(Z), fill, Z)
+            if mean is not None:
+                Z = (Z - mean) / scale
+            if categories is not None:
+                # handle_unknown="ignore": неизвестная категория даёт нули
+                Z = np.hstack(
+                    [(Z[:, j : j + 1] == cats) for j, cats in enumerate(categories)]
+                )
+            out[:, start : start + Z.shape[1]] = Z
+            start += Z.shape[1]
+        return out
+
+    return transform
+
+
+class SklearnBackend:
+    """Инференс обученного sklearn-пайплайна: predict_proba на DataFrame"""
+
+    name = "sklearn"
+    version = "unknown"
+
+    def __init__(self, model, feature_names):
+        self.model = model
+        # Порядок колонок, в котором модель ждёт матрицу признаков
+        self.feature_names = list(getattr(model, "feature_names_in_", feature_names))
+
+    @classmethod
+    def load(cls, model_path, feature_names, mmap=False):
+        """Метод загружает pickle-модель с диска.
+
+        При mmap=True numpy-массивы модели (веса MLP, статистики препроцессинга)
+        отображаются из файла только для чтения: воркеры одного пода делят
+        их страницы через page cache. Работает для несжатого joblib.dump.
+        Файл нельзя перезаписывать на месте, пока модель загружена (SIGBUS при
+        обращении к массивам) — новая версия подменяется через os.replace.
+        """
+        return cls(
+            joblib.load(model_path, mmap_mode="r" if mmap else None), feature_names
+        )
+
+    def predict_proba(self, X: np.ndarray, timings: dict = None) -> np.ndarray:
+        """Метод возвращает вероятность класса 1 для матрицы признаков.
+
+        Если передан timings, шаги пайплайна вызываются по очереди (как в
+        Pipeline.predict_proba), и в него пишется время этапов preprocessing и model.
+        """
+        start = time.perf_counter()
+        frame = pd.DataFrame(
+            np.asarray(X, dtype=np.float64), columns=self.feature_names
+        )
+        if timings is None:
+            return self.model.predict_proba(frame)[:, 1]
+        if isinstance(self.model, Pipeline):
+            Z, classifier = self.model[:-1].transform(frame), self.model[-1]
+        else:
+            Z, classifier = frame, self.model
+        prepared = time.perf_counter()
+        proba = classifier.predict_proba(Z)[:, 1]
+        timings["preprocessing"] = prepared - start
+        timings["model"] = time.perf_counter() - prepared
+        return proba
+
+
+class SklearnNumpyBackend(SklearnBackend):
+    """sklearn-классификатор с препроцессингом, переписанным на numpy.
+
+    Обученный ColumnTransformer из create_pipeline воспроизводится
+    _compile_preprocessor без DataFrame на запрос; классификатор — тот же
+    объект sklearn. Бэкенд по умолчанию для .pkl (load_backend); пайплайн
+    как есть — MODEL_BACKEND=sklearn.
+    """
+
+    name = "sklearn_numpy"
+
+    def __init__(self, model, feature_names):
+        super().__init__(model, feature_names)
+        if not isinstance(model, Pipeline) or len(model.steps) != 2:
+            raise ValueError("Ожидался пайплайн из препроцессора и классификатора")
+        self._transform = _compile_preprocessor(model.steps[0][1], self.feature_names)
+        if self._transform is None:
+            raise ValueError("Препроцессинг пайплайна не поддерживается")
+        self._classifier = model.steps[1][1]
+
+    def predict_proba(self, X: np.ndarray, timings: dict = None) -> np.ndarray:
+        """Метод возвращает вероятность класса 1 для матрицы признаков"""
+        start = time.perf_counter()
+        Z = self._transform(X)
+        prepared = time.perf_counter()
+        proba = self._classifier.predict_proba(Z)[:, 1]
+        if timings is not None:
+            timings["preprocessing"] = prepared - start
+            timings["model"] = time.perf_counter() - prepared
+        return proba
+
+
+def optimization_metadata(model_path: str | Path) -> dict | None:
+    """Метод читает метаданные предоптимизированного графа (.json рядом с .onnx)"""
+    meta_path = Path(model_path).with_suffix(".json")
+    if not meta_path.exists():
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    return meta if "graph_optimization_level" in meta else None
+
+
+def session_options(
+    model_path,
+    intra_op_threads=1,
+    inter_op_threads=1,
+    providers=("CPUExecutionProvider",),
+):
+    """Метод собирает SessionOptions ORT для модели (0 потоков — по умолчанию ORT).
+
+    Граф, сохранённый scripts/model_training/optimize_graph.py, уже
+    оптимизирован: ORT не повторяет оптимизацию при создании сессии. Если
+    артефакт записан другой версией onnxruntime, на другой архитектуре или
+    процессоре или для других providers, граф оптимизируется заново на
+    уровне из метаданных.
+    """
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    if intra_op_threads:
+        opts.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        opts.inter_op_num_threads = inter_op_threads
+    meta = optimization_metadata(model_path)
+    if meta is not None:
+        same_host = (
+            meta.get("onnxruntime_version") == ort.__version__
+            and meta.get("machine") == platform.machine()
+            and meta.get("processor") == platform.processor()
+            and meta.get("providers") == list(providers)
+        )
+        if same_host:
+            level = "ORT_DISABLE_ALL"
+        else:
+            level = meta["graph_optimization_level"]
+        # Уровня из более новой версии ORT (ORT_ENABLE_LAYOUT) здесь может не быть
+        opts.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel,
+            level,
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        )
+    return opts
+
+
+class OnnxBackend:
+    """Инференс ONNX-модели через onnxruntime.InferenceSession"""
+
+    name = "onnx"
+    version = "unknown"
+
+    def __init__(self, session, feature_names):
+        self.session = session
+        self._inputs = [inp.name for inp in session.get_inputs()]
+        if len(self._inputs) > 1:
+            # Граф с отдельным входом [None, 1] на каждый признак
+            self.feature_names = list(self._inputs)
+        else:
+            # Один вход-матрица: порядок колонок из метаданных экспорта
+            meta = session.get_modelmeta().custom_metadata_map
+            if "feature_names" in meta:
+                self.feature_names = json.loads(meta["feature_names"])
+            else:
+                self.feature_names = list(feature_names)
+        self._output = probability_output(session)
+
+    @classmethod
+    def load(cls, model_path, feature_names, intra_op_threads=1, inter_op_threads=1):
+        """Метод создаёт сессию ORT с явно заданным числом потоков"""
+        import onnxruntime as ort
+
+        providers = ["CPUExecutionProvider"]
+        opts = session_options(
+            model_path, intra_op_threads, inter_op_threads, providers=providers
+        )
+        session = ort.InferenceSession(
+            str(model_path), sess_options=opts, providers=providers
+        )
+        return cls(session, feature_names)
+
+    def predict_proba(self, X: np.ndarray, timings: dict = None) -> np.ndarray:
+        """Метод возвращает вероятность класса 1 для матрицы признаков.
+
+        Препроцессинг входит в граф, поэтому этап preprocessing — только
+        подготовка входов сессии.
+        """
+        start = time.perf_counter()
+        X = np.asarray(X, dtype=np.float32)
+        if len(self._inputs) == 1:
+            input_feed = {self._inputs[0]: X}
+        else:
+            input_feed = {name: X[:, i : i + 1] for i, name in enumerate(self._inputs)}
+        prepared = time.perf_counter()
+        (proba,) = self.session.run([self._output], input_feed)
+        proba = probability_column(proba)
+        if timings is not None:
+            timings["preprocessing"] = prepared - start
+            timings["model"] = time.perf_counter() - prepared
+        return proba
+
+
+class CompiledBackend:
+    """Инференс GradientBoosting-пайплайна без sklearn на горячем пути.
+
+    Препроцессинг свёрнут в numpy-преобразование с float32-выходом,
+    ансамбль — в плоские массивы узлов (CompiledGradientBoosting).
+    """
+
+    name = "compiled"
+    version = "unknown"
+
+    def __init__(self, model, feature_names):
+        self.feature_names = list(getattr(model, "feature_names_in_", feature_names))
+        if isinstance(model, Pipeline):
+            if len(model.steps) != 2:
+                raise ValueError("Ожидался пайплайн из препроцессора и классификатора")
+            self._transform = _compile_preprocessor(
+                model.steps[0][1], self.feature_names, dtype=np.float32
+            )
+            if self._transform is None:
+                raise ValueError("Препроцессинг пайплайна не поддерживается")
+            classifier = model.steps[1][1]
+        else:
+            self._transform = None
+            classifier = model
+        self.ensemble = CompiledGradientBoosting(classifier)
+
+    @classmethod
+    def load(cls, model_path, feature_names):
+        """Метод загружает pickle-модель и компилирует её"""
+        return cls(joblib.load(model_path), feature_names)
+
+    def predict_proba(self, X: np.ndarray, timings: dict = None) -> np.ndarray:
+        """Метод возвращает вероятность класса 1 для матрицы признаков"""
+        start = time.perf_counter()
+        if self._transform is not None:
+            Z = self._transform(X)
+        else:
+            Z = np.asarray(X, dtype=np.float32)
+        prepared = time.perf_counter()
+        proba = self.ensemble.predict_proba(Z)
+        if timings is not None:
+            timings["preprocessing"] = prepared - start
+            timings["model"] = time.perf_counter() - prepared
+        return proba
+
+
+def model_version(model_path: str | Path) -> str:
+    """Метод возвращает версию модели: префикс sha256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# Имена бэкендов load_backend (MODEL_BACKEND и бэкенды вариантов)
+BACKEND_NAMES = ("sklearn", "sklearn_numpy", "onnx", "compiled")
+
+
+def load_backend(
+    model_path: str | Path,
+    feature_names,
+    backend: str = None,
+    intra_op_threads: int = 1,
+    inter_op_threads: int = 1,
+    mmap: bool = False,
+):
+    """Метод загружает модель нужным бэкендом (по умолчанию — по расширению файла).
+
+    По умолчанию .onnx исполняется в onnxruntime, а pickle-пайплайн — с
+    numpy-препроцессингом (sklearn_numpy); пайплайн, который тот не
+    воспроизводит, — как есть (sklearn).
+    """
+    model_path = Path(model_path)
+    if backend is None and model_path.suffix != ".onnx":
+        loaded = SklearnBackend.load(model_path, feature_names, mmap=mmap)
+        try:
+            loaded = SklearnNumpyBackend(loaded.model, feature_names)
+        except ValueError:
+            pass
+    elif backend is None or backend == "onnx":
+        loaded = OnnxBackend.load(
+            model_path, feature_names, intra_op_threads, inter_op_threads
+        )
+    elif backend == "sklearn":
+        loaded = SklearnBackend.load(model_path, feature_names, mmap=mmap)
+    elif backend == "sklearn_numpy":
+        loaded = SklearnNumpyBackend.load(model_path, feature_names, mmap=mmap)
+    elif backend == "compiled":
+        loaded = CompiledBackend.load(model_path, feature_names)
+    else:
+        raise ValueError(f"Неизвестный бэкенд: {backend}")
+    loaded.version = model_version(model_path)
+    return loaded
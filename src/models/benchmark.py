@@ -0,0 +1,311 @@
+"""Общий замер инференса: перцентили задержки, память, история прогонов
+и сравнение с базой"""
+
+import gc
+import json
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from src.models.memory import peak_rss, process_memory, reset_peak_rss
+
+# Именованные цели бенчмарка: имя -> (бэкенд load_backend, путь от корня проекта).
+# Новая модель добавляется строкой здесь или --target имя=бэкенд:путь
+BENCHMARK_TARGETS = {
+    "sklearn": ("sklearn", "models/credit_default_model.pkl"),
+    "sklearn_numpy": ("sklearn_numpy", "models/credit_default_model.pkl"),
+    "onnx": ("onnx", "models/credit_default_model.onnx"),
+    "compiled": ("compiled", "models/credit_default_model.pkl"),
+    # NN (train_nn.py): квантизация и оптимизация графа есть только для неё
+    "nn_sklearn": ("sklearn", "models/credit_nn.pkl"),
+    "nn_onnx": ("onnx", "models/model.onnx"),
+    "nn_quantized": ("onnx", "models/model_quantized.onnx"),
+}
+
+# Цели по умолчанию — одна модель API (credit_default_model) разными бэкендами,
+# чтобы строки отчёта сравнивали способ исполнения, а не разные модели
+DEFAULT_TARGETS = ("sklearn", "sklearn_numpy", "onnx", "compiled")
+
+# Поля прогона, которые должны совпадать, чтобы сравнение имело смысл
+HOST_FIELDS = ("machine", "processor")
+
+# Метрики, для которых рост — регрессия; для остальных регрессия — падение
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "max_ms", "mean_ms", "std_ms")
+
+
+def time_calls(fn, n_runs: int, n_warmup: int = 5) -> np.ndarray:
+    """Метод прогревает fn и возвращает время каждого из n_runs вызовов, мс"""
+    for _ in range(n_warmup):
+        fn()
+    timings = np.empty(n_runs)
+    for i in range(n_runs):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    return timings * 1000
+
+
+def latency_stats(timings_ms: np.ndarray, batch_size: int = 1) -> dict:
+    """Метод сводит замеры в перцентили, разброс и пропускную способность.
+
+    throughput считается по суммарному времени всех вызовов, cv — отношение
+    стандартного отклонения к среднему (шумность замера).
+    """
+    timings_ms = np.asarray(timings_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(timings_ms, [50, 95, 99])
+    mean = float(timings_ms.mean())
+    return {
+        "n_runs": len(timings_ms),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(timings_ms.max()), 4),
+        "mean_ms": round(mean, 4),
+        "std_ms": round(float(timings_ms.std()), 4),
+        "cv": round(float(timings_ms.std()) / mean, 4) if mean else 0.0,
+        "throughput_samples_per_sec": round(
+            batch_size * len(timings_ms) / timings_ms.sum() * 1000, 2
+        ),
+    }
+
+
+# Перцентили задержки HTTP-нагрузки (scripts/model_training/http_load_test.py)
+OPEN_LOOP_PERCENTILES = [50, 90, 95, 99, 99.9]
+
+
+def latency_percentiles(timings_ms) -> dict:
+    """Метод возвращает OPEN_LOOP_PERCENTILES и максимум задержки, мс"""
+    if len(timings_ms) == 0:
+        return {}
+    values = np.percentile(timings_ms, OPEN_LOOP_PERCENTILES)
+    stats = {
+        f"p{p:g}_ms".replace(".", "_"): round(float(v), 3)
+        for p, v in zip(OPEN_LOOP_PERCENTILES, values)
+    }
+    stats["max_ms"] = round(float(np.max(timings_ms)), 3)
+    return stats
+
+
+def open_loop_stats(samples, start: float, rate: float, concurrency: int) -> dict:
+    """Метод сводит уровень открытой нагрузки.
+
+    samples — (запланировано, отправлено, ответ, статус) на запрос, время в
+    секундах. latency считается от запланированной отправки: запрос, ждавший
+    зависший перед ним, попадает в перцентили (коррекция coordinated
+    omission); service_time — от фактической отправки, без коррекции.
+    """
+    intended, sent, done, status = zip(*samples)
+    intended, sent, done = np.array(intended), np.array(sent), np.array(done)
+    ok = np.array([s == 200 for s in status])
+    elapsed = done.max() - start
+    return {
+        "offered_rps": rate,
+        "concurrency": concurrency,
+        "n_requests": len(samples),
+        "n_errors": int((~ok).sum()),
+        "error_rate": round(float((~ok).mean()), 4),
+        "status_codes": {str(k): v for k, v in Counter(status).items()},
+        "achieved_rps": round(float(ok.sum() / elapsed), 2),
+        # Задержка от запланированной отправки (с учётом ожидания в очередях)
+        "latency": latency_percentiles((done - intended)[ok] * 1000),
+        # Время обслуживания от фактической отправки (без коррекции)
+        "service_time": latency_percentiles((done - sent)[ok] * 1000),
+        # Максимальное ожидание отправки (очередь клиента при занятых соединениях)
+        "max_send_lag_ms": round(float((sent - intended).max() * 1000), 3),
+    }
+
+
+def find_knee(levels, max_error_rate, min_achieved_ratio, p99_factor):
+    """Метод находит последний уровень частоты, на котором система справляется.
+
+    Уровень здоров, если ошибок не больше max_error_rate, достигнутая частота
+    не ниже min_achieved_ratio от заданной и p99 не больше p99_factor x p99
+    на самом низком уровне.
+    """
+    levels = sorted(levels, key=lambda r: r["offered_rps"])
+    base_p99 = levels[0]["latency"].get("p99_ms")
+    knee, limited_by = None, None
+    for level in levels:
+        p99 = level["latency"].get("p99_ms")
+        if level["error_rate"] > max_error_rate:
+            limited_by = "errors"
+        elif level["achieved_rps"] < min_achieved_ratio * level["offered_rps"]:
+            limited_by = "throughput"
+        elif p99 is None or (base_p99 and p99 > p99_factor * base_p99):
+            limited_by = "latency"
+        else:
+            knee = level
+            continue
+        break
+    return {
+        "knee_rps": knee["offered_rps"] if knee else None,
+        "knee_p99_ms": knee["latency"]["p99_ms"] if knee else None,
+        "limited_by": limited_by,
+    }
+
+
+def measure_memory(fn) -> dict:
+    """Метод замеряет память одного вызова fn, МБ.
+
+    rss_peak_mb — пик RSS процесса во время вызова (модель, библиотеки и
+    нативные буферы, например арена onnxruntime), rss_call_mb — его рост над
+    RSS до вызова. alloc_peak_mb и alloc_retained_mb — пик и остаток после
+    вызова памяти, выделенной через Python и numpy (tracemalloc); нативные
+    аллокации C++ в них не попадают. fn вызывается дважды: под tracemalloc
+    RSS больше из-за таблиц трассировки, поэтому RSS замеряется отдельно.
+    """
+    gc.collect()
+    rss_before = process_memory()["rss"]
+    reset_peak_rss()
+    fn()
+    rss_peak = max(peak_rss(), rss_before)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    mb = 2**20
+    return {
+        "rss_before_mb": round(rss_before / mb, 2),
+        "rss_peak_mb": round(rss_peak / mb, 2),
+        "rss_call_mb": round((rss_peak - rss_before) / mb, 2),
+        "alloc_peak_mb": round((peak - before) / mb, 3),
+        "alloc_retained_mb": round((current - before) / mb, 3),
+    }
+
+
+def fit_memory_curve(batch_sizes, memory_mb) -> dict:
+    """Метод приближает память прямой fixed_mb + per_row_kb x размер батча"""
+    if len(set(batch_sizes)) < 2:
+        raise ValueError("Для кривой памяти нужны хотя бы два размера батча")
+    slope, intercept = np.polyfit(batch_sizes, memory_mb, 1)
+    return {
+        "fixed_mb": round(float(intercept), 2),
+        "per_row_kb": round(max(float(slope), 0.0) * 1024, 3),
+    }
+
+
+def max_batch_within(curve: dict, budget_mb: float) -> int | None:
+    """Метод возвращает наибольший батч, при котором память по кривой не выше budget_mb.
+
+    0 — бюджета не хватает даже на загруженную модель, None — память от
+    размера батча не растёт.
+    """
+    if curve["fixed_mb"] >= budget_mb:
+        return 0
+    if curve["per_row_kb"] <= 0:
+        return None
+    return int((budget_mb - curve["fixed_mb"]) * 1024 / curve["per_row_kb"])
+
+
+def parse_target(spec: str) -> tuple[str, str, str]:
+    """Метод разбирает цель "имя=бэкенд:путь" или имя из BENCHMARK_TARGETS"""
+    name, sep, value = spec.partition("=")
+    if not sep:
+        if name not in BENCHMARK_TARGETS:
+            raise ValueError(
+                f"Неизвестная цель: {name}. Доступны: {', '.join(BENCHMARK_TARGETS)} "
+                "или имя=бэкенд:путь"
+            )
+        return (name, *BENCHMARK_TARGETS[name])
+    backend, sep, path = value.partition(":")
+    if not sep or not backend or not path:
+        raise ValueError(f"Ожидалось имя=бэкенд:путь, получено: {spec!r}")
+    return name, backend, path
+
+
+def append_history(path: str | Path, run: dict) -> None:
+    """Метод дописывает прогон строкой JSON в конец файла истории"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+
+
+def load_history(path: str | Path) -> list[dict]:
+    """Метод читает все прогоны из файла истории (пустой список, если файла нет)"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_run(history: list[dict], ref: str) -> dict:
+    """Метод находит прогон по run_id или метке (последний с такой меткой).
+
+    "latest" — последний прогон, "previous" — предпоследний.
+    """
+    if ref == "latest" and history:
+        return history[-1]
+    if ref == "previous" and len(history) > 1:
+        return history[-2]
+    for run in reversed(history):
+        if ref in (run.get("run_id"), run.get("label")):
+            return run
+    raise KeyError(f"Прогон не найден в истории: {ref}")
+
+
+def host_mismatch(baseline: dict, current: dict) -> dict:
+    """Метод возвращает различающиеся поля HOST_FIELDS: {поле: (база, текущий)}"""
+    return {
+        field: (baseline.get(field), current.get(field))
+        for field in HOST_FIELDS
+        if baseline.get(field) != current.get(field)
+    }
+
+
+def compare_runs(
+    baseline: dict,
+    current: dict,
+    metrics=("p50_ms", "p99_ms"),
+    threshold=0.1,
+    allow_other_host=False,
+) -> list[dict]:
+    """Метод сравнивает два прогона по совпадающим (цель, потоки, батч).
+
+    Регрессия — ухудшение метрики больше чем на threshold (доля): рост
+    задержки или падение пропускной способности. Прогоны с разных машин
+    (HOST_FIELDS) не сравниваются — ValueError, если не задан allow_other_host.
+    """
+    mismatch = host_mismatch(baseline, current)
+    if mismatch and not allow_other_host:
+        raise ValueError(f"Прогоны сняты на разных машинах: {mismatch}")
+
+    def key(row):
+        return row["target"], row["threads"], row["batch_size"]
+
+    base = {key(row): row for row in baseline["results"]}
+    rows = []
+    for row in current["results"]:
+        before = base.get(key(row))
+        if before is None:
+            continue
+        for metric in metrics:
+            old, new = before[metric], row[metric]
+            if not old:
+                continue
+            change = new / old - 1
+            worse = change if metric in LOWER_IS_BETTER else -change
+            rows.append(
+                {
+                    "target": row["target"],
+                    "threads": row["threads"],
+                    "batch_size": row["batch_size"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 4),
+                    "regression": worse > threshold,
+                }
+            )
+    return rows
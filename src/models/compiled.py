@@ -0,0 +1,123 @@
+"""Компиляция обученного GradientBoostingClassifier в плоские массивы узлов"""
+
+import numpy as np
+from scipy.special import expit
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import GradientBoostingClassifier
+
+
+class CompiledGradientBoosting:
+    """Ансамбль бинарного GradientBoostingClassifier в виде непрерывных массивов.
+
+    Каждое дерево дополняется до полного бинарного дерева глубины depth:
+    у недостающих узлов порог +inf (объект всегда уходит влево), лист
+    повторяется до нижнего уровня. Узлы хранятся по уровням: на уровне level
+    узел pos дерева t лежит по индексу t * 2**level + pos в массивах
+    feature[level] и threshold[level], листья — в value. Потомки узла i —
+    2*i и 2*i + 1 на следующем уровне, поэтому предсказание — depth векторных
+    шагов над матрицей [деревья, строки] без цикла по деревьям в Python и без
+    массива ссылок на потомков.
+
+    Деревья sklearn сравнивают float32-признак с float64-порогом; здесь
+    порог заранее округляется вниз до float32, что даёт те же ветви.
+    """
+
+    def __init__(self, classifier: GradientBoostingClassifier, chunk_size=256):
+        if not isinstance(classifier, GradientBoostingClassifier):
+            raise ValueError("Поддерживается только GradientBoostingClassifier")
+        if classifier.n_classes_ != 2 or classifier.loss != "log_loss":
+            raise ValueError("Поддерживается только бинарный log_loss")
+        if not (
+            classifier.init_ == "zero" or isinstance(classifier.init_, DummyClassifier)
+        ):
+            raise ValueError("Поддерживается только init='zero' или prior")
+
+        trees = [estimator.tree_ for estimator in classifier.estimators_[:, 0]]
+        self.n_features = classifier.n_features_in_
+        self.n_trees = len(trees)
+        self.depth = max(1, max(tree.max_depth for tree in trees))
+        self.chunk_size = chunk_size
+
+        # Константный вклад init_ (логит априорной вероятности класса 1)
+        self.init_raw = float(
+            classifier._raw_predict_init(
+                np.zeros((1, self.n_features), dtype=np.float32)
+            )[0, 0]
+        )
+
+        self.feature = [
+            np.zeros(self.n_trees << level, dtype=np.intp)
+            for level in range(self.depth)
+        ]
+        self.threshold = [
+            np.full(self.n_trees << level, np.inf, dtype=np.float32)
+            for level in range(self.depth)
+        ]
+        self.value = np.zeros(self.n_trees << self.depth, dtype=np.float64)
+        for i, tree in enumerate(trees):
+            self._flatten(tree, i, classifier.learning_rate)
+
+    def _flatten(self, tree, index, learning_rate):
+        # index — номер узла на своём уровне; потомки — 2*index и 2*index + 1
+        stack = [(0, index, 0)]
+        while stack:
+            node, index, level = stack.pop()
+            if level == self.depth:
+                self.value[index] = learning_rate * tree.value[node, 0, 0]
+                continue
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == -1:
+                # Лист выше нижнего уровня: обе ветви ведут к нему же
+                left = right = node
+            else:
+                self.feature[level][index] = tree.feature[node]
+                threshold = np.float32(tree.threshold[node])
+                if threshold > tree.threshold[node]:
+                    threshold = np.nextafter(threshold, np.float32(-np.inf))
+                self.threshold[level][index] = threshold
+            stack.append((left, 2 * index, level + 1))
+            stack.append((right, 2 * index + 1, level + 1))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Метод возвращает сырой логит ансамбля для матрицы float32"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        raw = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            chunk = X[start : start + self.chunk_size]
+            raw[start : start + len(chunk)] = self._leaf_values(chunk).sum(axis=0)
+        return raw + self.init_raw
+
+    def _leaf_values(self, X):
+        # Обход по матрице [деревья, строки]: соседние элементы — одно дерево,
+        # поэтому выборки из массивов уровня и из X идут почти подряд
+        shape = (self.n_trees, len(X))
+        node = np.empty(shape, dtype=np.intp)
+        # Корни: признак у каждого дерева свой, но один на все строки
+        np.greater(
+            X.T.take(self.feature[0], axis=0),
+            self.threshold[0][:, None],
+            out=node,
+            casting="unsafe",
+        )
+        node += 2 * np.arange(self.n_trees)[:, None]
+        if self.depth > 1:
+            flat = X.ravel()
+            row_offset = np.empty(shape, dtype=np.intp)
+            row_offset[:] = np.arange(len(X)) * X.shape[1]
+            index = np.empty(shape, dtype=np.intp)
+            x = np.empty(shape, dtype=np.float32)
+            threshold = np.empty(shape, dtype=np.float32)
+            right = np.empty(shape, dtype=np.intp)
+            for level in range(1, self.depth):
+                np.take(self.feature[level], node, out=index, mode="wrap")
+                index += row_offset
+                np.take(flat, index, out=x, mode="wrap")
+                np.take(self.threshold[level], node, out=threshold, mode="wrap")
+                np.greater(x, threshold, out=right, casting="unsafe")
+                node += node
+                node += right
+        return np.take(self.value, node, mode="wrap")
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Метод возвращает вероятность класса 1, как predict_proba(X)[:, 1]"""
+        return expit(self.decision_function(X))
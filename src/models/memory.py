@@ -0,0 +1,79 @@
+"""Память процесса: RSS, PSS, разделяемые страницы и пик RSS (для замеров на воркер)"""
+
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Windows: getrusage нет, память процесса не замеряется
+    resource = None
+
+# Поля /proc/self/smaps_rollup, которые суммируются в отчёт
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+
+def process_memory() -> dict:
+    """Метод возвращает память текущего процесса в байтах.
+
+    На Linux: rss, pss (доля разделяемых страниц), shared и private из
+    /proc/self/smaps_rollup. Страницы модели, отображённые через mmap и
+    открытые несколькими воркерами, попадают в shared и делятся в pss.
+    На других POSIX-системах — только пиковый rss из getrusage, на Windows —
+    пустой словарь.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        if resource is None:
+            return {}
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS отдаёт байты, Linux — килобайты
+        return {"rss": peak if sys.platform == "darwin" else peak * 1024}
+
+    memory = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    for line in lines:
+        name, _, value = line.partition(":")
+        key = _SMAPS_FIELDS.get(name)
+        if key is not None:
+            memory[key] += int(value.split()[0]) * 1024
+    return memory
+
+
+def reset_peak_rss() -> bool:
+    """Метод сбрасывает пик RSS процесса (VmHWM) до текущего RSS.
+
+    Только Linux (/proc/self/clear_refs); False, если сброс недоступен —
+    тогда peak_rss возвращает пик за всё время жизни процесса.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss() -> int | None:
+    """Метод возвращает пик RSS процесса в байтах (VmHWM или ru_maxrss).
+
+    None, если замер недоступен (Windows).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,147 @@
+"""Экспорт обученных пайплайнов в ONNX и сверка предсказаний с sklearn"""
+
+import copy
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+
+# Исторические имена артефактов: NN-модель конвертируется в models/model.onnx
+LEGACY_ONNX_NAMES = {"credit_nn.pkl": "model"}
+
+# Имя единственного входа [None, n_features] при single_input=True
+SINGLE_INPUT_NAME = "features"
+
+
+def onnx_path_for(model_path: str | Path, single_input: bool = False) -> Path:
+    """Метод возвращает путь ONNX-артефакта для .pkl-модели (рядом с ней).
+
+    Граф с одним входом-матрицей получает суффикс _single.
+    """
+    model_path = Path(model_path)
+    stem = LEGACY_ONNX_NAMES.get(model_path.name, model_path.stem)
+    return model_path.with_name(stem + ("_single" if single_input else "") + ".onnx")
+
+
+def _with_positional_columns(model, feature_names):
+    # ColumnTransformer выбирает колонки по именам, а у графа с одним входом
+    # имён нет: переводим их в позиции, разбиение делает Gather внутри графа
+    model = copy.deepcopy(model)
+    for _, step in model.steps:
+        if isinstance(step, ColumnTransformer):
+            step.transformers_ = [
+                (
+                    name,
+                    transformer,
+                    (
+                        [feature_names.index(c) for c in columns]
+                        if not isinstance(transformer, str)
+                        else columns
+                    ),
+                )
+                for name, transformer, columns in step.transformers_
+            ]
+    return model
+
+
+def convert_pipeline(model, feature_names=None, single_input=False, zipmap=False):
+    """Метод конвертирует обученный пайплайн в ONNX (ModelProto).
+
+    Поддерживаются пайплайны из src/models/pipeline.py: ColumnTransformer
+    (SimpleImputer, StandardScaler, OneHotEncoder) с GradientBoostingClassifier
+    — он становится узлом TreeEnsembleClassifier — или с MLPClassifier.
+    По умолчанию вход — отдельный тензор [None, 1] на каждый признак; при
+    single_input=True — один float32-тензор [None, n_features] с колонками в
+    порядке feature_names. Порядок сохраняется в метаданных feature_names.
+    Вероятности — тензор float [N, 2] (output_probability); ZipMap-список
+    словарей, который приходится разбирать в Python, — только при zipmap=True.
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    if feature_names is None:
+        feature_names = list(model.feature_names_in_)
+    if single_input:
+        model = _with_positional_columns(model, feature_names)
+        initial_types = [
+            (SINGLE_INPUT_NAME, FloatTensorType([None, len(feature_names)]))
+        ]
+    else:
+        initial_types = [(name, FloatTensorType([None, 1])) for name in feature_names]
+    options = {id(model.steps[-1][1]): {"zipmap": zipmap}}
+    onx = convert_sklearn(model, initial_types=initial_types, options=options)
+    meta = onx.metadata_props.add()
+    meta.key, meta.value = "feature_names", json.dumps(feature_names)
+    return onx
+
+
+def build_input_feed(input_names, X: np.ndarray) -> dict:
+    """Метод готовит входы сессии из матрицы признаков в порядке модели.
+
+    Один вход — вся матрица без копирования (если она уже float32 и
+    непрерывна); вход на признак — по колонке [n, 1] на каждый.
+    """
+    if len(input_names) == 1:
+        return {input_names[0]: np.ascontiguousarray(X, dtype=np.float32)}
+    return {
+        name: X[:, i : i + 1].astype(np.float32) for i, name in enumerate(input_names)
+    }
+
+
+def operator_types(onnx_model) -> list[str]:
+    """Метод возвращает отсортированный список типов операторов графа"""
+    return sorted({node.op_type for node in onnx_model.graph.node})
+
+
+def probability_column(proba) -> np.ndarray:
+    """Метод возвращает вероятность класса 1 из выхода output_probability.
+
+    Для тензора [N, 2] это view без копирования; старые графы с ZipMap
+    отдают список словарей {класс: вероятность}.
+    """
+    if isinstance(proba, np.ndarray):
+        return proba[:, 1]
+    return np.array([p[1] for p in proba], dtype=np.float32)
+
+
+def probability_output(session) -> str:
+    """Метод возвращает имя выхода с вероятностями классов.
+
+    ZipMap-графы называют его output_probability, тензорные — probabilities.
+    """
+    outputs = [out.name for out in session.get_outputs()]
+    probability = [name for name in outputs if "probab" in name]
+    return probability[0] if probability else outputs[-1]
+
+
+def _run_session(session, X: np.ndarray):
+    input_feed = build_input_feed([inp.name for inp in session.get_inputs()], X)
+    outputs = [out.name for out in session.get_outputs()]
+    label_name = [name for name in outputs if "label" in name][0]
+    labels, proba = session.run([label_name, probability_output(session)], input_feed)
+    return np.asarray(labels), probability_column(proba)
+
+
+def compare_with_onnx(model, session, X: pd.DataFrame) -> dict:
+    """Метод сравнивает метки и вероятности класса 1 sklearn-пайплайна и ONNX.
+
+    X — DataFrame с признаками модели; оба варианта получают одни и те же
+    float32-значения.
+    """
+    feature_names = list(model.feature_names_in_)
+    X = X[feature_names].astype(np.float32)
+    labels_sklearn = model.predict(X)
+    proba_sklearn = model.predict_proba(X)[:, 1]
+    labels_onnx, proba_onnx = _run_session(session, X.values)
+
+    diff = np.abs(proba_sklearn - proba_onnx)
+    n_mismatch = int(np.sum(labels_sklearn != labels_onnx))
+    return {
+        "n_samples": len(X),
+        "label_agreement": 1.0 - n_mismatch / len(X),
+        "n_label_mismatch": n_mismatch,
+        "max_proba_diff": float(diff.max()),
+        "mean_proba_diff": float(diff.mean()),
+    }
@@ -0,0 +1,99 @@
+"""Статическая INT8-квантизация ONNX (формат QDQ) с калибровкой на выборке признаков"""
+
+from pathlib import Path
+
+import numpy as np
+
+from src.models.onnx_export import build_input_feed
+
+CALIBRATION_METHODS = ("MinMax", "Entropy", "Percentile")
+
+# Квантуются только матричные умножения: препроцессинг внутри графа
+# (Imputer, Scaler, Sub, Concat) остаётся во float32, иначе ошибка
+# округления попадает в каждый признак ещё до сети
+OP_TYPES_TO_QUANTIZE = ["MatMul", "Gemm"]
+
+
+def calibration_sample(X: np.ndarray, size: int, seed: int = 42) -> np.ndarray:
+    """Метод выбирает size случайных строк матрицы признаков для калибровки"""
+    if size >= len(X):
+        return X
+    rng = np.random.default_rng(seed)
+    return X[np.sort(rng.choice(len(X), size, replace=False))]
+
+
+class FeatureCalibrationReader:
+    """Источник калибровочных данных для onnxruntime.quantization.
+
+    Реализует интерфейс CalibrationDataReader (get_next/rewind): отдаёт
+    матрицу признаков батчами в формате входов графа — один тензор
+    [N, n_features] или по колонке [N, 1] на признак. Гистограммные методы
+    (Entropy, Percentile) складывают батчи в один массив, поэтому все батчи
+    одного размера: неполный хвост выборки отбрасывается.
+    """
+
+    def __init__(self, input_names, X: np.ndarray, batch_size: int = 256):
+        self.input_names = list(input_names)
+        X = np.asarray(X, dtype=np.float32)
+        self.batch_size = min(batch_size, len(X))
+        self.X = X[: len(X) - len(X) % self.batch_size]
+        self._start = 0
+
+    def get_next(self):
+        """Метод возвращает входы следующего батча или None в конце выборки"""
+        if self._start >= len(self.X):
+            return None
+        batch = self.X[self._start : self._start + self.batch_size]
+        self._start += self.batch_size
+        return build_input_feed(self.input_names, batch)
+
+    def rewind(self):
+        """Метод возвращает чтение к началу выборки"""
+        self._start = 0
+
+
+def quantize_static_qdq(
+    model_path: str | Path,
+    output_path: str | Path,
+    X_calibration: np.ndarray,
+    method: str = "MinMax",
+    per_channel: bool = False,
+    reduce_range: bool = False,
+) -> Path:
+    """Метод квантует ONNX-модель статически в формат QDQ.
+
+    Диапазоны активаций считаются на X_calibration (матрица в порядке входов
+    модели) методом method из CALIBRATION_METHODS. Веса — int8 (по тензору или
+    по каналу), активации — uint8; reduce_range сужает веса до 7 бит, что
+    исключает переполнение на CPU без VNNI.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(
+            f"Неизвестный метод калибровки: {method}. "
+            f"Доступны: {', '.join(CALIBRATION_METHODS)}"
+        )
+    session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    reader = FeatureCalibrationReader(
+        [inp.name for inp in session.get_inputs()], X_calibration
+    )
+    quantize_static(
+        model_input=str(model_path),
+        model_output=str(output_path),
+        calibration_data_reader=reader,
+        quant_format=QuantFormat.QDQ,
+        op_types_to_quantize=OP_TYPES_TO_QUANTIZE,
+        per_channel=per_channel,
+        reduce_range=reduce_range,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=getattr(CalibrationMethod, method),
+    )
+    return Path(output_path)
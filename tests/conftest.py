@@ -0,0 +1,81 @@
+"""Общие данные тестов: пример клиента, генератор клиентов и обученный пайплайн"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.app import FEATURE_NAMES
+from src.models.pipeline import create_pipeline
+
+CATEGORICAL = [
+    "SEX",
+    "EDUCATION",
+    "MARRIAGE",
+    "PAY_0",
+    "PAY_2",
+    "PAY_3",
+    "PAY_4",
+    "PAY_5",
+    "PAY_6",
+]
+
+CLIENT = {
+    "LIMIT_BAL": 20000,
+    "SEX": 1,
+    "EDUCATION": 2,
+    "MARRIAGE": 1,
+    "AGE": 24,
+    "PAY_0": 2,
+    "PAY_2": -1,
+    "PAY_3": -1,
+    "PAY_4": -1,
+    "PAY_5": -2,
+    "PAY_6": -2,
+    "BILL_AMT1": 3913,
+    "BILL_AMT2": 3102,
+    "BILL_AMT3": 689,
+    "BILL_AMT4": 0,
+    "BILL_AMT5": 0,
+    "BILL_AMT6": 0,
+    "PAY_AMT1": 0,
+    "PAY_AMT2": 689,
+    "PAY_AMT3": 0,
+    "PAY_AMT4": 0,
+    "PAY_AMT5": 0,
+    "PAY_AMT6": 0,
+    "PAY_MEAN": -1.0,
+    "PAY_MAX": 2,
+    "PAY_MIN": -2,
+    "BILL_AMT_MEAN": 1284.0,
+    "BILL_AMT_MAX": 3913,
+    "PAY_AMT_MEAN": 114.83,
+    "PAY_AMT_SUM": 689,
+    "PAY_TO_BILL_RATIO": 0.089,
+}
+
+
+def make_clients(n, seed=0):
+    """Метод генерирует n клиентов со случайными значениями признаков"""
+    rng = np.random.default_rng(seed)
+    clients = []
+    for _ in range(n):
+        client = dict(CLIENT)
+        client["LIMIT_BAL"] = float(rng.integers(10000, 500000))
+        client["AGE"] = int(rng.integers(21, 70))
+        client["PAY_0"] = int(rng.integers(-2, 4))
+        client["BILL_AMT1"] = float(rng.integers(0, 100000))
+        client["PAY_AMT1"] = float(rng.integers(0, 10000))
+        clients.append(client)
+    return clients
+
+
+@pytest.fixture(scope="module")
+def fitted_model():
+    """Пайплайн, обученный на синтетических данных со всеми признаками API"""
+    clients = make_clients(200, seed=1)
+    X = pd.DataFrame(clients)[FEATURE_NAMES]
+    y = (X["PAY_0"] > 0).astype(int)
+    numeric = [name for name in FEATURE_NAMES if name not in CATEGORICAL]
+    pipeline = create_pipeline(numeric, CATEGORICAL)
+    pipeline.fit(X, y)
+    return pipeline
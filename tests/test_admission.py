@@ -0,0 +1,44 @@
+"""Тесты контроля допуска и сброса нагрузки"""
+
+import asyncio
+
+from src.api.admission import AdmissionController
+
+
+def test_admission_queues_then_sheds():
+    """Проверка: сверх лимита — очередь, сверх очереди — отказ, слот по FIFO"""
+
+    async def run():
+        controller = AdmissionController(1, 1, queue_timeout=1.0)
+        assert await controller.acquire() is None
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert await controller.acquire() == "queue_full"
+
+        controller.release()
+        assert await waiting is None
+        assert controller.in_flight == 1
+        controller.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_admission_queue_timeout_and_cancel():
+    """Проверка, что истёкшее или отменённое ожидание не занимает слот"""
+
+    async def run():
+        controller = AdmissionController(1, 2, queue_timeout=0.01)
+        assert await controller.acquire() is None
+        assert await controller.acquire() == "queue_timeout"
+
+        controller.queue_timeout = 10
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        controller.release()
+        assert controller.in_flight == 0
+        assert await controller.acquire() is None
+
+    asyncio.run(run())
@@ -0,0 +1,506 @@
+"""Тесты API предсказаний"""
+
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.api import app as app_module
+from src.api.batching import MicroBatcher
+from src.api.cache import PredictionCache
+from src.api.profiler import SlowRequestProfiler
+from src.api.registry import ModelRegistry, ShadowScorer
+from src.features.build_features import add_aggregate_features
+from src.models.backends import SklearnBackend, model_version
+from tests.conftest import CLIENT, make_clients
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def client(fitted_model, monkeypatch):
+    """TestClient с подменённой моделью"""
+    backend = SklearnBackend(fitted_model, app_module.FEATURE_NAMES)
+    monkeypatch.setattr(app_module, "model", backend)
+    monkeypatch.setattr(app_module, "prediction_cache", None)
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", ADMIN_TOKEN)
+    return TestClient(app_module.app, headers={"X-Admin-Token": ADMIN_TOKEN})
+
+
+def test_predict_single(client):
+    """Проверка, что /predict возвращает класс и вероятность"""
+    response = client.post("/predict", json=CLIENT)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["default_prediction"] in (0, 1)
+    assert 0 <= body["default_probability"] <= 1
+
+
+def test_predict_batch_matches_single(client, fitted_model):
+    """Проверка, что батч совпадает с predict_proba и сохраняет порядок"""
+    clients = make_clients(20, seed=2)
+    response = client.post("/predict/batch", json={"clients": clients})
+    assert response.status_code == 200
+    body = response.json()
+
+    X = pd.DataFrame(clients)[app_module.FEATURE_NAMES]
+    expected = fitted_model.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(body["default_probabilities"], expected)
+    assert body["default_predictions"] == fitted_model.predict(X).tolist()
+
+
+def test_predict_batch_columns(client):
+    """Проверка, что колоночный формат даёт тот же результат, что и список"""
+    clients = make_clients(5, seed=3)
+    columns = {name: [c[name] for c in clients] for name in app_module.FEATURE_NAMES}
+    by_rows = client.post("/predict/batch", json={"clients": clients}).json()
+    by_columns = client.post("/predict/batch", json={"columns": columns}).json()
+    assert by_rows == by_columns
+
+
+def test_predict_batch_too_large(client, monkeypatch):
+    """Проверка, что батч больше MAX_BATCH_SIZE отклоняется"""
+    monkeypatch.setattr(app_module, "MAX_BATCH_SIZE", 3)
+    response = client.post("/predict/batch", json={"clients": make_clients(4)})
+    assert response.status_code == 413
+
+
+def test_predict_batch_invalid_payload(client):
+    """Проверка, что пустой запрос и неполные колонки отклоняются"""
+    assert client.post("/predict/batch", json={}).status_code == 422
+    response = client.post("/predict/batch", json={"columns": {"LIMIT_BAL": [1.0]}})
+    assert response.status_code == 422
+
+
+def test_predict_threshold(client, monkeypatch):
+    """Проверка, что метка считается из вероятности по DECISION_THRESHOLD"""
+    probability = client.post("/predict", json=CLIENT).json()["default_probability"]
+
+    monkeypatch.setattr(app_module, "DECISION_THRESHOLD", probability + 1e-6)
+    assert client.post("/predict", json=CLIENT).json()["default_prediction"] == 0
+    monkeypatch.setattr(app_module, "DECISION_THRESHOLD", probability - 1e-6)
+    assert client.post("/predict", json=CLIENT).json()["default_prediction"] == 1
+
+
+def test_predict_raw_matches_full(client):
+    """Проверка, что /predict/raw считает агрегаты так же, как при обучении"""
+    full = pd.DataFrame(make_clients(10, seed=6))[app_module.FEATURE_NAMES]
+    raw = full[app_module.RAW_FEATURE_NAMES]
+    full = add_aggregate_features(raw)[app_module.FEATURE_NAMES]
+
+    expected = client.post(
+        "/predict/batch", json={"clients": full.to_dict(orient="records")}
+    ).json()
+    by_batch = client.post(
+        "/predict/raw/batch", json={"clients": raw.to_dict(orient="records")}
+    ).json()
+    single = client.post("/predict/raw", json=raw.iloc[0].to_dict()).json()
+
+    np.testing.assert_allclose(
+        by_batch["default_probabilities"], expected["default_probabilities"], rtol=1e-6
+    )
+    assert single["default_probability"] == pytest.approx(
+        expected["default_probabilities"][0], rel=1e-6
+    )
+
+
+def test_predict_with_microbatching(client, monkeypatch):
+    """Проверка, что /predict через микробатчинг отдаёт тот же результат"""
+    expected = client.post("/predict", json=CLIENT).json()
+    batcher = MicroBatcher(
+        lambda X, current: current.predict_proba(X), max_batch_size=4, max_wait_ms=1
+    )
+    monkeypatch.setattr(app_module, "batcher", batcher)
+    actual = client.post("/predict", json=CLIENT).json()
+    assert actual["default_prediction"] == expected["default_prediction"]
+    assert actual["default_probability"] == pytest.approx(
+        expected["default_probability"]
+    )
+
+
+def test_microbatched_shadow_gets_own_row(client, monkeypatch):
+    """Проверка, что при микробатчинге тень получает строку своего запроса"""
+
+    class RecordingShadow:
+        def __init__(self):
+            self.rows = []
+
+        def submit(self, X, probabilities, current):
+            self.rows.append(X.copy())
+
+        def shutdown(self):
+            pass
+
+    shadow = RecordingShadow()
+    batcher = MicroBatcher(
+        lambda X, current: current.predict_proba(X), max_batch_size=8, max_wait_ms=20
+    )
+    monkeypatch.setattr(app_module, "batcher", batcher)
+    monkeypatch.setattr(app_module, "shadow_scorer", shadow)
+
+    limits = [10000 + 1000 * i for i in range(16)]
+
+    def send(limit):
+        client.post("/predict", json={**CLIENT, "LIMIT_BAL": limit})
+
+    # Один цикл событий на все запросы, как у воркера uvicorn
+    with client:
+        threads = [threading.Thread(target=send, args=(x,)) for x in limits]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    column = app_module.model.feature_names.index("LIMIT_BAL")
+    assert sorted(row[0, column] for row in shadow.rows) == limits
+
+
+def test_predict_cache_hit_skips_model(client, monkeypatch):
+    """Проверка, что повторный запрос отдаётся из кэша без вызова модели"""
+    calls = []
+    predict_proba = app_module.model.predict_proba
+
+    def counting_predict_proba(X, timings=None):
+        calls.append(len(X))
+        return predict_proba(X, timings)
+
+    monkeypatch.setattr(app_module.model, "predict_proba", counting_predict_proba)
+    monkeypatch.setattr(app_module, "prediction_cache", PredictionCache(10, 60))
+
+    first = client.post("/predict", json=CLIENT).json()
+    second = client.post("/predict", json=CLIENT).json()
+    assert first == second
+    assert calls == [1]
+
+
+def test_predict_binary_float32_matches_json(client):
+    """Проверка, что float32-строки дают те же вероятности, что и JSON"""
+    clients = make_clients(5, seed=7)
+    expected = client.post("/predict/batch", json={"clients": clients}).json()
+    rows = np.array(
+        [[c[name] for name in app_module.FEATURE_NAMES] for c in clients], dtype="<f4"
+    )
+    headers = {"Content-Type": "application/x-float32"}
+
+    response = client.post("/predict/batch", content=rows.tobytes(), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["x-model-version"] == expected["model_version"]
+    probabilities = np.frombuffer(response.content, dtype="<f4")
+    np.testing.assert_allclose(
+        probabilities, expected["default_probabilities"], rtol=1e-5
+    )
+
+    single = client.post("/predict", content=rows[:1].tobytes(), headers=headers)
+    assert np.frombuffer(single.content, dtype="<f4")[0] == pytest.approx(
+        expected["default_probabilities"][0], rel=1e-5
+    )
+
+    raw_rows = rows[:, : len(app_module.RAW_FEATURE_NAMES)]
+    raw = client.post("/predict/raw/batch", content=raw_rows.tobytes(), headers=headers)
+    assert np.frombuffer(raw.content, dtype="<f4").shape == (5,)
+
+    broken = client.post("/predict/batch", content=b"\x00" * 10, headers=headers)
+    assert broken.status_code == 400
+    assert (
+        client.post("/predict", content=rows.tobytes(), headers=headers).status_code
+        == 400
+    )
+
+
+def test_predict_binary_msgpack(client):
+    """Проверка msgpack-тела: список строк в порядке полей ClientData"""
+    msgpack = pytest.importorskip("msgpack")
+    row = [CLIENT[name] for name in app_module.FEATURE_NAMES]
+    expected = client.post("/predict", json=CLIENT).json()
+    response = client.post(
+        "/predict/batch",
+        content=msgpack.packb([row, row]),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    probabilities = np.frombuffer(response.content, dtype="<f4")
+    np.testing.assert_allclose(
+        probabilities, [expected["default_probability"]] * 2, rtol=1e-5
+    )
+
+
+def test_predict_sheds_load_with_retry_after(client, monkeypatch):
+    """Проверка, что при заполненной очереди API сразу отвечает 503"""
+    monkeypatch.setattr(app_module.admission, "max_concurrency", 0)
+    monkeypatch.setattr(app_module.admission, "max_queue", 0)
+    response = client.post("/predict", json=CLIENT)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(app_module.RETRY_AFTER_SECONDS)
+    assert response.json()["reason"] == "queue_full"
+    assert client.get("/health").status_code == 200
+
+
+def test_debug_slow_lists_requests_with_profiles(client, tmp_path, monkeypatch):
+    """Проверка /debug/slow: этапы, размеры тела и cProfile по выборке"""
+    assert client.get("/debug/slow").status_code == 404
+    profiler = SlowRequestProfiler(top_n=5, profile_every=1, profile_dir=tmp_path)
+    monkeypatch.setattr(app_module, "slow_request_profiler", profiler)
+
+    client.post("/predict", json=CLIENT)
+    client.post("/predict/batch", json={"clients": make_clients(50)})
+    deadline = time.monotonic() + 5
+    while len(profiler.log.slowest()) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    requests = client.get("/debug/slow").json()["requests"]
+    assert {r["path"] for r in requests} == {"/predict", "/predict/batch"}
+    for record in requests:
+        assert record["status"] == 200
+        assert record["request_bytes"] > 0 and record["response_bytes"] > 0
+        assert {"parse", "features", "model"} <= set(record["stages_ms"])
+        assert record["profile"] and Path(record["profile"]).exists()
+
+
+def stage_count(stage, current):
+    value = REGISTRY.get_sample_value(
+        "credit_scoring_inference_stage_seconds_count",
+        {"stage": stage, "model_version": current.version, "backend": current.name},
+    )
+    return value or 0.0
+
+
+def test_predict_records_stage_metrics(client):
+    """Проверка, что /predict пишет все этапы и счётчик предсказаний по классу"""
+    current = app_module.model
+    stages = ["parse", "features", "preprocessing", "model", "serialization"]
+    before = {name: stage_count(name, current) for name in stages + ["queue"]}
+    response = client.post("/predict", json=CLIENT).json()
+    for name in stages:
+        assert stage_count(name, current) == before[name] + 1
+    # Асинхронный /predict не ждёт пул потоков
+    assert stage_count("queue", current) == before["queue"]
+
+    labels = {
+        "predicted_class": str(response["default_prediction"]),
+        "model_version": current.version,
+        "backend": current.name,
+    }
+    count = REGISTRY.get_sample_value("credit_scoring_predictions_total", labels)
+    # Синхронный /predict/batch пишет ожидание потока этапом queue, а не в parse
+    client.post("/predict/batch", json={"clients": [CLIENT, CLIENT]})
+    assert REGISTRY.get_sample_value("credit_scoring_predictions_total", labels) == (
+        count + 2
+    )
+    assert stage_count("queue", current) == before["queue"] + 1
+
+
+def test_predict_routes_by_variant_header_with_shadow(
+    client, fitted_model, tmp_path, monkeypatch
+):
+    """Проверка маршрутизации по X-Model-Variant и теневого скоринга кандидата"""
+    artifact = tmp_path / "candidate.pkl"
+    joblib.dump(fitted_model, artifact)
+    on_event_loop = []
+
+    def load(path, backend=None):
+        # Холодная загрузка варианта не должна выполняться в цикле событий
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(True)
+        except RuntimeError:
+            on_event_loop.append(False)
+        backend = SklearnBackend(joblib.load(path), app_module.FEATURE_NAMES)
+        backend.version = "candidate"
+        return backend
+
+    registry = ModelRegistry({"candidate": artifact}, load, memory_budget=1 << 30)
+    shadow = ShadowScorer("candidate", lambda: registry.get("candidate"), 0.5)
+    monkeypatch.setattr(app_module, "model_registry", registry)
+    monkeypatch.setattr(app_module, "shadow_scorer", shadow)
+
+    # Сначала запрос к варианту: холодная загрузка идёт из обработчика
+    routed = client.post(
+        "/predict", json=CLIENT, headers={"X-Model-Variant": "candidate"}
+    ).json()
+    primary = client.post("/predict", json=CLIENT).json()
+    assert primary["model_version"] == app_module.model.version
+    assert routed["model_version"] == "candidate"
+    assert on_event_loop == [False]
+    assert routed["default_probability"] == pytest.approx(
+        primary["default_probability"]
+    )
+
+    shadow.shutdown()
+    deltas = REGISTRY.get_sample_value(
+        "credit_scoring_shadow_score_delta_count", {"variant": "candidate"}
+    )
+    assert deltas >= 1
+    response = client.post(
+        "/predict/batch", json={"clients": [CLIENT]}, headers={"X-Model-Variant": "x"}
+    )
+    assert response.status_code == 404
+
+
+def wait_for_reload(client, timeout=10.0):
+    """Метод ждёт завершения фоновой перезагрузки модели"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get("/admin/model").json()
+        if status["reload"]["state"] in ("ready", "failed"):
+            return status
+        time.sleep(0.02)
+    raise TimeoutError("Перезагрузка не завершилась")
+
+
+def test_admin_reload_swaps_model(client, fitted_model, tmp_path, monkeypatch):
+    """Проверка, что /admin/reload подменяет модель и версия видна в ответах"""
+    (tmp_path / "models").mkdir()
+    joblib.dump(fitted_model, tmp_path / "models" / "new.pkl")
+    monkeypatch.setattr(app_module, "project_root", tmp_path)
+    monkeypatch.setattr(app_module, "model_path", tmp_path / "models" / "new.pkl")
+    monkeypatch.setitem(app_module.reload_status, "state", "idle")
+
+    response = client.post("/admin/reload", json={"model_path": "models/new.pkl"})
+    assert response.status_code == 202
+    status = wait_for_reload(client)
+
+    version = model_version(tmp_path / "models" / "new.pkl")
+    assert status["reload"]["state"] == "ready"
+    assert status["model_version"] == version
+    assert client.post("/predict", json=CLIENT).json()["model_version"] == version
+
+
+def test_admin_reload_rejects_paths_outside_models(client, monkeypatch):
+    """Проверка, что нельзя загрузить файл вне models/ и без токена"""
+    response = client.post("/admin/reload", json={"model_path": "../etc/passwd"})
+    assert response.status_code == 400
+
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    response = client.get("/admin/model", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+
+
+def test_admin_routes_disabled_without_token(client, monkeypatch):
+    """Проверка, что без ADMIN_TOKEN служебные эндпоинты выключены"""
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "")
+    assert client.post("/admin/reload").status_code == 404
+    assert client.get("/admin/model").status_code == 404
+    assert client.get("/debug/slow").status_code == 404
+
+
+def test_ready_gated_by_warm_up(fitted_model, monkeypatch):
+    """Проверка, что /ready открывается только после прогрева модели"""
+    backend = SklearnBackend(fitted_model, app_module.FEATURE_NAMES)
+    monkeypatch.setattr(app_module, "model", backend)
+    monkeypatch.setattr(app_module, "warmup_done", threading.Event())
+    monkeypatch.setattr(app_module, "WARMUP_BATCH_SIZES", [1, 4])
+
+    client = TestClient(app_module.app)
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").json()["ready"] is False
+
+    with TestClient(app_module.app) as client:
+        assert app_module.warmup_done.wait(10)
+        assert client.get("/ready").status_code == 200
+        health = client.get("/health").json()
+    assert health["ready"] is True
+    assert health["warmup_seconds"] > 0
+    assert health["warmup_error"] is None
+
+
+def test_ready_stays_closed_when_warm_up_fails(fitted_model, monkeypatch):
+    """Проверка, что при ошибке прогрева /ready закрыт, а /health показывает её"""
+    backend = SklearnBackend(fitted_model, app_module.FEATURE_NAMES)
+
+    def broken(X):
+        raise RuntimeError("bad model")
+
+    monkeypatch.setattr(backend, "predict_proba", broken)
+    monkeypatch.setattr(app_module, "model", backend)
+    monkeypatch.setattr(app_module, "warmup_done", threading.Event())
+    monkeypatch.setattr(app_module, "warmup_status", {"error": None})
+
+    app_module._initial_warm_up()
+    client = TestClient(app_module.app)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["reason"] == "warmup_failed"
+    health = client.get("/health").json()
+    assert health["ready"] is False
+    assert health["warmup_error"] == "RuntimeError: bad model"
+
+
+def test_ready_without_model(monkeypatch):
+    """Проверка, что без модели /ready отдаёт 503, а /health — 200"""
+    monkeypatch.setattr(app_module, "model", None)
+    client = TestClient(app_module.app)
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").json() == {
+        "status": "ok",
+        "model_loaded": False,
+        "ready": False,
+    }
+
+
+def test_predict_stream_ndjson(client, monkeypatch):
+    """Проверка, что NDJSON-поток скорится чанками в порядке входа"""
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_SIZE", 4)
+    clients = make_clients(10, seed=7)
+    body = "".join(json.dumps(c) + "\n" for c in clients)
+    expected = client.post("/predict/batch", json={"clients": clients}).json()
+
+    response = client.post(
+        "/predict/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["default_prediction"] for r in lines] == expected["default_predictions"]
+    np.testing.assert_allclose(
+        [r["default_probability"] for r in lines], expected["default_probabilities"]
+    )
+
+
+def test_predict_stream_csv_and_errors(client, monkeypatch):
+    """Проверка CSV-входа и строки с ошибкой в конце потока"""
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_SIZE", 2)
+    clients = make_clients(3, seed=8)
+    names = app_module.FEATURE_NAMES
+    rows = [",".join(str(c[name]) for name in names) for c in clients]
+    body = "\n".join([",".join(names), *rows, "bad"]) + "\n"
+
+    response = client.post(
+        "/predict/stream", content=body, headers={"Content-Type": "text/csv"}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Строка из неполного чанка перед ошибкой тоже скорится
+    assert len(lines) == 4
+    assert all("default_probability" in r for r in lines[:3])
+    assert lines[-1]["line"] == 5
+    assert "error" in lines[-1]
+
+
+def test_predict_stream_rejects_null_and_non_numeric_values(client):
+    """Проверка, что null и нечисловые значения — ошибка строки, а не NaN"""
+    clients = make_clients(3, seed=9)
+    bad = dict(clients[1], LIMIT_BAL=None)
+    body = "".join(json.dumps(c) + "\n" for c in [clients[0], bad, clients[2]])
+
+    response = client.post(
+        "/predict/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2
+    assert "default_probability" in lines[0]
+    assert lines[1]["line"] == 2
+    assert "LIMIT_BAL" in lines[1]["error"]
+
+    body = json.dumps(dict(clients[0], SEX="male")) + "\n"
+    response = client.post("/predict/stream", content=body)
+    assert "SEX" in response.json()["error"]
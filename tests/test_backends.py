@@ -0,0 +1,74 @@
+"""Тесты бэкендов инференса: совпадение с пайплайном, выбор по умолчанию, mmap"""
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.api.app import FEATURE_NAMES
+from src.models.backends import (
+    CompiledBackend,
+    SklearnBackend,
+    SklearnNumpyBackend,
+    load_backend,
+)
+from tests.conftest import make_clients
+
+
+def test_sklearn_numpy_backend_matches_pipeline(fitted_model):
+    """Проверка, что numpy-препроцессинг совпадает с predict_proba пайплайна"""
+    X = pd.DataFrame(make_clients(100, seed=5))[FEATURE_NAMES]
+    X.loc[0, "EDUCATION"] = 42  # неизвестная категория
+    expected = fitted_model.predict_proba(X)[:, 1]
+
+    # sklearn-бэкенд исполняет сам пайплайн, numpy-версия совпадает до ~1e-6
+    sklearn_backend = SklearnBackend(fitted_model, FEATURE_NAMES)
+    np.testing.assert_array_equal(sklearn_backend.predict_proba(X.values), expected)
+    backend = SklearnNumpyBackend(fitted_model, FEATURE_NAMES)
+    actual = backend.predict_proba(X.values.astype(np.float32))
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+def test_load_backend_defaults_to_numpy_preprocessing(fitted_model, tmp_path):
+    """Проверка, что .pkl по умолчанию идёт без DataFrame, иной пайплайн — как есть"""
+    joblib.dump(fitted_model, tmp_path / "model.pkl")
+    backend = load_backend(tmp_path / "model.pkl", FEATURE_NAMES)
+    assert backend.name == "sklearn_numpy"
+    assert load_backend(tmp_path / "model.pkl", [], "sklearn").name == "sklearn"
+
+    joblib.dump(fitted_model[-1], tmp_path / "classifier.pkl")
+    backend = load_backend(tmp_path / "classifier.pkl", FEATURE_NAMES)
+    assert backend.name == "sklearn"
+
+
+def test_compiled_backend_matches_pipeline(fitted_model):
+    """Проверка, что компилированный ансамбль совпадает с predict_proba пайплайна"""
+    backend = CompiledBackend(fitted_model, FEATURE_NAMES)
+
+    X = pd.DataFrame(make_clients(300, seed=7))[FEATURE_NAMES]
+    X.loc[0, "EDUCATION"] = 42  # неизвестная категория
+    expected = fitted_model.predict_proba(X)[:, 1]
+    # Несколько блоков по chunk_size и одна строка
+    backend.ensemble.chunk_size = 128
+    np.testing.assert_allclose(
+        backend.predict_proba(X.values.astype(np.float32)), expected, atol=1e-12
+    )
+    np.testing.assert_allclose(
+        backend.predict_proba(X.values[:1].astype(np.float32)),
+        expected[:1],
+        atol=1e-12,
+    )
+
+
+def test_sklearn_backend_mmap_load(fitted_model, tmp_path):
+    """Проверка, что mmap-загрузка отображает массивы из файла и не меняет ответ"""
+    joblib.dump(fitted_model, tmp_path / "model.pkl")
+    backend = SklearnBackend.load(tmp_path / "model.pkl", FEATURE_NAMES, mmap=True)
+    scaler = backend.model.named_steps["preprocessor"].named_transformers_["num"]
+    assert isinstance(scaler.named_steps["scaler"].mean_, np.memmap)
+
+    X = pd.DataFrame(make_clients(20, seed=6))[FEATURE_NAMES]
+    np.testing.assert_allclose(
+        backend.predict_proba(X.values.astype(np.float32)),
+        fitted_model.predict_proba(X)[:, 1],
+        atol=1e-6,
+    )
@@ -0,0 +1,82 @@
+"""Тесты диспетчера микробатчинга"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.api.batching import MicroBatcher
+
+
+def test_microbatcher_groups_concurrent_requests():
+    """Проверка, что одновременные запросы уходят в модель одним батчем"""
+    calls = []
+
+    def predict_fn(X, context):
+        calls.append(len(X))
+        return X[:, 0] * 10
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        rows = [np.array([i, 0.0], dtype=np.float32) for i in range(8)]
+        return await asyncio.gather(*(batcher.submit(row) for row in rows))
+
+    results = asyncio.run(run())
+    assert results == [i * 10.0 for i in range(8)]
+    assert calls == [8]
+
+
+def test_microbatcher_respects_max_batch_size():
+    """Проверка, что батч не превышает max_batch_size"""
+    calls = []
+
+    def predict_fn(X, context):
+        calls.append(len(X))
+        return np.zeros(len(X))
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=3, max_wait_ms=1)
+
+    async def run():
+        rows = [np.zeros(2, dtype=np.float32) for _ in range(7)]
+        return await asyncio.gather(*(batcher.submit(row) for row in rows))
+
+    assert len(asyncio.run(run())) == 7
+    assert max(calls) <= 3
+    assert sum(calls) == 7
+
+
+def test_microbatcher_propagates_errors():
+    """Проверка, что ошибка модели передаётся каждому запросу батча"""
+
+    def predict_fn(X, context):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1)
+
+    async def run():
+        return await batcher.submit(np.zeros(2, dtype=np.float32))
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(run())
+
+
+def test_microbatcher_scores_each_request_with_its_own_model():
+    """Проверка, что строки разных моделей в одном окне не смешиваются"""
+    calls = []
+
+    def predict_fn(X, scale):
+        calls.append((scale, len(X)))
+        return X[:, 0] * scale
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        rows = [np.array([i, 0.0], dtype=np.float32) for i in range(4)]
+        scales = [1, 100, 1, 100]
+        return await asyncio.gather(
+            *(batcher.submit(row, scale) for row, scale in zip(rows, scales))
+        )
+
+    assert asyncio.run(run()) == [0.0, 100.0, 2.0, 300.0]
+    assert calls == [(1, 2), (100, 2)]
@@ -0,0 +1,191 @@
+"""Тесты общего бенчмарка: статистика задержек, память, история и поиск регрессий"""
+
+import importlib
+import sys
+
+import numpy as np
+import pytest
+
+from src.models.benchmark import (
+    DEFAULT_TARGETS,
+    append_history,
+    compare_runs,
+    find_knee,
+    find_run,
+    fit_memory_curve,
+    latency_stats,
+    load_history,
+    max_batch_within,
+    measure_memory,
+    open_loop_stats,
+    parse_target,
+)
+
+
+def test_latency_stats_percentiles_and_throughput():
+    """Проверка перцентилей, максимума и пропускной способности"""
+    stats = latency_stats(np.arange(1, 101, dtype=float), batch_size=10)
+    assert stats["n_runs"] == 100
+    assert stats["p50_ms"] == 50.5
+    assert stats["p99_ms"] == pytest.approx(99.01)
+    assert stats["max_ms"] == 100.0
+    # 100 вызовов по 10 строк за 5050 мс
+    assert stats["throughput_samples_per_sec"] == pytest.approx(198.02)
+
+
+def test_measure_memory_counts_numpy_allocations():
+    """Проверка, что tracemalloc видит временный массив и не считает его остатком"""
+    memory = measure_memory(lambda: np.ones((1000, 1000)).sum())
+    # Массив float64 1000 x 1000 — 7.63 МБ
+    assert memory["alloc_peak_mb"] == pytest.approx(7.63, abs=0.1)
+    assert memory["alloc_retained_mb"] < 0.1
+    assert memory["rss_peak_mb"] >= memory["rss_before_mb"]
+
+
+def test_memory_without_resource_module(monkeypatch):
+    """Проверка, что без модуля resource (Windows) замер памяти не ломает импорт"""
+    from src.models import memory
+
+    def no_proc(*args, **kwargs):
+        raise OSError("нет /proc")
+
+    monkeypatch.setitem(sys.modules, "resource", None)
+    try:
+        module = importlib.reload(memory)
+        assert module.resource is None
+        monkeypatch.setattr(module, "open", no_proc, raising=False)
+        assert module.process_memory() == {}
+        assert module.peak_rss() is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(memory)
+
+
+def test_memory_curve_and_max_batch():
+    """Проверка линейной кривой памяти и наибольшего батча под бюджет"""
+    curve = fit_memory_curve([1, 1000, 10000], [200.0, 202.0, 220.0])
+    assert curve["fixed_mb"] == pytest.approx(200.0, abs=0.01)
+    assert curve["per_row_kb"] == pytest.approx(2.048, abs=0.001)
+    assert max_batch_within(curve, 400.0) == pytest.approx(100_000, rel=1e-3)
+    assert max_batch_within(curve, 150.0) == 0
+    assert max_batch_within({"fixed_mb": 100.0, "per_row_kb": 0.0}, 400.0) is None
+    with pytest.raises(ValueError):
+        fit_memory_curve([100, 100], [1.0, 2.0])
+
+
+def test_parse_target():
+    """Проверка разбора цели по имени и в виде имя=бэкенд:путь"""
+    assert parse_target("nn_quantized") == (
+        "nn_quantized",
+        "onnx",
+        "models/model_quantized.onnx",
+    )
+    # Цели по умолчанию — одна и та же модель
+    assert {parse_target(name)[2] for name in DEFAULT_TARGETS if name != "onnx"} == {
+        "models/credit_default_model.pkl"
+    }
+    assert parse_target("gbm=compiled:models/gbm.pkl") == (
+        "gbm",
+        "compiled",
+        "models/gbm.pkl",
+    )
+    with pytest.raises(ValueError):
+        parse_target("unknown")
+
+
+def test_history_and_regressions(tmp_path):
+    """Проверка истории прогонов и флага регрессии по порогу"""
+
+    def run(run_id, p99, throughput):
+        row = {"target": "onnx", "threads": 1, "batch_size": 1}
+        row.update({"p99_ms": p99, "throughput_samples_per_sec": throughput})
+        return {
+            "run_id": run_id,
+            "label": run_id,
+            "machine": "x86_64",
+            "processor": "x86_64",
+            "results": [row],
+        }
+
+    history = tmp_path / "history.jsonl"
+    append_history(history, run("a", 1.0, 1000.0))
+    append_history(history, run("b", 1.05, 800.0))
+    runs = load_history(history)
+    assert [r["run_id"] for r in runs] == ["a", "b"]
+    assert find_run(runs, "previous")["run_id"] == "a"
+
+    rows = compare_runs(
+        find_run(runs, "a"),
+        find_run(runs, "latest"),
+        metrics=("p99_ms", "throughput_samples_per_sec"),
+        threshold=0.1,
+    )
+    assert [(r["metric"], r["regression"]) for r in rows] == [
+        ("p99_ms", False),
+        ("throughput_samples_per_sec", True),
+    ]
+
+
+def test_compare_refuses_runs_from_other_host():
+    """Проверка, что прогоны с разных машин не сравниваются без явного флага"""
+    row = {"target": "onnx", "threads": 1, "batch_size": 1, "p50_ms": 1.0}
+    baseline = {"machine": "x86_64", "processor": "x86_64", "results": [row]}
+    current = {**baseline, "machine": "aarch64"}
+    with pytest.raises(ValueError):
+        compare_runs(baseline, current, metrics=("p50_ms",))
+    rows = compare_runs(baseline, current, metrics=("p50_ms",), allow_other_host=True)
+    assert [r["regression"] for r in rows] == [False]
+
+
+def test_open_loop_stats_counts_stalled_requests():
+    """Проверка, что зависший запрос виден в задержке от расписания"""
+    # 100 запросов/с через одно соединение, обслуживание 1 мс, запрос 10 висит 0.5 с
+    samples, free_at = [], 0.0
+    for i in range(100):
+        intended = i / 100
+        sent = max(intended, free_at)
+        free_at = sent + (0.5 if i == 10 else 0.001)
+        samples.append((intended, sent, free_at, 200 if i != 99 else 503))
+
+    stats = open_loop_stats(samples, start=0.0, rate=100, concurrency=1)
+    assert stats["n_errors"] == 1
+    assert stats["status_codes"] == {"200": 99, "503": 1}
+    # Без коррекции 90% запросов укладываются в 1 мс
+    assert stats["service_time"]["p90_ms"] == pytest.approx(1.0)
+    # От расписания ~50 запросов за зависшим ждали своей очереди
+    assert stats["latency"]["p50_ms"] > 10
+    assert stats["latency"]["p90_ms"] > 300
+    assert stats["max_send_lag_ms"] == pytest.approx(490, abs=1)
+
+
+def test_find_knee_on_synthetic_curve():
+    """Проверка точки насыщения по ошибкам, частоте и росту p99"""
+
+    def level(rate, p99, achieved=None, error_rate=0.0):
+        return {
+            "offered_rps": rate,
+            "achieved_rps": rate if achieved is None else achieved,
+            "error_rate": error_rate,
+            "latency": {"p99_ms": p99},
+        }
+
+    healthy = [level(50, 10.0), level(100, 11.0), level(200, 14.0)]
+    # Уровни могут прийти не по порядку частоты
+    assert find_knee(
+        [level(400, 45.0)] + healthy[::-1],
+        max_error_rate=0.01,
+        min_achieved_ratio=0.95,
+        p99_factor=3.0,
+    ) == {"knee_rps": 200, "knee_p99_ms": 14.0, "limited_by": "latency"}
+
+    def limit(extra):
+        return find_knee(healthy + [extra], 0.01, 0.95, 3.0)["limited_by"]
+
+    assert limit(level(400, 12.0, achieved=350)) == "throughput"
+    assert limit(level(400, 12.0, error_rate=0.05)) == "errors"
+    assert limit(level(400, 12.0)) is None
+    assert find_knee([level(50, 10.0, error_rate=0.5)], 0.01, 0.95, 3.0) == {
+        "knee_rps": None,
+        "knee_p99_ms": None,
+        "limited_by": "errors",
+    }
@@ -0,0 +1,52 @@
+"""Тесты кэша предсказаний"""
+
+import numpy as np
+
+from src.api import cache as cache_module
+from src.api.cache import PredictionCache
+
+
+def make_key(value, version="v1"):
+    """Метод строит ключ для строки из одного значения"""
+    return PredictionCache.make_key(np.array([[value, 1.0]], dtype=np.float32), version)
+
+
+def test_cache_key_is_canonical():
+    """Проверка, что -0.0 и 0.0 дают один ключ, а версия модели — разный"""
+    assert make_key(0.0) == make_key(-0.0)
+    assert make_key(0.0, "v1") != make_key(0.0, "v2")
+
+
+def test_cache_lru_eviction():
+    """Проверка, что при переполнении вытесняется давно не использованная запись"""
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.set(make_key(1), 0.1, "v1")
+    cache.set(make_key(2), 0.2, "v1")
+    assert cache.get(make_key(1), "v1") == 0.1
+    cache.set(make_key(3), 0.3, "v1")
+
+    assert cache.get(make_key(2), "v1") is None
+    assert cache.get(make_key(1), "v1") == 0.1
+    assert cache.get(make_key(3), "v1") == 0.3
+
+
+def test_cache_ttl_expiry(monkeypatch):
+    """Проверка, что запись старше TTL не отдаётся"""
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_size=10, ttl_seconds=5)
+    cache.set(make_key(1), 0.1, "v1")
+    now[0] += 4
+    assert cache.get(make_key(1), "v1") == 0.1
+    now[0] += 2
+    assert cache.get(make_key(1), "v1") is None
+    assert len(cache) == 0
+
+
+def test_cache_flushed_on_model_change():
+    """Проверка, что смена версии модели очищает кэш"""
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.set(make_key(1), 0.1, "v1")
+    cache.set(make_key(2), 0.2, "v1")
+    assert cache.get(make_key(3, "v2"), "v2") is None
+    assert len(cache) == 0
@@ -0,0 +1,37 @@
+"""Тесты компилированного GradientBoosting"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from src.models.compiled import CompiledGradientBoosting
+
+
+def test_compiled_matches_sklearn_on_deep_uneven_trees():
+    """Проверка совпадения на глубоких неполных деревьях и значениях на порогах"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 12)).astype(np.float32)
+    X[:, 3] = np.round(X[:, 3])  # много одинаковых значений у порогов
+    y = ((X[:, 0] * X[:, 1] > 0) ^ (rng.random(2000) < 0.1)).astype(int)
+    classifier = GradientBoostingClassifier(
+        n_estimators=40, max_depth=6, min_samples_leaf=40, random_state=0
+    ).fit(X, y)
+
+    compiled = CompiledGradientBoosting(classifier, chunk_size=300)
+    assert compiled.depth == 6
+
+    thresholds = classifier.estimators_[0, 0].tree_.threshold
+    X_test = rng.normal(size=(1000, 12)).astype(np.float32)
+    X_test[:50, :] = thresholds[thresholds != -2][:1].astype(np.float32)
+    np.testing.assert_allclose(
+        compiled.predict_proba(X_test),
+        classifier.predict_proba(X_test)[:, 1],
+        atol=1e-12,
+    )
+
+
+def test_compiled_rejects_other_models():
+    """Проверка, что неподдерживаемая модель отклоняется"""
+    X, y = np.eye(4), np.array([0, 1, 0, 1])
+    with pytest.raises(ValueError):
+        CompiledGradientBoosting(RandomForestClassifier(n_estimators=2).fit(X, y))
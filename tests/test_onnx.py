@@ -0,0 +1,180 @@
+"""Тесты экспорта в ONNX, оптимизации графа и квантизации"""
+
+import json
+import platform
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.app import FEATURE_NAMES
+from src.models.backends import OnnxBackend, SklearnBackend, session_options
+from src.models.onnx_export import (
+    SINGLE_INPUT_NAME,
+    compare_with_onnx,
+    convert_pipeline,
+    operator_types,
+    probability_column,
+)
+from src.models.pipeline import create_nn_pipeline
+from src.models.quantization import FeatureCalibrationReader, quantize_static_qdq
+from tests.conftest import CATEGORICAL, make_clients
+
+
+def test_onnx_backend_parity(fitted_model):
+    """Проверка, что ONNX-бэкенд совпадает с sklearn-бэкендом"""
+    pytest.importorskip("skl2onnx")
+    ort = pytest.importorskip("onnxruntime")
+
+    onx = convert_pipeline(fitted_model, FEATURE_NAMES)
+    session = ort.InferenceSession(
+        onx.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+
+    X = pd.DataFrame(make_clients(50, seed=4))[FEATURE_NAMES].values
+    expected = SklearnBackend(fitted_model, FEATURE_NAMES).predict_proba(X)
+    actual = OnnxBackend(session, FEATURE_NAMES).predict_proba(X)
+    np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+
+def test_probability_column_accepts_tensor_and_zipmap():
+    """Проверка чтения вероятности класса 1 из обоих форматов выхода"""
+    tensor = np.array([[0.8, 0.2], [0.3, 0.7]], dtype=np.float32)
+    column = probability_column(tensor)
+    np.testing.assert_allclose(column, [0.2, 0.7], rtol=1e-6)
+    assert np.shares_memory(column, tensor)
+
+    zipmap = [{0: 0.8, 1: 0.2}, {0: 0.3, 1: 0.7}]
+    np.testing.assert_allclose(probability_column(zipmap), [0.2, 0.7])
+
+
+def test_exported_graph_has_no_zipmap(fitted_model):
+    """Проверка, что экспорт отдаёт вероятности тензором без ZipMap"""
+    onnx_model = convert_pipeline(fitted_model, FEATURE_NAMES, CATEGORICAL)
+    assert "ZipMap" not in operator_types(onnx_model)
+
+
+def test_gbm_onnx_export_uses_tree_ensemble(fitted_model):
+    """Проверка, что GBM-пайплайн экспортируется в TreeEnsemble и сверяется"""
+    pytest.importorskip("skl2onnx")
+    ort = pytest.importorskip("onnxruntime")
+
+    onx = convert_pipeline(fitted_model)
+    assert "TreeEnsembleClassifier" in operator_types(onx)
+    assert "ZipMap" not in operator_types(onx)
+    session = ort.InferenceSession(
+        onx.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+    assert session.get_outputs()[1].shape == [None, 2]
+
+    report = compare_with_onnx(fitted_model, session, pd.DataFrame(make_clients(200)))
+    assert report["n_samples"] == 200
+    assert report["label_agreement"] == 1.0
+    assert report["max_proba_diff"] < 1e-4
+    assert report["mean_proba_diff"] <= report["max_proba_diff"]
+
+
+def test_single_tensor_onnx_export_matches_per_column(fitted_model):
+    """Проверка, что граф с одним входом [None, n] совпадает с графом по колонкам"""
+    pytest.importorskip("skl2onnx")
+    ort = pytest.importorskip("onnxruntime")
+
+    def session(onx):
+        return ort.InferenceSession(
+            onx.SerializeToString(), providers=["CPUExecutionProvider"]
+        )
+
+    single = session(convert_pipeline(fitted_model, single_input=True))
+    assert [(i.name, i.shape) for i in single.get_inputs()] == [
+        (SINGLE_INPUT_NAME, [None, len(FEATURE_NAMES)])
+    ]
+    backend = OnnxBackend(single, feature_names=[])
+    assert backend.feature_names == list(fitted_model.feature_names_in_)
+
+    X = pd.DataFrame(make_clients(100, seed=8))[backend.feature_names].values
+    per_column = OnnxBackend(session(convert_pipeline(fitted_model)), [])
+    np.testing.assert_allclose(
+        backend.predict_proba(X), per_column.predict_proba(X), atol=1e-6
+    )
+
+
+def test_preoptimized_onnx_skips_runtime_optimization(fitted_model, tmp_path):
+    """Проверка, что граф из optimize_graph.py грузится без повторной оптимизации"""
+    pytest.importorskip("skl2onnx")
+    ort = pytest.importorskip("onnxruntime")
+
+    source = tmp_path / "model.onnx"
+    source.write_bytes(convert_pipeline(fitted_model).SerializeToString())
+    optimized = tmp_path / "model_optimized.onnx"
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.optimized_model_filepath = str(optimized)
+    ort.InferenceSession(
+        str(source), sess_options=opts, providers=["CPUExecutionProvider"]
+    )
+
+    # Без метаданных — уровень ORT по умолчанию
+    assert session_options(optimized).graph_optimization_level == (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    meta = {
+        "graph_optimization_level": "ORT_ENABLE_ALL",
+        "onnxruntime_version": ort.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "providers": ["CPUExecutionProvider"],
+    }
+    optimized.with_suffix(".json").write_text(json.dumps(meta))
+    assert session_options(optimized).graph_optimization_level == (
+        ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    )
+    # Граф с другого CPU оптимизируется заново на записанном уровне
+    other_cpu = {**meta, "processor": meta["processor"] + "-other"}
+    optimized.with_suffix(".json").write_text(json.dumps(other_cpu))
+    assert session_options(optimized).graph_optimization_level == (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    # Уровень, которого нет в этой версии ORT, заменяется на ORT_ENABLE_ALL
+    newer = {**other_cpu, "graph_optimization_level": "ORT_ENABLE_FUTURE"}
+    optimized.with_suffix(".json").write_text(json.dumps(newer))
+    assert session_options(optimized).graph_optimization_level == (
+        ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    optimized.with_suffix(".json").write_text(json.dumps(meta))
+
+    X = pd.DataFrame(make_clients(50, seed=9))[FEATURE_NAMES].values
+    expected = OnnxBackend.load(source, FEATURE_NAMES).predict_proba(X)
+    backend = OnnxBackend.load(optimized, [])
+    assert backend.feature_names == FEATURE_NAMES
+    np.testing.assert_allclose(backend.predict_proba(X), expected, atol=1e-6)
+
+
+def test_static_quantization_keeps_probabilities(tmp_path):
+    """Проверка статической QDQ-квантизации MLP с калибровкой на выборке"""
+    pytest.importorskip("skl2onnx")
+    pytest.importorskip("onnxruntime")
+    onnx = pytest.importorskip("onnx")
+
+    X = pd.DataFrame(make_clients(300, seed=10))[FEATURE_NAMES]
+    y = (X["PAY_0"] > 0).astype(int)
+    numeric = [name for name in FEATURE_NAMES if name not in CATEGORICAL]
+    model = create_nn_pipeline(numeric, CATEGORICAL).fit(X, y)
+    source = tmp_path / "model.onnx"
+    source.write_bytes(convert_pipeline(model).SerializeToString())
+
+    # Батчи калибровки одного размера, хвост отбрасывается
+    reader = FeatureCalibrationReader(FEATURE_NAMES, X.values, 128)
+    batches = list(iter(reader.get_next, None))
+    assert [len(b["LIMIT_BAL"]) for b in batches] == [128, 128]
+
+    quantized = quantize_static_qdq(
+        source, tmp_path / "model_quantized.onnx", X.values, method="Entropy"
+    )
+    assert "QuantizeLinear" in operator_types(onnx.load(quantized))
+    X_test = pd.DataFrame(make_clients(100, seed=11))[FEATURE_NAMES].values
+    expected = OnnxBackend.load(source, FEATURE_NAMES).predict_proba(X_test)
+    actual = OnnxBackend.load(quantized, FEATURE_NAMES).predict_proba(X_test)
+    np.testing.assert_allclose(actual, expected, atol=0.05)
+
+    with pytest.raises(ValueError):
+        quantize_static_qdq(source, tmp_path / "bad.onnx", X.values, method="KL")
@@ -1,12 +1,18 @@
 """Тесты создания признаков"""
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from src.features.build_features import (
+    AGGREGATE_COLS,
+    BILL_COLS,
+    PAY_AMT_COLS,
+    PAY_COLS,
     add_aggregate_features,
     add_age_bins,
     build_features,
+    compute_aggregates,
 )
 
 
@@ -64,3 +70,52 @@ def test_build_features(sample_df):
     assert len(result) == 2
     assert "PAY_MEAN" in result.columns
     assert "AGE_BIN" in result.columns
+
+
+def test_add_aggregate_features_values(sample_df):
+    """Проверка значений агрегатов относительно расчёта через pandas"""
+    result = add_aggregate_features(sample_df)
+    assert result["PAY_MEAN"].tolist() == sample_df[PAY_COLS].mean(axis=1).tolist()
+    assert result["PAY_MAX"].tolist() == [2, 0]
+    assert result["PAY_MIN"].tolist() == [-2, 0]
+    assert result["PAY_AMT_SUM"].tolist() == [689.0, 8388.0]
+    bill_mean = sample_df[BILL_COLS].mean(axis=1)
+    pay_amt_mean = sample_df[PAY_AMT_COLS].mean(axis=1)
+    assert result["PAY_TO_BILL_RATIO"].tolist() == pytest.approx(
+        (pay_amt_mean / bill_mean).tolist()
+    )
+
+
+def test_compute_aggregates_zero_bill():
+    """Проверка, что при нулевом среднем счёте отношение равно 0"""
+    zeros = np.zeros((1, 6))
+    result = compute_aggregates(zeros, zeros, np.ones((1, 6)))
+    assert result.shape == (1, len(AGGREGATE_COLS))
+    assert result[0, AGGREGATE_COLS.index("PAY_TO_BILL_RATIO")] == 0
+
+
+def test_aggregates_skip_nan_like_pandas(sample_df):
+    """Проверка, что пропуски в истории пропускаются, как в прежнем расчёте pandas"""
+    df = sample_df.astype({c: float for c in PAY_COLS})
+    df.loc[0, ["PAY_2", "BILL_AMT3", "PAY_AMT1"]] = np.nan
+    df.loc[1, PAY_AMT_COLS] = np.nan
+    result = add_aggregate_features(df)
+
+    expected = pd.DataFrame(
+        {
+            "PAY_MEAN": df[PAY_COLS].mean(axis=1),
+            "PAY_MAX": df[PAY_COLS].max(axis=1),
+            "PAY_MIN": df[PAY_COLS].min(axis=1),
+            "BILL_AMT_MEAN": df[BILL_COLS].mean(axis=1),
+            "BILL_AMT_MAX": df[BILL_COLS].max(axis=1),
+            "PAY_AMT_MEAN": df[PAY_AMT_COLS].mean(axis=1),
+            "PAY_AMT_SUM": df[PAY_AMT_COLS].sum(axis=1),
+        }
+    )
+    expected["PAY_TO_BILL_RATIO"] = np.where(
+        expected["BILL_AMT_MEAN"] > 0,
+        expected["PAY_AMT_MEAN"] / expected["BILL_AMT_MEAN"],
+        0,
+    )
+    pd.testing.assert_frame_equal(result[AGGREGATE_COLS], expected)
+    assert not np.isnan(result.loc[0, AGGREGATE_COLS].to_numpy(float)).any()
@@ -0,0 +1,58 @@
+"""Тесты профиля сервинга"""
+
+import json
+
+import pytest
+
+from src.api.profile import apply_serving_profile, cgroup_cpu_limit
+
+
+def write_profile(path, env):
+    path.write_text(json.dumps({"created_at": "2026-01-01T00:00:00+00:00", "env": env}))
+
+
+def test_profile_overrides_environment(tmp_path):
+    """Проверка, что значения профиля заменяют переменные окружения"""
+    write_profile(
+        tmp_path / "serving_profile.json",
+        {"MODEL_BACKEND": "onnx", "WEB_CONCURRENCY": 2, "OMP_NUM_THREADS": 1},
+    )
+    environ = {"MODEL_BACKEND": "sklearn", "MAX_BATCH_SIZE": "1000"}
+    profile = apply_serving_profile("serving_profile.json", tmp_path, environ)
+    assert profile["path"] == str(tmp_path / "serving_profile.json")
+    assert environ == {
+        "MODEL_BACKEND": "onnx",
+        "WEB_CONCURRENCY": "2",
+        "OMP_NUM_THREADS": "1",
+        "MAX_BATCH_SIZE": "1000",
+    }
+
+
+def test_missing_or_empty_profile_keeps_environment(tmp_path):
+    """Проверка, что без файла профиля окружение не меняется"""
+    environ = {"MODEL_BACKEND": "sklearn"}
+    assert apply_serving_profile("", tmp_path, environ) is None
+    assert apply_serving_profile("missing.json", tmp_path, environ) is None
+    assert environ == {"MODEL_BACKEND": "sklearn"}
+
+
+def test_profile_rejects_unknown_settings(tmp_path):
+    """Проверка, что профиль не может задать произвольную переменную"""
+    write_profile(tmp_path / "serving_profile.json", {"ADMIN_TOKEN": "x"})
+    with pytest.raises(ValueError):
+        apply_serving_profile("serving_profile.json", tmp_path, {})
+
+
+def test_cgroup_cpu_limit(tmp_path):
+    """Проверка чтения квоты CPU из cgroup v2 и v1"""
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    assert cgroup_cpu_limit(tmp_path) == 2.0
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 0.5
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
@@ -0,0 +1,35 @@
+"""Тесты журнала медленных запросов"""
+
+import cProfile
+
+from src.api.profiler import SlowRequestLog, SlowRequestProfiler
+
+
+def test_slow_log_keeps_top_n():
+    """Проверка, что в журнале остаются N самых медленных по убыванию"""
+    log = SlowRequestLog(top_n=3, window_seconds=60)
+    for i, duration in enumerate([0.1, 0.5, 0.2, 0.9, 0.3]):
+        log.add(duration, {"id": i}, now=100.0 + i)
+    assert [r["id"] for r in log.slowest(now=105.0)] == [3, 1, 4]
+
+
+def test_slow_log_forgets_requests_outside_window():
+    """Проверка, что запросы старше окна выпадают из журнала"""
+    log = SlowRequestLog(top_n=5, window_seconds=60, buckets=6)
+    log.add(5.0, {"id": "old"}, now=0.0)
+    log.add(0.1, {"id": "new"}, now=55.0)
+    assert [r["id"] for r in log.slowest(now=59.0)] == ["old", "new"]
+    assert [r["id"] for r in log.slowest(now=61.0)] == ["new"]
+
+
+def test_profiler_keeps_newest_profiles(tmp_path):
+    """Проверка уникальных имён .prof и удаления старых сверх max_profiles"""
+    profiler = SlowRequestProfiler(profile_dir=tmp_path, max_profiles=3)
+    profile = cProfile.Profile()
+    profile.enable()
+    profile.disable()
+    paths = [profiler.dump_profiles([profile], "/predict") for _ in range(5)]
+    assert len(set(paths)) == 5
+    assert sorted(p.name for p in tmp_path.glob("*.prof")) == sorted(
+        path.rsplit("/", 1)[-1] for path in paths[-3:]
+    )
@@ -0,0 +1,142 @@
+"""Тесты реестра вариантов модели и теневого скоринга"""
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+
+from src.api.registry import (
+    ModelRegistry,
+    ShadowScorer,
+    check_variant_names,
+    choose_variant,
+    parse_mapping,
+    parse_variants,
+    reorder_columns,
+)
+
+
+class FakeBackend:
+    name = "fake"
+    version = "v"
+
+    def __init__(self, feature_names, scale=1.0):
+        self.feature_names = feature_names
+        self.scale = scale
+
+    def predict_proba(self, X, timings=None):
+        return X[:, self.feature_names.index("a")] * self.scale
+
+
+def make_registry(tmp_path, sizes, budget):
+    paths = {}
+    for name, size in sizes.items():
+        path = tmp_path / f"{name}.bin"
+        path.write_bytes(b"0" * size)
+        paths[name] = path
+    loads = []
+
+    def load(path, backend=None):
+        loads.append(path.stem)
+        return FakeBackend(["a", "b"])
+
+    return ModelRegistry(paths, load, memory_budget=budget), loads
+
+
+def test_parse_mapping_and_choose_variant():
+    """Проверка разбора конфигурации и выбора варианта по долям"""
+    assert parse_mapping("nn=models/a.onnx, q=models/b.onnx") == {
+        "nn": "models/a.onnx",
+        "q": "models/b.onnx",
+    }
+    assert parse_mapping("") == {}
+    with pytest.raises(ValueError):
+        parse_mapping("broken")
+
+    weights = {"nn": 10, "q": 5}
+    assert choose_variant(weights, rand=lambda: 0.05) == "nn"
+    assert choose_variant(weights, rand=lambda: 0.12) == "q"
+    assert choose_variant(weights, rand=lambda: 0.5) is None
+
+
+def test_check_variant_names_rejects_unknown():
+    """Проверка, что опечатка в долях трафика или теневой модели видна при старте"""
+    variants = {"nn": "models/nn.onnx"}
+    check_variant_names(variants, {"nn": 10, "primary": 90}, "nn", "primary")
+    with pytest.raises(ValueError, match="nnn"):
+        check_variant_names(variants, {"nnn": 10}, None, "primary")
+    with pytest.raises(ValueError, match="candidate"):
+        check_variant_names(variants, {}, "candidate", "primary")
+    # Вариант с именем основной модели заголовком не выбрать
+    with pytest.raises(ValueError, match="primary"):
+        check_variant_names({"primary": "models/a.pkl"}, {}, None, "primary")
+
+
+def test_parse_variants_with_backend():
+    """Проверка разбора вариантов с бэкендом и без него"""
+    paths, backends = parse_variants("gbm=compiled:models/a.pkl,nn=models/nn.onnx")
+    assert paths == {"gbm": "models/a.pkl", "nn": "models/nn.onnx"}
+    assert backends == {"gbm": "compiled"}
+    with pytest.raises(ValueError, match="torch"):
+        parse_variants("x=torch:models/a.pt")
+
+
+def test_registry_charges_measured_memory(tmp_path):
+    """Проверка, что бюджет считает прирост RSS при загрузке, а не размер файла"""
+    paths = {}
+    for name in ("a", "b"):
+        paths[name] = tmp_path / f"{name}.bin"
+        paths[name].write_bytes(b"0" * 10)
+    backends_used = []
+
+    def load(path, backend=None):
+        backends_used.append(backend)
+        loaded = FakeBackend(["a", "b"])
+        loaded.memory = {"before_load": {"rss": 1000}, "after_load": {"rss": 1100}}
+        return loaded
+
+    registry = ModelRegistry(paths, load, memory_budget=150, backends={"a": "onnx"})
+    registry.get("a")
+    assert registry.loaded()["a"]["size_bytes"] == 100
+    registry.get("b")
+    assert set(registry.loaded()) == {"b"}
+    assert backends_used == ["onnx", None]
+
+
+def test_registry_evicts_least_recently_used(tmp_path):
+    """Проверка, что при превышении бюджета выгружается давно не использованный"""
+    registry, loads = make_registry(tmp_path, {"a": 60, "b": 60, "c": 60}, 130)
+    first = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is first
+    registry.get("c")
+    assert set(registry.loaded()) == {"a", "c"}
+    registry.get("b")
+    assert loads == ["a", "b", "c", "b"]
+    with pytest.raises(KeyError):
+        registry.get("unknown")
+
+
+def test_shadow_scorer_records_deltas():
+    """Проверка, что теневой скоринг пишет разницу и расхождения классов"""
+    primary = FakeBackend(["a", "b"])
+    candidate = FakeBackend(["b", "a"], scale=0.5)
+    scorer = ShadowScorer("cand-test", lambda: candidate, threshold=0.5)
+
+    X = np.array([[0.9, 0.0], [0.2, 1.0]])
+    primary_proba = primary.predict_proba(X)
+    scorer.submit(X, primary_proba, primary)
+    scorer.shutdown()
+
+    labels = {"variant": "cand-test"}
+    count = REGISTRY.get_sample_value("credit_scoring_shadow_score_delta_count", labels)
+    total = REGISTRY.get_sample_value("credit_scoring_shadow_score_delta_sum", labels)
+    assert count == 2
+    # Колонки кандидата переставлены: он видит те же значения признака "a"
+    assert total == pytest.approx(0.45 + 0.1)
+    assert (
+        REGISTRY.get_sample_value("credit_scoring_shadow_disagreements_total", labels)
+        == 1
+    )
+    np.testing.assert_array_equal(
+        reorder_columns(X, ["a", "b"], ["b", "a"]), X[:, ::-1]
+    )
@@ -0,0 +1,23 @@
+"""Тесты наблюдения за файлом модели"""
+
+import os
+import threading
+
+from src.api.reload import ModelFileWatcher
+
+
+def test_model_file_watcher_detects_change(tmp_path):
+    """Проверка, что изменение файла модели вызывает перезагрузку"""
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"v1")
+    changed = threading.Event()
+
+    watcher = ModelFileWatcher(lambda: path, lambda p: changed.set(), interval=0.02)
+    watcher.start()
+    try:
+        assert not changed.wait(0.1)
+        path.write_bytes(b"version 2")
+        os.utime(path, ns=(1, 10**18))
+        assert changed.wait(2)
+    finally:
+        watcher.stop()